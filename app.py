@@ -3,8 +3,15 @@
 Streamlit yordamida qurilgan professional analitik panel
 
 ✅ Performance: Query caching at app level
+✅ Performance: Faqat tanlangan bo'lim so'rovlari bajariladi (lazy navigation)
+✅ Performance: Natijalar diskda ham cache lanadi (restart / replikalar orasida)
+✅ Performance: Cache yangi sync / restore gacha amal qiladi (data versiyasi)
+✅ Performance: Standart davrlar (7/30/90/365 kun) fonda oldindan hisoblanadi (warmup.py)
+✅ Performance: So'rovlar vaqti va sekin so'rovlar paneli (query_metrics.py, admin uchun)
+✅ Performance: READ_BACKEND=duckdb — so'rovlar lokal Parquet snapshot dan (snapshot.py)
 ✅ Design: Modern top-tab navigation, light theme
 ✅ Analytics: GA4 Integration (Auto-switch Demo/Real)
+✅ Analytics: Kogorta retention heatmap (hafta / oy, rollups.cohort_retention)
 ✅ Filter: Date range filtering with growth %
 """
 
@@ -14,7 +21,11 @@ import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
 
-from database import execute_query
+from database import execute_query, execute_queries
+from config import IS_PRODUCTION, DATA_VERSION_TTL, RESULT_CACHE_TTL, SHOW_QUERY_METRICS, SLOW_QUERY_MS
+import result_cache
+import query_metrics
+import warmup
 from services.analytics_service import AnalyticsService
 import queries
 
@@ -70,8 +81,8 @@ st.markdown("""
     [data-testid="stSidebar"] { display: none !important; }
     [data-testid="collapsedControl"] { display: none !important; }
 
-    /* ===== TOP TABS STYLING (STICKY NAVBAR) ===== */
-    .stTabs {
+    /* ===== TOP NAVIGATION (STICKY NAVBAR) ===== */
+    .st-key-active_view {
         background: rgba(255, 255, 255, 0.95);
         backdrop-filter: blur(20px);
         -webkit-backdrop-filter: blur(20px);
@@ -84,39 +95,44 @@ st.markdown("""
         top: 0;
         z-index: 999;
     }
-    .stTabs [data-baseweb="tab-list"] {
+    .st-key-active_view [role="radiogroup"] {
         gap: 4px;
-        background: transparent;
-        border-bottom: none !important;
-        padding: 0;
+        flex-wrap: nowrap;
+        overflow-x: auto;
     }
-    .stTabs [data-baseweb="tab"] {
+    .st-key-active_view [role="radiogroup"] label {
         height: 42px;
         border-radius: 12px;
         padding: 0 1.2rem;
+        margin: 0;
         font-weight: 600;
         font-size: 0.85rem;
         letter-spacing: -0.2px;
-        color: var(--text-secondary) !important;
         background: transparent;
-        border: none !important;
         white-space: nowrap;
+        cursor: pointer;
         transition: all 0.2s ease;
     }
-    .stTabs [data-baseweb="tab"]:hover {
+    .st-key-active_view [role="radiogroup"] label p {
+        color: var(--text-secondary) !important;
+        font-weight: 600;
+    }
+    /* Radio doirachasini yashirish — tugmalar tab kabi ko'rinadi */
+    .st-key-active_view [role="radiogroup"] label > div:first-child {
+        display: none !important;
+    }
+    .st-key-active_view [role="radiogroup"] label:hover {
         background: rgba(99, 102, 241, 0.06);
+    }
+    .st-key-active_view [role="radiogroup"] label:hover p {
         color: #4f46e5 !important;
     }
-    .stTabs [aria-selected="true"] {
+    .st-key-active_view [role="radiogroup"] label:has(input:checked) {
         background: linear-gradient(135deg, #6366f1, #8b5cf6) !important;
-        color: white !important;
         box-shadow: 0 4px 12px rgba(99, 102, 241, 0.25);
     }
-    .stTabs [data-baseweb="tab-highlight"] {
-        display: none !important;
-    }
-    .stTabs [data-baseweb="tab-border"] {
-        display: none !important;
+    .st-key-active_view [role="radiogroup"] label:has(input:checked) p {
+        color: white !important;
     }
 
     /* ===== METRIC CARDS (COMPACT) ===== */
@@ -237,24 +253,75 @@ PLOTLY_LAYOUT = dict(
 
 # ======================== HELPER FUNCTIONS ========================
 
-@st.cache_data(ttl=300, show_spinner=False)
+@st.cache_data(ttl=DATA_VERSION_TTL, show_spinner=False)
+def data_version():
+    """Cache kalitlaridagi data versiyasi (result_cache.cache_version, qisqa TTL bilan)"""
+    return result_cache.cache_version()
+
+
+@st.cache_data(ttl=RESULT_CACHE_TTL, max_entries=1000, show_spinner=False)
+def _cached_query(query, params, version):
+    """So'rov natijasi: xotira, keyin disk (result_cache), keyin baza"""
+    def load():
+        query_metrics.cache_miss(query)
+        return execute_query(query, params)
+
+    return result_cache.cached_query(query, params, load, version)
+
+
 def safe_query(query, params=None):
-    """Xavfsiz so'rov (5 daq cached)"""
+    """Xavfsiz so'rov (data versiyasi bo'yicha cached, xatolar cache lanmaydi)"""
     try:
-        return execute_query(query, params)
+        with query_metrics.cache_lookup([query]):
+            return _cached_query(query, params, data_version())
     except Exception as e:
         st.error(f"❌ So'rov xatosi: {e}")
         return pd.DataFrame()
 
 
-def get_scalar(query, default=0, params=None):
-    """Bitta qiymat qaytaruvchi so'rov"""
-    df = safe_query(query, params)
+@st.cache_data(ttl=RESULT_CACHE_TTL, max_entries=200, show_spinner=False)
+def _query_batch(batch, version):
+    """So'rovlar to'plamini parallel bajarish (faqat xatosiz natija cache lanadi)"""
+    def load_batch(missing):
+        for query, _ in missing.values():
+            query_metrics.cache_miss(query)
+        return execute_queries(missing)
+
+    return result_cache.cached_batch(batch, load_batch, version)
+
+
+def safe_query_batch(batch):
+    """
+    Bo'lim uchun barcha so'rovlarni bitta round-trip vaqtida olish.
+    batch: {nom: (so'rov, parametrlar)} → {nom: DataFrame}
+    """
+    try:
+        with query_metrics.cache_lookup([query for query, _ in batch.values()]):
+            return _query_batch(batch, data_version())
+    except Exception:
+        # Qaysi so'rov xato berganini ko'rsatish uchun bittalab bajaramiz
+        return {name: safe_query(query, params) for name, (query, params) in batch.items()}
+
+
+def first_value(df, default=0):
+    """DataFrame ning birinchi qiymati"""
     if df.empty:
         return default
     return df.iloc[0, 0] or default
 
 
+def first_row(df):
+    """DataFrame ning birinchi qatori (dict, NULL → 0)"""
+    if df.empty:
+        return {}
+    return df.fillna(0).to_dict("records")[0]
+
+
+def get_scalar(query, default=0, params=None):
+    """Bitta qiymat qaytaruvchi so'rov"""
+    return first_value(safe_query(query, params), default)
+
+
 def calc_growth(current, previous):
     """O'sish foizini hisoblash"""
     if previous > 0:
@@ -300,6 +367,15 @@ def apply_plotly_theme(fig, height=250):
     return fig
 
 
+@st.cache_resource(show_spinner=False)
+def start_cache_warmup():
+    """Jarayon boshida bir marta: standart davrlar natijalarini fonda cache ga yozish"""
+    return warmup.start_background_warmup()
+
+
+start_cache_warmup()
+
+
 # ======================== COLOR PALETTES ========================
 COLORS = {
     "primary": ["#6366f1", "#8b5cf6", "#a78bfa", "#c4b5fd", "#818cf8"],
@@ -318,6 +394,8 @@ STATUS_LABELS = {
     "pending": "Kutilmoqda", "approved": "Tasdiqlangan", "rejected": "Rad etilgan",
 }
 
+COHORT_GRAIN_LABELS = {"month": "Oylik", "week": "Haftalik"}
+
 
 # ======================== DATE FILTER ========================
 
@@ -326,8 +404,21 @@ if "filter_start" not in st.session_state:
 if "filter_end" not in st.session_state:
     st.session_state.filter_end = datetime.now().date()
 
-# Filter qator — chap tarafda bo'sh, o'ng tarafda sanalar
+# Filter qator — chap tarafda sinxronlash (production), o'ng tarafda sanalar
 fcol1, fcol2, fcol3 = st.columns([6, 2, 2])
+if IS_PRODUCTION:
+    with fcol1:
+        if st.button("🔄 Sinxronlash", key="sync_button"):
+            from etl import sync_data
+
+            with st.spinner("Production → Dashboard sinxronlanmoqda..."):
+                sync_result = sync_data(incremental=True)
+            # Yangi versiya keyingi so'rovdayoq o'qilsin — eski cache lar shu bilan eskiradi
+            data_version.clear()
+            if "error" in sync_result:
+                st.error(f"❌ Sinxronlash xatosi: {sync_result['error']}")
+            else:
+                st.success("✅ Ma'lumotlar yangilandi")
 with fcol2:
     start_date = st.date_input("📅 Boshlanish", value=st.session_state.filter_start, key="d_start")
     st.session_state.filter_start = start_date
@@ -337,39 +428,28 @@ with fcol3:
 
 # Oldingi davr (xuddi shuncha kunlik)
 range_days = (end_date - start_date).days
-prev_start = start_date - timedelta(days=range_days + 1)
-prev_end = start_date - timedelta(days=1)
-
-date_params = (str(start_date), str(end_date))
-prev_params = (str(prev_start), str(prev_end))
-
-
-# ======================== TOP TAB NAVIGATION ========================
-
-tab1, tab2, tab3, tab4, tab5 = st.tabs([
-    "📊 Umumiy Analitika",
-    "👤 Foydalanuvchilar",
-    "🏘️ Uy Egalari",
-    "🤝 Ijarachilar",
-    "📈 Session Analytics",
-])
-
-analytics_service = AnalyticsService()
+date_params, kpi_params = queries.period_params(start_date, end_date)
 
 
 # ==================== 1. UMUMIY ANALITIKA ====================
-with tab1:
-
-    cur_users = get_scalar(queries.users_in_range(), params=date_params)
-    cur_requests = get_scalar(queries.requests_in_range(), params=date_params)
-    cur_contracts = get_scalar(queries.contracts_in_range(), params=date_params)
-    cur_properties = get_scalar(queries.properties_in_range(), params=date_params)
-    total_active = get_scalar(queries.ACTIVE_USERS)
-
-    prev_users = get_scalar(queries.users_in_prev_range(), params=prev_params)
-    prev_requests = get_scalar(queries.requests_in_prev_range(), params=prev_params)
-    prev_contracts = get_scalar(queries.contracts_in_prev_range(), params=prev_params)
-    prev_properties = get_scalar(queries.properties_in_prev_range(), params=prev_params)
+def render_overview():
+    """Umumiy analitika bo'limi"""
+    data = safe_query_batch(queries.overview_batch(date_params, kpi_params))
+    user_kpi = first_row(data["user_kpi"])
+    request_kpi = first_row(data["request_kpi"])
+    contract_kpi = first_row(data["contract_kpi"])
+    property_kpi = first_row(data["property_kpi"])
+
+    cur_users = user_kpi.get("new_users", 0)
+    cur_requests = request_kpi.get("current", 0)
+    cur_contracts = contract_kpi.get("current", 0)
+    cur_properties = property_kpi.get("current", 0)
+    total_active = user_kpi.get("active", 0)
+
+    prev_users = user_kpi.get("prev_new_users", 0)
+    prev_requests = request_kpi.get("previous", 0)
+    prev_contracts = contract_kpi.get("previous", 0)
+    prev_properties = property_kpi.get("previous", 0)
 
     col1, col2, col3, col4, col5 = st.columns(5)
     with col1:
@@ -385,21 +465,21 @@ with tab1:
 
     st.markdown("")
 
-    cur_revenue = get_scalar(queries.revenue_in_range(), params=date_params)
-    prev_revenue = get_scalar(queries.revenue_in_prev_range(), params=prev_params)
+    cur_revenue = contract_kpi.get("revenue", 0)
+    prev_revenue = contract_kpi.get("prev_revenue", 0)
 
     col1, col2, col3 = st.columns(3)
     with col1:
         metric_card("💰", f"{cur_revenue:,.0f}", "Shartnoma tushumi", delta=calc_growth(cur_revenue, prev_revenue))
     with col2:
-        total_all_users = get_scalar(queries.TOTAL_USERS)
+        total_all_users = user_kpi.get("total", 0)
         metric_card("📊", total_all_users, "Jami foydalanuvchilar (barchasi)")
     with col3:
-        total_all_requests = get_scalar(queries.TOTAL_REQUESTS)
+        total_all_requests = request_kpi.get("total", 0)
         metric_card("📋", total_all_requests, "Jami arizalar (barchasi)")
 
     section_header("📈 Kunlik Trendlar (Arizalar, Shartnomalar, Yangi Userlar)")
-    df_trends = safe_query(queries.daily_trends_in_range(), params=date_params)
+    df_trends = data["trends"]
     if not df_trends.empty:
         df_trends = df_trends.rename(columns={"date": "sana", "requests": "Arizalar", "contracts": "Shartnomalar", "new_users": "Yangi userlar"})
         fig = px.line(df_trends, x="sana", y=["Arizalar", "Shartnomalar", "Yangi userlar"],
@@ -413,12 +493,15 @@ with tab1:
 
 
 # ==================== 2. FOYDALANUVCHILAR ====================
-with tab2:
+def render_users():
+    """Foydalanuvchilar bo'limi"""
     section_header("👤 Foydalanuvchilar segmentatsiyasi")
 
-    total = get_scalar(queries.TOTAL_USERS)
-    identified = get_scalar(queries.IDENTIFIED_USERS_COUNT)
-    scored = get_scalar(queries.SCORED_USERS_COUNT)
+    data = safe_query_batch(queries.users_batch(date_params, kpi_params))
+    user_kpi = first_row(data["user_kpi"])
+    total = user_kpi.get("total", 0)
+    identified = user_kpi.get("identified", 0)
+    scored = user_kpi.get("scored", 0)
 
     col1, col2, col3 = st.columns(3)
     with col1:
@@ -434,7 +517,7 @@ with tab2:
 
     with col_left:
         section_header("🧑‍🤝‍🧑 Rol bo'yicha taqsimot")
-        df = safe_query(queries.USERS_BY_ROLE)
+        df = data["by_role"]
         if not df.empty:
             df["role_label"] = df["role"].map(ROLE_LABELS).fillna(df["role"])
             fig = px.pie(df, values="count", names="role_label",
@@ -445,22 +528,46 @@ with tab2:
 
     with col_right:
         section_header("👫 Jins bo'yicha")
-        df = safe_query(queries.USERS_GENDER_DISTRIBUTION)
+        df = data["gender"]
         if not df.empty:
             fig = px.bar(df, x="gender", y="count", color="gender", color_discrete_sequence=COLORS["chart"])
             apply_plotly_theme(fig)
             fig.update_layout(showlegend=False)
             st.plotly_chart(fig, use_container_width=True)
 
+    # Retention rollups.cohort_retention dan o'qiladi (ETL yangilaydi) — xom voqealar skan qilinmaydi
+    section_header("🔁 Kogorta retention (ro'yxatdan o'tgan davr bo'yicha)")
+    grain = st.radio(
+        "Kogorta", list(COHORT_GRAIN_LABELS), format_func=COHORT_GRAIN_LABELS.get,
+        horizontal=True, label_visibility="collapsed", key="cohort_grain",
+    )
+    df = safe_query_batch(queries.cohort_batch(grain))["cohorts"]
+    if not df.empty:
+        df["retention"] = (df["active_users"] / df["cohort_size"] * 100).round(1)
+        df["kogorta"] = pd.to_datetime(df["cohort"]).dt.strftime("%Y-%m" if grain == "month" else "%Y-%m-%d")
+        matrix = df.pivot(index="kogorta", columns="period", values="retention")
+        period_label = "Oy" if grain == "month" else "Hafta"
+        fig = px.imshow(matrix, text_auto=".0f", aspect="auto", color_continuous_scale="Purples",
+                        labels={"x": period_label, "y": "Kogorta", "color": "Faol %"})
+        apply_plotly_theme(fig, 80 + 26 * len(matrix))
+        fig.update_xaxes(dtick=1, side="top")
+        st.plotly_chart(fig, use_container_width=True)
+        st.caption(f"{period_label} 0 — kogorta hajmi (100%). Faollik: kirish, ariza yoki shartnoma.")
+    else:
+        st.info("Retention ma'lumotlari hali hisoblanmagan (ETL sync dan keyin paydo bo'ladi)")
+
 
 # ==================== 3. UY EGALARI ====================
-with tab3:
+def render_homeowners():
+    """Uy egalari bo'limi"""
     section_header("🏘️ Uy Egalari Analitikasi")
 
-    total_owners = get_scalar(queries.TOTAL_HOMEOWNERS)
-    inactive_owners = get_scalar(queries.HOMEOWNERS_WITHOUT_PROPERTY)
+    data = safe_query_batch(queries.homeowners_batch(date_params, kpi_params))
+    user_kpi = first_row(data["user_kpi"])
+    total_owners = user_kpi.get("homeowners", 0)
+    inactive_owners = first_row(data["growth_gaps"]).get("homeowners_without_property", 0)
     active_percent = 100 - (int(inactive_owners / total_owners * 100) if total_owners > 0 else 0)
-    cur_owners = get_scalar(queries.homeowners_in_range(), params=date_params)
+    cur_owners = user_kpi.get("new_homeowners", 0)
 
     col1, col2, col3, col4 = st.columns(4)
     with col1:
@@ -476,7 +583,7 @@ with tab3:
         st.warning(f"⚠️ **Diqqat:** {inactive_owners} ta uy egasi ro'yxatdan o'tgan lekin hali mulk qo'shmagan.")
 
     section_header("🏠 Mulklar holati")
-    df = safe_query(queries.PROPERTIES_BY_STATUS)
+    df = data["properties_by_status"]
     if not df.empty:
         fig = px.bar(df, x="status", y="count", color="status",
                     color_discrete_sequence=COLORS["chart"], title="Mulk statuslari")
@@ -485,12 +592,15 @@ with tab3:
 
 
 # ==================== 4. IJARACHILAR ====================
-with tab4:
+def render_tenants():
+    """Ijarachilar bo'limi"""
     section_header("🤝 Ijarachilar Analitikasi")
 
-    total_tenants = get_scalar(queries.TOTAL_TENANTS)
-    no_requests = get_scalar(queries.TENANTS_WITHOUT_REQUESTS)
-    cur_tenants = get_scalar(queries.tenants_in_range(), params=date_params)
+    data = safe_query_batch(queries.tenants_batch(date_params, kpi_params))
+    user_kpi = first_row(data["user_kpi"])
+    total_tenants = user_kpi.get("tenants", 0)
+    no_requests = first_row(data["growth_gaps"]).get("tenants_without_requests", 0)
+    cur_tenants = user_kpi.get("new_tenants", 0)
 
     col1, col2, col3 = st.columns(3)
     with col1:
@@ -503,7 +613,7 @@ with tab4:
     st.info(f"💡 {no_requests} ta ijarachi ro'yxatdan o'tgan, lekin hali birorta ham ariza yubormagan.")
 
     section_header("📋 Arizalar statusi (tanlangan davr)")
-    df = safe_query(queries.requests_by_status_in_range(), params=date_params)
+    df = data["requests_by_status"]
     if not df.empty:
         df["status_label"] = df["status"].map(STATUS_LABELS).fillna(df["status"])
         fig = px.pie(df, values="count", names="status_label",
@@ -515,8 +625,9 @@ with tab4:
 
 
 # ==================== 5. SESSION ANALYTICS ====================
-with tab5:
-
+def render_sessions():
+    """Session analytics (GA4) bo'limi"""
+    analytics_service = AnalyticsService()
     session_days = max(range_days, 1)
     data = analytics_service.get_dashboard_metrics(
         days=session_days,
@@ -581,3 +692,51 @@ with tab5:
         section_header("📄 Eng ko'p ko'rilgan sahifalar")
         df_pages = data["top_pages"]
         st.dataframe(df_pages, hide_index=True, use_container_width=True)
+
+
+# ======================== TOP TAB NAVIGATION ========================
+# st.tabs barcha tablarning kodini har rerun da bajaradi. Shuning uchun
+# navigatsiya session_state dagi tanlangan bo'lim orqali qilinadi va faqat
+# ko'rinib turgan bo'limning so'rovlari bajariladi.
+
+VIEWS = {
+    "📊 Umumiy Analitika": render_overview,
+    "👤 Foydalanuvchilar": render_users,
+    "🏘️ Uy Egalari": render_homeowners,
+    "🤝 Ijarachilar": render_tenants,
+    "📈 Session Analytics": render_sessions,
+}
+
+active_view = st.radio(
+    "Bo'lim",
+    list(VIEWS),
+    horizontal=True,
+    label_visibility="collapsed",
+    key="active_view",
+)
+
+VIEWS[active_view]()
+
+
+# ======================== SO'ROVLAR STATISTIKASI (ADMIN) ========================
+
+if SHOW_QUERY_METRICS:
+    with st.expander("🛠️ So'rovlar statistikasi"):
+        st.caption("Jarayon ishga tushganidan beri (oxirgi o'lchovlar). "
+                   "Cache hit — natija xotira yoki disk cache dan olingan.")
+        df_metrics = query_metrics.summary()
+        if df_metrics.empty:
+            st.info("Hali so'rov bajarilmadi")
+        else:
+            st.dataframe(df_metrics, hide_index=True, use_container_width=True)
+
+        st.markdown(f"**🐢 Sekin so'rovlar** (> {SLOW_QUERY_MS} ms yoki xato)")
+        df_slow = query_metrics.slow_queries()
+        if df_slow.empty:
+            st.info("Sekin so'rovlar yo'q")
+        else:
+            st.dataframe(df_slow, hide_index=True, use_container_width=True)
+
+        if st.button("🧹 Statistikani tozalash", key="reset_query_metrics"):
+            query_metrics.reset()
+            st.rerun()
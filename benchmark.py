@@ -0,0 +1,432 @@
+"""
+benchmark.py — queries.py uchun EXPLAIN ANALYZE regressiya benchmarki
+
+Lokal PostgreSQL dagi alohida bazaga (BENCH_DB_NAME, default "rentme_benchmark",
+yo'q bo'lsa yaratiladi) va undagi sxemaga (BENCH_SCHEMA, default "benchmark")
+production jadvallari tuzilishida sintetik ma'lumot (datagen.py) yuklanadi, rollup lar va
+ANALYTIC_INDEXES quriladi. Keyin queries.py dagi har bir so'rov (konstantalar
+va argumentsiz funksiyalar, sana parametrli so'rovlar 7 / 30 / 365 kunlik
+oraliqlar bilan) EXPLAIN (ANALYZE, BUFFERS) orqali bir necha marta bajariladi.
+
+Natija JSON hisobotga yoziladi va saqlangan baseline bilan solishtiriladi —
+sekinlashgan so'rovlar ko'rsatiladi va jarayon 1 kodi bilan tugaydi (CI uchun).
+
+Ishlatish:
+    python benchmark.py --save-baseline          # o'zgarishdan oldin
+    python benchmark.py                          # o'zgarishdan keyin — diff
+    python benchmark.py --scale 1000 --repeat 10
+    python benchmark.py --skip-load --buffers-only  # shovqinli CI: faqat bufer soni
+
+Benchmark bazasi dashboard bazasi (DB_NAME) bilan bir xil bo'lsa — faqat
+--allow-dashboard-db bilan: sxemaga bog'langan obyektlar (masalan,
+rollups.LOGIN_HISTORY_TABLE) search_path izolyatsiyasidan chiqadi.
+"""
+
+import sys
+import json
+import time
+import argparse
+import statistics
+from datetime import date, datetime, timedelta
+
+import psycopg2
+from psycopg2 import sql
+
+import queries
+from datagen import generate
+from config import DB_CONFIG, BENCH_DB_CONFIG, BENCH_SCHEMA, BENCH_THRESHOLD_PCT, BENCH_MIN_DELTA_MS
+from database import apply_indexes
+from rollups import (
+    COHORT_GRAINS, LOGIN_HISTORY_TABLE, ROLLUP_TABLES, create_rollup_tables, refresh_rollups,
+)
+
+REPORT_FILE = "benchmark_report.json"
+BASELINE_FILE = "benchmark_baseline.json"
+
+# Sana parametrli so'rovlar uchun oraliqlar (kun)
+RANGES = (7, 30, 365)
+# Bufer soni shuncha blokdan kam o'zgarsa regressiya hisoblanmaydi
+BUFFER_MIN_DELTA = 10
+# Kirish tarixi benchmark sxemasida (search_path) — dashboard dagi
+# rollups.LOGIN_HISTORY_TABLE ga sintetik kirishlar yozilmaydi
+BENCH_LOGIN_HISTORY = "user_login_days"
+
+# ======================== SINTETIK MA'LUMOT ========================
+# Faqat queries.py va rollups.py o'qiydigan ustunlar (production tuzilishi)
+
+BENCH_DDL = """
+CREATE TABLE "user" (
+    id BIGINT PRIMARY KEY,
+    phone_number VARCHAR(100),
+    first_name VARCHAR(150),
+    role VARCHAR(50),
+    is_active BOOLEAN,
+    is_deleted BOOLEAN DEFAULT FALSE,
+    date_joined TIMESTAMP,
+    last_login TIMESTAMP,
+    gender VARCHAR(225),
+    is_identified BOOLEAN,
+    has_score BOOLEAN DEFAULT FALSE
+);
+CREATE TABLE user_device (
+    id BIGINT PRIMARY KEY,
+    user_id BIGINT,
+    status VARCHAR(10),
+    device_type VARCHAR(20),
+    name VARCHAR(255),
+    last_synced_at TIMESTAMP,
+    is_deleted BOOLEAN DEFAULT FALSE
+);
+CREATE TABLE properties (
+    id BIGINT PRIMARY KEY,
+    user_id BIGINT,
+    type VARCHAR(50),
+    status VARCHAR(50),
+    is_rentable BOOLEAN,
+    created_at TIMESTAMP,
+    is_deleted BOOLEAN DEFAULT FALSE
+);
+CREATE TABLE property_announcements (
+    id BIGINT PRIMARY KEY,
+    property_id BIGINT,
+    title VARCHAR(255),
+    views INTEGER,
+    phone_views INTEGER,
+    price NUMERIC(15,2),
+    currency VARCHAR(10),
+    moderated_status VARCHAR(20),
+    created_at TIMESTAMP,
+    is_deleted BOOLEAN DEFAULT FALSE
+);
+CREATE TABLE property_rentalrequest (
+    id BIGINT PRIMARY KEY,
+    user_id_id BIGINT,
+    announcement_id BIGINT,
+    status VARCHAR(20),
+    created_at TIMESTAMP,
+    is_deleted BOOLEAN DEFAULT FALSE
+);
+CREATE TABLE contract (
+    id BIGINT PRIMARY KEY,
+    tenant_id BIGINT,
+    homeowner_id BIGINT,
+    status VARCHAR(20),
+    contract_type VARCHAR(50),
+    price NUMERIC(15,2),
+    end_date DATE,
+    created_at TIMESTAMP,
+    is_deleted BOOLEAN DEFAULT FALSE
+);
+CREATE TABLE notification (
+    id BIGINT PRIMARY KEY,
+    is_sent BOOLEAN,
+    sent_at TIMESTAMP,
+    is_deleted BOOLEAN DEFAULT FALSE
+);
+CREATE TABLE user_notification (
+    id BIGINT PRIMARY KEY,
+    user_id BIGINT,
+    notification_id BIGINT,
+    is_read BOOLEAN,
+    is_deleted BOOLEAN DEFAULT FALSE
+);
+CREATE TABLE comment (
+    id BIGINT PRIMARY KEY,
+    author_id BIGINT,
+    rating INTEGER,
+    created_at TIMESTAMP,
+    is_deleted BOOLEAN DEFAULT FALSE
+);
+"""
+
+def shares_dashboard_db():
+    """Benchmark bazasi dashboard bazasining o'zimi (host, port, nom bo'yicha)"""
+    keys = ("host", "port", "dbname")
+    return all(str(BENCH_DB_CONFIG.get(k)) == str(DB_CONFIG.get(k)) for k in keys)
+
+
+def ensure_database():
+    """Benchmark bazasi yo'q bo'lsa — yaratish (serverdagi "postgres" bazasi orqali)"""
+    try:
+        psycopg2.connect(**BENCH_DB_CONFIG).close()
+        return
+    except psycopg2.OperationalError as e:
+        if "does not exist" not in str(e):
+            raise
+    conn = psycopg2.connect(**{**BENCH_DB_CONFIG, "dbname": "postgres"})
+    try:
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute(sql.SQL("CREATE DATABASE {}").format(sql.Identifier(BENCH_DB_CONFIG["dbname"])))
+        print(f"🆕 Benchmark bazasi yaratildi: {BENCH_DB_CONFIG['dbname']}")
+    finally:
+        conn.close()
+
+
+def connect():
+    """Benchmark bazasiga ulanish (search_path — faqat benchmark sxemasi)"""
+    return psycopg2.connect(**BENCH_DB_CONFIG, options=f"-c search_path={BENCH_SCHEMA}")
+
+
+def _login_history_rows(conn):
+    """Dashboard kirish tarixidagi qatorlar soni (jadval yo'q bo'lsa None)"""
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT to_regclass(%s)", (LOGIN_HISTORY_TABLE,))
+            if cur.fetchone()[0] is None:
+                return None
+            cur.execute(f"SELECT COUNT(*) FROM {LOGIN_HISTORY_TABLE}")
+            return cur.fetchone()[0]
+    finally:
+        conn.rollback()
+
+
+def load_dataset(conn, scale=100, seed=42):
+    """
+    Sxemani qaytadan yaratib sintetik ma'lumot, rollup lar va indekslarni yuklash.
+    Bir xil scale/seed → bir xil ma'lumot (sanalar esa bugungi kunga nisbatan).
+    Yuklash dashboard kirish tarixiga (LOGIN_HISTORY_TABLE) tegsa — RuntimeError.
+    """
+    started = time.time()
+    history_rows = _login_history_rows(conn)
+    schema = sql.Identifier(BENCH_SCHEMA)
+    with conn.cursor() as cur:
+        cur.execute(sql.SQL("DROP SCHEMA IF EXISTS {} CASCADE").format(schema))
+        cur.execute(sql.SQL("CREATE SCHEMA {}").format(schema))
+        cur.execute(BENCH_DDL)
+        create_rollup_tables(cur, login_history=BENCH_LOGIN_HISTORY)
+    generate(conn, scale, layout="production", seed=seed)
+
+    refresh_rollups(conn, full=True, login_history=BENCH_LOGIN_HISTORY)
+    if _login_history_rows(conn) != history_rows:
+        raise RuntimeError(f"Benchmark yuklash {LOGIN_HISTORY_TABLE} ni o'zgartirdi")
+    apply_indexes(conn)
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        # visibility map va statistika — index-only scan lar production dagidek
+        for table in [*queries.DASHBOARD_TABLES, *ROLLUP_TABLES]:
+            cur.execute(sql.SQL("VACUUM ANALYZE {}").format(sql.Identifier(table)))
+    conn.autocommit = False
+    print(f"✅ Sintetik ma'lumot yuklandi ({time.time() - started:.1f}s)")
+
+
+# ======================== BENCHMARK ========================
+
+def benchmark_cases(today=None):
+    """
+    queries.py dagi barcha so'rovlar: [(nom, SQL, parametrlar)].
+    Sana parametrli so'rovlar har bir RANGES oralig'i uchun alohida (nom[30d]),
+    retention — har bir kogorta davri uchun (nom[week]).
+    """
+    today = today or date.today()
+    cases = []
+    for name, query in queries.all_queries().items():
+        if "%(grain)s" in query:
+            for grain in COHORT_GRAINS:
+                cases.append((f"{name}[{grain}]", query, queries.cohort_params(grain, today)))
+        elif "%(start)s" in query or "%s" in query:
+            for days in RANGES:
+                date_params, kpi = queries.period_params(today - timedelta(days=days), today)
+                params = kpi if "%(start)s" in query else date_params
+                cases.append((f"{name}[{days}d]", query, params))
+        else:
+            cases.append((name, query, None))
+    return cases
+
+
+def explain(cur, query, params=None):
+    """Bitta EXPLAIN (ANALYZE, BUFFERS) natijasi"""
+    cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + query, params)
+    result = cur.fetchone()[0][0]
+    plan = result["Plan"]
+    return {
+        "execution_ms": result["Execution Time"],
+        "planning_ms": result["Planning Time"],
+        "shared_hit": plan.get("Shared Hit Blocks", 0),
+        "shared_read": plan.get("Shared Read Blocks", 0),
+        "rows": plan.get("Actual Rows", 0),
+        "node": plan["Node Type"],
+    }
+
+
+def run_benchmark(conn, repeat=5):
+    """
+    Har bir so'rov: 1 ta isitish + repeat marta o'lchash. Solishtirish eng
+    yaxshi (min) vaqt bo'yicha — u fon yuklamasi shovqiniga mediana dan barqarorroq.
+    """
+    results = {}
+    with conn.cursor() as cur:
+        for name, query, params in benchmark_cases():
+            explain(cur, query, params)  # isitish: shared_buffers va reja cache
+            runs = [explain(cur, query, params) for _ in range(repeat)]
+            last = runs[-1]
+            results[name] = {
+                "execution_ms": round(min(r["execution_ms"] for r in runs), 3),
+                "median_ms": round(statistics.median(r["execution_ms"] for r in runs), 3),
+                "planning_ms": round(statistics.median(r["planning_ms"] for r in runs), 3),
+                "buffers": last["shared_hit"] + last["shared_read"],
+                "shared_read": last["shared_read"],
+                "rows": last["rows"],
+                "node": last["node"],
+            }
+        conn.rollback()
+    return results
+
+
+def build_report(conn, results, scale, repeat):
+    with conn.cursor() as cur:
+        cur.execute("SHOW server_version")
+        server_version = cur.fetchone()[0]
+    conn.rollback()
+    return {
+        "meta": {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "scale": scale,
+            "repeat": repeat,
+            "server_version": server_version,
+        },
+        "queries": results,
+    }
+
+
+# ======================== BASELINE BILAN SOLISHTIRISH ========================
+
+def compare(report, baseline, threshold_pct=BENCH_THRESHOLD_PCT, min_delta_ms=BENCH_MIN_DELTA_MS,
+            buffers_only=False):
+    """
+    Hisobot va baseline farqi: {"regressions": [...], "improvements": [...],
+    "new": [...], "removed": [...]}. So'rov sekinlashgan hisoblanadi, agar
+    vaqti yoki o'qilgan bufer soni threshold_pct foizdan ko'proq oshgan bo'lsa
+    (juda kichik farqlar — shovqin — hisobga olinmaydi).
+    buffers_only=True — faqat bufer soni (bir xil ma'lumotda deterministik);
+    vaqt o'lchovlari shovqinli bo'lgan umumiy CI mashinalari uchun.
+    """
+    factor = 1 + threshold_pct / 100
+    current, base = report["queries"], baseline["queries"]
+    diff = {"regressions": [], "improvements": [], "new": [], "removed": []}
+    for name, now in current.items():
+        old = base.get(name)
+        if old is None:
+            diff["new"].append(name)
+            continue
+        entry = {
+            "query": name,
+            "base_ms": old["execution_ms"],
+            "ms": now["execution_ms"],
+            "base_buffers": old["buffers"],
+            "buffers": now["buffers"],
+        }
+        slower = (not buffers_only
+                  and now["execution_ms"] > old["execution_ms"] * factor
+                  and now["execution_ms"] - old["execution_ms"] >= min_delta_ms)
+        more_io = (now["buffers"] > old["buffers"] * factor
+                   and now["buffers"] - old["buffers"] >= BUFFER_MIN_DELTA)
+        if slower or more_io:
+            entry["reason"] = " + ".join(r for r, hit in (("vaqt", slower), ("bufer", more_io)) if hit)
+            diff["regressions"].append(entry)
+        elif buffers_only:
+            if old["buffers"] > now["buffers"] * factor and old["buffers"] - now["buffers"] >= BUFFER_MIN_DELTA:
+                diff["improvements"].append(entry)
+        elif (now["execution_ms"] * factor < old["execution_ms"]
+              and old["execution_ms"] - now["execution_ms"] >= min_delta_ms):
+            diff["improvements"].append(entry)
+    diff["removed"] = [name for name in base if name not in current]
+    return diff
+
+
+def _change(entry):
+    if not entry["base_ms"]:
+        return ""
+    return f"{(entry['ms'] - entry['base_ms']) / entry['base_ms'] * 100:+.0f}%"
+
+
+def print_diff(diff, report, baseline):
+    if report["meta"]["scale"] != baseline["meta"].get("scale"):
+        print(f"⚠️ Baseline boshqa hajmda olingan (scale {baseline['meta'].get('scale')}) — "
+              f"solishtirish noaniq")
+    for title, key in (("🐢 Sekinlashgan", "regressions"), ("🚀 Tezlashgan", "improvements")):
+        print(f"\n{title}: {len(diff[key])} ta")
+        for e in sorted(diff[key], key=lambda e: e["ms"] - e["base_ms"], reverse=True):
+            print(f"   {e['query']:<45} {e['base_ms']:>9.2f} → {e['ms']:>9.2f} ms {_change(e):>6}"
+                  f"   bufer {e['base_buffers']} → {e['buffers']}   {e.get('reason', '')}")
+    if diff["new"]:
+        print(f"\n🆕 Yangi so'rovlar: {', '.join(diff['new'])}")
+    if diff["removed"]:
+        print(f"\n🗑️ Olib tashlangan so'rovlar: {', '.join(diff['removed'])}")
+
+
+def print_report(report, top=10):
+    print(f"\n⏱️ Eng sekin {top} ta so'rov (eng yaxshi / mediana):")
+    ranked = sorted(report["queries"].items(), key=lambda item: item[1]["execution_ms"], reverse=True)
+    for name, r in ranked[:top]:
+        print(f"   {name:<45} {r['execution_ms']:>9.2f} / {r['median_ms']:>9.2f} ms   "
+              f"bufer {r['buffers']:>7}   {r['node']}")
+
+
+def _read_json(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_json(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="queries.py uchun EXPLAIN ANALYZE benchmark")
+    parser.add_argument("--scale", type=float, default=100,
+                        help="datagen hajm koeffitsienti (100 = 20 000 user)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=5, help="Har bir so'rov necha marta o'lchanadi")
+    parser.add_argument("--skip-load", action="store_true",
+                        help="Mavjud benchmark sxemasidan foydalanish (ma'lumot qayta yuklanmaydi)")
+    parser.add_argument("--output", default=REPORT_FILE, help="JSON hisobot fayli")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="Solishtiriladigan baseline fayli")
+    parser.add_argument("--save-baseline", action="store_true", help="Natijani baseline sifatida saqlash")
+    parser.add_argument("--threshold", type=float, default=BENCH_THRESHOLD_PCT,
+                        help="Regressiya chegarasi, foiz")
+    parser.add_argument("--buffers-only", action="store_true",
+                        help="Faqat bufer soni bo'yicha solishtirish (shovqinli CI mashinalari uchun)")
+    parser.add_argument("--allow-dashboard-db", action="store_true",
+                        help="BENCH_DB_NAME dashboard bazasi (DB_NAME) bilan bir xil bo'lsa ham ishlash")
+    args = parser.parse_args()
+
+    if shares_dashboard_db() and not args.allow_dashboard_db:
+        print(f"❌ Benchmark bazasi dashboard bazasi bilan bir xil ({BENCH_DB_CONFIG['dbname']}). "
+              f"BENCH_DB_NAME ni alohida bazaga o'rnating yoki --allow-dashboard-db bering.")
+        sys.exit(2)
+    ensure_database()
+    conn = connect()
+    try:
+        if not args.skip_load:
+            print(f"🧪 Sintetik ma'lumot: scale {args.scale:g}, sxema \"{BENCH_SCHEMA}\"")
+            load_dataset(conn, args.scale, args.seed)
+
+        cases = len(benchmark_cases())
+        print(f"🏃 {cases} ta so'rov × {args.repeat} marta EXPLAIN (ANALYZE, BUFFERS)...")
+        report = build_report(conn, run_benchmark(conn, args.repeat), args.scale, args.repeat)
+    finally:
+        conn.close()
+
+    _write_json(args.output, report)
+    print(f"📄 Hisobot: {args.output}")
+    print_report(report)
+
+    if args.save_baseline:
+        _write_json(args.baseline, report)
+        print(f"📌 Baseline saqlandi: {args.baseline}")
+        sys.exit(0)
+
+    try:
+        baseline = _read_json(args.baseline)
+    except FileNotFoundError:
+        print(f"ℹ️ Baseline topilmadi ({args.baseline}) — --save-baseline bilan yarating")
+        sys.exit(0)
+
+    diff = compare(report, baseline, args.threshold, buffers_only=args.buffers_only)
+    print_diff(diff, report, baseline)
+    if diff["regressions"]:
+        print(f"\n❌ {len(diff['regressions'])} ta so'rov sekinlashdi")
+        sys.exit(1)
+    print("\n✅ Regressiya yo'q")
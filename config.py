@@ -31,6 +31,22 @@ if DB_CONFIG is None:
         "port": os.getenv("DB_PORT", "5432"),
     }
 
+# Connection pool (database.get_pool) sozlamalari
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "1"))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "5"))
+# Shuncha sekund ishlatilmagan ulanish checkout da SELECT 1 bilan tekshiriladi
+DB_POOL_MAX_IDLE = int(os.getenv("DB_POOL_MAX_IDLE", "60"))
+# Shuncha sekunddan eski ulanish yopilib, yangisi ochiladi
+DB_POOL_MAX_AGE = int(os.getenv("DB_POOL_MAX_AGE", "1800"))
+
+# Dashboard so'rovlari qayerdan o'qiladi: "postgres" (default) yoki "duckdb" —
+# sync dan keyin olinadigan lokal Parquet snapshot (snapshot.py). Snapshot
+# bo'lmasa yoki so'rov DuckDB da ishlamasa, Postgres dan o'qiladi.
+READ_BACKEND = os.getenv("READ_BACKEND", "postgres").strip().lower()
+SNAPSHOT_DIR = os.getenv(
+    "SNAPSHOT_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "snapshot")
+)
+
 # ======================== SOURCE (PRODUCTION) DATABASE ========================
 # ETL uchun — production bazadan ma'lumot olish
 SOURCE_DB_CONFIG = None
@@ -54,6 +70,60 @@ if SOURCE_DB_CONFIG is None:
             "port": os.getenv("SOURCE_DB_PORT", "5432"),
         }
 
+# ======================== ETL ========================
+# Incremental rejimda shuncha soatda bir marta to'liq solishtirish (full reconcile)
+ETL_FULL_RECONCILE_HOURS = int(os.getenv("ETL_FULL_RECONCILE_HOURS", "24"))
+# Server-side cursor dan bir martada olinadigan qatorlar soni
+ETL_BATCH_SIZE = int(os.getenv("ETL_BATCH_SIZE", "5000"))
+# Bir vaqtda sinxronlanadigan jadvallar soni (production bazaga yuklamani cheklash)
+ETL_MAX_WORKERS = int(os.getenv("ETL_MAX_WORKERS", "3"))
+# Incremental sinxronlashdan keyin rollup lar oxirgi shuncha kun uchun qayta hisoblanadi
+ROLLUP_LOOKBACK_DAYS = int(os.getenv("ROLLUP_LOOKBACK_DAYS", "3"))
+
+# ======================== RESULT CACHE ========================
+# So'rov natijalarining diskdagi cache i (result_cache.py) — restart / replikalar orasida
+RESULT_CACHE_DIR = os.getenv(
+    "RESULT_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "results"),
+)
+# Umumiy hajm limiti (0 = disk cache o'chirilgan)
+RESULT_CACHE_MAX_MB = int(os.getenv("RESULT_CACHE_MAX_MB", "200"))
+# Cache kalitida data versiyasi bor (database.get_data_version) — natijalar yangi
+# sync gacha amal qiladi, TTL faqat eski versiyalarni tozalash uchun
+RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL", "86400"))
+# Data versiyasi shuncha sekundda bir tekshiriladi (boshqa replikadagi sync uchun)
+DATA_VERSION_TTL = int(os.getenv("DATA_VERSION_TTL", "30"))
+
+# ======================== QUERY METRICS ========================
+# query_metrics.py — har bir so'rov uchun xotirada saqlanadigan oxirgi o'lchovlar soni
+QUERY_METRICS_WINDOW = int(os.getenv("QUERY_METRICS_WINDOW", "500"))
+# Bundan sekin so'rovlar sekin so'rovlar jurnaliga yoziladi
+SLOW_QUERY_MS = int(os.getenv("SLOW_QUERY_MS", "500"))
+# Dashboard pastida so'rovlar statistikasi paneli (admin uchun)
+SHOW_QUERY_METRICS = os.getenv("SHOW_QUERY_METRICS", "").lower() in ("1", "true", "yes")
+try:
+    if "admin" in st.secrets:
+        SHOW_QUERY_METRICS = bool(st.secrets["admin"].get("show_query_metrics", SHOW_QUERY_METRICS))
+except Exception:
+    pass
+
+# ======================== BENCHMARK ========================
+# benchmark.py — sintetik ma'lumot alohida bazaga (yo'q bo'lsa yaratiladi), undagi
+# BENCH_SCHEMA sxemasiga yuklanadi. Faqat .env / muhit o'zgaruvchilari: secrets dagi
+# production bazaga tegilmaydi; dashboard bazasi bilan bir xil bo'lsa benchmark
+# --allow-dashboard-db siz ishga tushmaydi
+BENCH_DB_CONFIG = {
+    "dbname": os.getenv("BENCH_DB_NAME", "rentme_benchmark"),
+    "user": os.getenv("BENCH_DB_USER", os.getenv("DB_USER", "postgres")),
+    "password": os.getenv("BENCH_DB_PASSWORD", os.getenv("DB_PASSWORD", "12345")),
+    "host": os.getenv("BENCH_DB_HOST", "127.0.0.1"),
+    "port": os.getenv("BENCH_DB_PORT", os.getenv("DB_PORT", "5432")),
+}
+BENCH_SCHEMA = os.getenv("BENCH_SCHEMA", "benchmark")
+# Baseline dan shuncha foiz sekin (va BENCH_MIN_DELTA_MS dan ko'p) — regressiya
+BENCH_THRESHOLD_PCT = float(os.getenv("BENCH_THRESHOLD_PCT", "20"))
+BENCH_MIN_DELTA_MS = float(os.getenv("BENCH_MIN_DELTA_MS", "1.0"))
+
 # ======================== FIREBASE ========================
 FIREBASE_CREDENTIALS = None
 try:
@@ -1,43 +1,340 @@
 """
 database.py — PostgreSQL ulanish va jadval yaratish
 
-Simple, reliable approach — har bir so'rov uchun yangi connection.
+Dashboard so'rovlari (execute_query / execute_write) process bo'yicha umumiy
+connection pool orqali ishlaydi — har bir so'rov uchun yangi TLS ulanish
+ochilmaydi. Pool @st.cache_resource bilan bir marta yaratiladi.
+Har bir so'rov vaqti query_metrics ga yoziladi.
+READ_BACKEND=duckdb bo'lsa SELECT lar lokal Parquet snapshot dan o'qiladi (snapshot.py).
+queries.RESULT_SCHEMAS da sxemasi bor so'rovlar COPY ... TO STDOUT orqali
+to'g'ridan-to'g'ri tiplangan ustunlarga (int32, category, datetime64) o'qiladi.
 Caching app.py darajasida @st.cache_data bilan amalga oshiriladi.
 """
 
+import io
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
 import pandas as pd
 import psycopg2
+import streamlit as st
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_UNKNOWN
 
-from config import DB_CONFIG
+from config import DB_CONFIG, DB_POOL_MIN, DB_POOL_MAX, DB_POOL_MAX_IDLE, DB_POOL_MAX_AGE
+from rollups import create_rollup_tables
+from queries import RESULT_SCHEMAS
+import query_metrics
+import snapshot
 
 
 def get_connection():
-    """PostgreSQL ga ulanish"""
+    """PostgreSQL ga ulanish (pool dan tashqari — ETL, migratsiya uchun)"""
     return psycopg2.connect(**DB_CONFIG)
 
 
-def execute_query(query, params=None):
-    """SELECT so'rov bajarish, DataFrame qaytaradi"""
-    conn = get_connection()
-    try:
-        df = pd.read_sql_query(query, conn, params=params)
+# ======================== CONNECTION POOL ========================
+
+class ConnectionPool:
+    """
+    Thread-safe connection pool:
+      - minconn ta ulanish oldindan ochiladi, maxconn tagacha ochiq ulanish
+        qayta ishlatiladi (psycopg2.pool dan farqli — minconn dan ortig'i yopilmaydi)
+      - barcha ulanishlar band bo'lsa xato o'rniga bo'shashini kutadi
+      - checkout da health check: yopilgan, juda eski (max_age) yoki uzoq
+        ishlatilmagan (max_idle) ulanish `SELECT 1` bilan tekshiriladi
+      - Neon uzib qo'ygan ulanishlar yopilib, yangisi bilan almashtiriladi
+    """
+
+    def __init__(self, minconn, maxconn, max_idle, max_age, **conn_kwargs):
+        self.maxconn = maxconn
+        self.max_idle = max_idle
+        self.max_age = max_age
+        self._conn_kwargs = conn_kwargs
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._lock = threading.Lock()
+        self._idle = []  # LIFO — eng oxirgi ishlatilgan ulanish birinchi olinadi
+        self._meta = {}  # conn -> (yaratilgan vaqti, oxirgi ishlatilgan vaqti)
+        for _ in range(min(minconn, maxconn)):
+            self._idle.append(self._connect())
+
+    def _connect(self):
+        conn = psycopg2.connect(**self._conn_kwargs)
+        now = time.monotonic()
+        with self._lock:
+            self._meta[conn] = (now, now)
+        return conn
+
+    def _close(self, conn):
+        with self._lock:
+            self._meta.pop(conn, None)
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    def _is_healthy(self, conn):
+        if conn.closed or conn.get_transaction_status() == TRANSACTION_STATUS_UNKNOWN:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            created, last_used = self._meta.get(conn, (now, now))
+        if now - created > self.max_age:
+            return False
+        if now - last_used > self.max_idle:
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT 1")
+                conn.rollback()
+            except psycopg2.Error:
+                return False
+        return True
+
+    def getconn(self):
+        """Sog'lom ulanish olish (kerak bo'lsa kutadi)"""
+        self._slots.acquire()
+        try:
+            while True:
+                with self._lock:
+                    conn = self._idle.pop() if self._idle else None
+                if conn is None:
+                    return self._connect()
+                if self._is_healthy(conn):
+                    return conn
+                self._close(conn)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn, broken=False):
+        """Ulanishni pool ga qaytarish (ochiq tranzaksiya rollback qilinadi)"""
+        try:
+            if not broken and not conn.closed and conn.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    broken = True
+            if broken or conn.closed:
+                self._close(conn)
+                # Neon odatda barcha ulanishlarni birdan uzadi (compute suspend) —
+                # bo'sh turganlar keyingi checkout da albatta tekshirilsin
+                with self._lock:
+                    for idle in self._idle:
+                        created, _ = self._meta.get(idle, (time.monotonic(), None))
+                        self._meta[idle] = (created, float("-inf"))
+                return
+            with self._lock:
+                created, _ = self._meta.get(conn, (time.monotonic(), None))
+                self._meta[conn] = (created, time.monotonic())
+                self._idle.append(conn)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        conn = self.getconn()
+        broken = False
+        try:
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            broken = True
+            raise
+        finally:
+            self.putconn(conn, broken=broken)
+
+    def closeall(self):
+        """Bo'sh turgan barcha ulanishlarni yopish"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            self._close(conn)
+
+
+@st.cache_resource(show_spinner=False)
+def get_pool():
+    """Process bo'yicha yagona connection pool (cached)"""
+    return ConnectionPool(DB_POOL_MIN, DB_POOL_MAX, DB_POOL_MAX_IDLE, DB_POOL_MAX_AGE, **DB_CONFIG)
+
+
+def apply_schema(df, schema):
+    """DataFrame ustunlarini sxemadagi turlarga keltirish (bor ustunlar uchun)"""
+    for column, dtype in schema.items():
+        if column not in df.columns:
+            continue
+        if dtype.startswith("datetime64"):
+            if not pd.api.types.is_datetime64_any_dtype(df[column]):
+                df[column] = pd.to_datetime(df[column])
+        elif df[column].dtype != dtype:
+            df[column] = df[column].astype(dtype)
+    return df
+
+
+# Natija hajmini baholashda o'zgaruvchan uzunlikdagi ustunlar shuncha qatordan o'lchanadi
+PAYLOAD_SAMPLE_ROWS = 20
+# Belgilangan uzunlikdagi turlar (OID) — ular uchun internal_size haqiqiy o'lcham
+# (varchar(n) da esa internal_size = n, ya'ni maksimal uzunlik)
+FIXED_SIZE_TYPES = {16, 20, 21, 23, 700, 701, 1082, 1114, 1184}
+
+
+def _estimate_payload(description, records):
+    """
+    Olingan natija hajmi (bayt), taxminiy: qator kengligi × qatorlar soni.
+    Kenglik — FIXED_SIZE_TYPES uchun internal_size, qolganlari (varchar, text,
+    numeric, ...) uchun birinchi PAYLOAD_SAMPLE_ROWS qatordagi o'rtacha matn uzunligi.
+    """
+    if not records:
+        return 0
+    sample = records[:PAYLOAD_SAMPLE_ROWS]
+    width = 0
+    for i, col in enumerate(description):
+        if col.type_code in FIXED_SIZE_TYPES:
+            width += col.internal_size
+        else:
+            width += sum(len(str(row[i])) for row in sample if row[i] is not None) / len(sample)
+    return width * len(records)
+
+
+def _fetch(conn, query, params, timer):
+    """Kursor orqali o'qish — pd.read_sql_query bilan bir xil natija (Decimal → float)"""
+    with conn.cursor() as cur:
+        cur.execute(query, params)
+        description = cur.description
+        records = cur.fetchall()
+    timer.fetched(_estimate_payload(description, records))
+    columns = [col.name for col in description]
+    return pd.DataFrame.from_records(records, columns=columns, coerce_float=True)
+
+
+def _fetch_typed(conn, query, params, schema, timer):
+    """
+    COPY (so'rov) TO STDOUT CSV → pd.read_csv: ustunlar C parser da to'g'ridan-to'g'ri
+    sxemadagi turlarda quriladi (har bir qator uchun Python tuple / Decimal yo'q)
+    """
+    encoding = psycopg2.extensions.encodings[conn.encoding]
+    buffer = io.BytesIO()
+    with conn.cursor() as cur:
+        sql = cur.mogrify(query, params).decode(encoding).strip().rstrip(";")
+        cur.copy_expert(f"COPY ({sql}) TO STDOUT WITH (FORMAT csv, HEADER true)", buffer)
+    timer.fetched(buffer.getbuffer().nbytes)
+    buffer.seek(0)
+
+    dates = [column for column, dtype in schema.items() if dtype.startswith("datetime64")]
+    df = pd.read_csv(
+        buffer, encoding=encoding,
+        dtype={column: dtype for column, dtype in schema.items() if column not in dates},
+        parse_dates=dates, true_values=["t"], false_values=["f"],
+        keep_default_na=False, na_values=[""],  # faqat NULL (bo'sh maydon) → NaN
+    )
+    return apply_schema(df, schema)  # bo'sh natijada sana ustunlari ham datetime64 bo'lsin
+
+
+def _read_sql(query, params, timer, schema=None):
+    started = time.perf_counter()
+    with get_pool().connection() as conn:
+        timer.acquired(time.perf_counter() - started)
+        if schema:
+            return _fetch_typed(conn, query, params, schema, timer)
+        return _fetch(conn, query, params, timer)
+
+
+def execute_query(query, params=None, name=None, schema=None):
+    """
+    SELECT so'rov bajarish, DataFrame qaytaradi (READ_BACKEND=duckdb — avval snapshot dan).
+    name — query_metrics dagi nom (berilmasa queries.py dan matn bo'yicha topiladi)
+    schema — {ustun: dtype} (berilmasa queries.RESULT_SCHEMAS dan nom bo'yicha)
+    """
+    with query_metrics.timed(query, name) as timer:
+        schema = schema or RESULT_SCHEMAS.get(timer.name)
+        df = snapshot.try_query(query, params)
+        if df is not None:
+            if schema:
+                df = apply_schema(df, schema)
+            timer.result(df)
+            return df
+        try:
+            df = _read_sql(query, params, timer, schema)
+        except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+            if isinstance(e, psycopg2.extensions.QueryCanceledError):
+                raise
+            # Ulanish so'rov paytida uzilgan bo'lsa — yangi ulanish bilan bir marta qayta urinish
+            df = _read_sql(query, params, timer, schema)
+        timer.result(df)
         return df
-    finally:
-        conn.close()
 
 
-def execute_write(query, params=None):
+def execute_queries(batch, max_workers=None, return_exceptions=False):
+    """
+    Nomlangan so'rovlarni pool ulanishlarida parallel bajarish.
+    batch: {nom: (so'rov, parametrlar)} → {nom: DataFrame}
+    Thread lar soni DB_POOL_MAX bilan cheklanadi — umumiy vaqt taxminan eng
+    sekin so'rov vaqtiga teng bo'ladi.
+    return_exceptions=True bo'lsa xato bergan so'rov o'rnida Exception qaytadi.
+    """
+    if not batch:
+        return {}
+    get_pool()  # pool asosiy thread da yaratilsin
+    workers = min(len(batch), max_workers or DB_POOL_MAX)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            name: executor.submit(execute_query, query, params)
+            for name, (query, params) in batch.items()
+        }
+
+    results = {}
+    for name, future in futures.items():
+        try:
+            results[name] = future.result()
+        except Exception as e:
+            if not return_exceptions:
+                raise
+            results[name] = e
+    return results
+
+
+def execute_write(query, params=None, name=None):
     """INSERT/UPDATE/CREATE so'rov bajarish"""
+    with query_metrics.timed(query, name) as timer:
+        started = time.perf_counter()
+        with get_pool().connection() as conn:
+            timer.acquired(time.perf_counter() - started)
+            with conn.cursor() as cur:
+                cur.execute(query, params)
+                timer.rows = max(cur.rowcount, 0)
+            conn.commit()
+
+
+# ======================== DATA VERSIYASI ========================
+# Dashboard dagi raqamlar faqat sync / restore da o'zgaradi. Har biri
+# firebase_sync_log ga yozuv qo'shadi, app esa cache kalitlariga shu
+# versiyani qo'shadi — natijalar yangi ma'lumot kelguncha amal qiladi.
+
+def record_sync(sync_type, records_synced=0, status="success", error_message=None):
+    """Sync / restore ni firebase_sync_log ga yozish (data versiyasini oshiradi)"""
     conn = get_connection()
     try:
-        cur = conn.cursor()
-        cur.execute(query, params)
+        with conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO firebase_sync_log (sync_type, records_synced, status, error_message)
+                VALUES (%s, %s, %s, %s)
+            """, (sync_type, records_synced, status, error_message))
         conn.commit()
-        cur.close()
     finally:
         conn.close()
 
 
+def get_data_version():
+    """
+    Joriy data versiyasi — firebase_sync_log dagi oxirgi yozuv (id + vaqt).
+    Vaqt ham qo'shiladi: restore jadvalni qayta yaratganda id yana 1 dan boshlanadi.
+    """
+    with get_pool().connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT id, synced_at FROM firebase_sync_log ORDER BY id DESC LIMIT 1")
+            row = cur.fetchone()
+    return f"{row[0]}@{row[1]:%Y%m%d%H%M%S}" if row else "0"
+
+
 def create_tables():
     """
     RentMe bazasidan kerakli jadvallarni local bazada yaratish.
@@ -178,6 +475,17 @@ def create_tables():
         created_at TIMESTAMP DEFAULT NOW()
     );
 
+    -- ==================== ETL WATERMARKS ====================
+    -- Incremental sinxronlash uchun har bir jadvalning oxirgi nuqtasi
+    CREATE TABLE IF NOT EXISTS etl_watermarks (
+        table_name VARCHAR(100) PRIMARY KEY,
+        watermark_column VARCHAR(100),
+        last_value TIMESTAMP,
+        last_id BIGINT,
+        last_full_sync TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT NOW()
+    );
+
     -- ==================== FIREBASE SYNC LOG ====================
     CREATE TABLE IF NOT EXISTS firebase_sync_log (
         id BIGSERIAL PRIMARY KEY,
@@ -188,228 +496,141 @@ def create_tables():
         error_message TEXT
     );
     """)
+    create_rollup_tables(cur)
 
     conn.commit()
     cur.close()
     conn.close()
     print("✅ Barcha jadvallar yaratildi (PostgreSQL)!")
 
+    apply_indexes()
+
+
+# ======================== ANALITIK INDEKSLAR ========================
+# queries.py dagi so'rovlar deyarli har doim `is_deleted = FALSE` va sana
+# oralig'i / role / status bo'yicha filtrlaydi — shu uchun partial indekslar.
+# (nom, jadval, ustunlar va shart)
+ANALYTIC_INDEXES = [
+    ("idx_user_date_joined_live", '"user"', "(date_joined) WHERE is_deleted = FALSE"),
+    ("idx_user_role_date_joined_live", '"user"', "(role, date_joined) WHERE is_deleted = FALSE"),
+    ("idx_rentalrequest_created_live", "property_rentalrequest", "(created_at) WHERE is_deleted = FALSE"),
+    ("idx_rentalrequest_user_live", "property_rentalrequest", "(user_id_id) WHERE is_deleted = FALSE"),
+    ("idx_contract_created_live", "contract", "(created_at) WHERE is_deleted = FALSE"),
+    ("idx_contract_status_created_live", "contract", "(status, created_at) WHERE is_deleted = FALSE"),
+    ("idx_properties_created_live", "properties", "(created_at) WHERE is_deleted = FALSE"),
+    ("idx_properties_user_live", "properties", "(user_id) WHERE is_deleted = FALSE"),
+    ("idx_announcements_created_live", "property_announcements", "(created_at) WHERE is_deleted = FALSE"),
+]
+
+
+def apply_indexes(conn=None, concurrently=False):
+    """
+    ANALYTIC_INDEXES ni yaratish (mavjudlari tegilmaydi, bazada yo'q jadvallar
+    o'tkazib yuboriladi). concurrently=True — jonli bazada jadvalni
+    bloklamasdan qurish (migratsiya uchun).
+    Qaytaradi: {"created": [...], "skipped": [...], "failed": {nom: xato}}
+    """
+    own_conn = conn is None
+    conn = conn or get_connection()
+    autocommit = conn.autocommit
+    conn.autocommit = True  # har bir indeks alohida; CONCURRENTLY tranzaksiyada ishlamaydi
+    report = {"created": [], "skipped": [], "failed": {}}
+    try:
+        with conn.cursor() as cur:
+            for name, table, definition in ANALYTIC_INDEXES:
+                cur.execute("SELECT to_regclass(%s)", (table,))
+                if cur.fetchone()[0] is None:
+                    report["skipped"].append(name)
+                    continue
+                mode = "CONCURRENTLY " if concurrently else ""
+                try:
+                    cur.execute(f"CREATE INDEX {mode}IF NOT EXISTS {name} ON {table} {definition}")
+                    report["created"].append(name)
+                except psycopg2.Error as e:
+                    report["failed"][name] = str(e).strip()
+    finally:
+        conn.autocommit = autocommit
+        if own_conn:
+            conn.close()
+
+    print(f"🗂️  Indekslar: {len(report['created'])} ta tayyor, "
+          f"{len(report['skipped'])} ta o'tkazib yuborildi, {len(report['failed'])} ta xato")
+    for name, error in report["failed"].items():
+        print(f"   ⚠️ {name}: {error}")
+    return report
+
+
+def check_indexes(conn=None):
+    """
+    Indekslar holati (pg_stat_user_indexes bo'yicha):
+      missing — ANALYTIC_INDEXES dan bazada yo'q yoki yaroqsiz (invalid) bo'lganlari
+      unused  — statistika yig'ilgandan beri hech ishlatilmagan (idx_scan = 0)
+                indekslar; PRIMARY KEY / UNIQUE indekslar hisobga olinmaydi
+    """
+    own_conn = conn is None
+    conn = conn or get_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT s.relname, s.indexrelname, s.idx_scan,
+                       pg_size_pretty(pg_relation_size(s.indexrelid)),
+                       i.indisvalid, i.indisunique OR i.indisprimary
+                FROM pg_stat_user_indexes s
+                JOIN pg_index i ON i.indexrelid = s.indexrelid
+                WHERE s.schemaname = current_schema()
+                ORDER BY s.relname, s.indexrelname
+            """)
+            rows = cur.fetchall()
+        conn.rollback()
+    finally:
+        if own_conn:
+            conn.close()
+
+    valid = {index for _, index, _, _, is_valid, _ in rows if is_valid}
+    missing = [name for name, _, _ in ANALYTIC_INDEXES if name not in valid]
+    unused = [
+        {"table": table, "index": index, "size": size}
+        for table, index, scans, size, _, is_unique in rows
+        if scans == 0 and not is_unique
+    ]
+    return {"missing": missing, "unused": unused}
 
-def seed_demo_data():
+
+def seed_demo_data(scale=1):
     """
     Demo/test ma'lumotlarni yaratish (PostgreSQL uchun).
+    scale=1 — 200 user, 150 qurilma, 80 mulk ...; katta hajm uchun datagen.py.
     """
-    import random
-    import json
-    from datetime import datetime, timedelta
+    from datagen import generate
 
     conn = get_connection()
-    cur = conn.cursor()
-
-    # Mavjud ma'lumot borligini tekshirish
-    cur.execute("SELECT COUNT(*) FROM users")
-    count = cur.fetchone()[0]
-    if count > 0:
-        print(f"⚠️  Bazada {count} ta user allaqachon bor. Demo data qo'shilmadi.")
-        cur.close()
+    try:
+        generate(conn, scale)
+    finally:
         conn.close()
-        return
-
-    roles = ['ordinary', 'tenant', 'homeowner', 'realtor', 'admin', 'client']
-    genders = ['male', 'female', None]
-    device_types = ['android', 'ios']
-    statuses_device = ['online', 'offline']
-    property_types = ['apartment', 'house', 'studio', 'villa']
-    mod_statuses = ['pending', 'approved', 'rejected']
-    request_statuses = ['pending', 'approved', 'rejected']
-    contract_statuses = ['pending', 'approved', 'rejected']
-    contract_types = ['fixed', 'monthly', 'month_to_month', 'yearly']
-
-    now = datetime.now()
-
-    # --- USERS (200 ta) ---
-    print("👤 Userlar yaratilmoqda...")
-    for i in range(1, 201):
-        days_ago = random.randint(0, 365)
-        joined = now - timedelta(days=days_ago)
-        last_login = joined + timedelta(days=random.randint(0, days_ago)) if random.random() > 0.2 else None
-        role = random.choices(roles, weights=[30, 25, 25, 10, 5, 5])[0]
-
-        cur.execute("""
-            INSERT INTO users (id, phone_number, first_name, last_name, role, is_active,
-                             date_joined, last_login, birth_date, gender, is_identified)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """, (
-            i,
-            f"+99890{random.randint(1000000, 9999999)}",
-            f"User{i}",
-            f"Lastname{i}",
-            role,
-            random.random() > 0.05,
-            joined,
-            last_login,
-            (now - timedelta(days=random.randint(6570, 18250))).date() if random.random() > 0.3 else None,
-            random.choice(genders),
-            random.random() > 0.6,
-        ))
-
-    # --- DEVICES (150 ta) ---
-    print("📱 Qurilmalar yaratilmoqda...")
-    for i in range(1, 151):
-        user_id = random.randint(1, 200)
-        cur.execute("""
-            INSERT INTO devices (id, user_id, status, device_id, fcm_token, name, device_type, created_at, last_synced_at)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """, (
-            i,
-            user_id,
-            random.choice(statuses_device),
-            f"dev_{i}_{random.randint(1000, 9999)}",
-            f"fcm_token_{i}",
-            random.choice(["Samsung Galaxy S24", "iPhone 15", "Xiaomi 14", "Pixel 8", "iPhone 14 Pro", "Samsung A54", "Redmi Note 13"]),
-            random.choice(device_types),
-            now - timedelta(days=random.randint(0, 300)),
-            now - timedelta(hours=random.randint(0, 168)) if random.random() > 0.3 else None,
-        ))
-
-    # --- PROPERTIES (80 ta) ---
-    print("🏠 Mulklar yaratilmoqda...")
-    for i in range(1, 81):
-        cur.execute("""
-            INSERT INTO properties (id, user_id, title, type, status, area, n_rooms, floor, is_rentable, created_at)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """, (
-            i,
-            random.randint(1, 200),
-            json.dumps({'uz': f'Kvartira {i}', 'ru': f'Квартира {i}', 'en': f'Apartment {i}'}),
-            random.choice(property_types),
-            random.choice(['draft', 'completed']),
-            random.randint(25, 200),
-            random.randint(1, 6),
-            random.randint(1, 16),
-            random.random() > 0.2,
-            now - timedelta(days=random.randint(0, 300)),
-        ))
-
-    # --- ANNOUNCEMENTS (60 ta) ---
-    print("📢 E'lonlar yaratilmoqda...")
-    for i in range(1, 61):
-        cur.execute("""
-            INSERT INTO announcements (id, user_id, property_id, title, price, currency, moderated_status,
-                                      views, phone_views, is_available, is_moderated, created_at)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """, (
-            i,
-            random.randint(1, 200),
-            random.randint(1, 80),
-            json.dumps({'uz': f'E\'lon {i}', 'ru': f'Объявление {i}', 'en': f'Announcement {i}'}),
-            random.choice([500000, 800000, 1200000, 2000000, 3500000, 5000000, 300, 500, 800]),
-            random.choice(["UZS", "UZS", "UZS", "USD"]),
-            random.choice(mod_statuses),
-            random.randint(0, 500),
-            random.randint(0, 100),
-            random.random() > 0.15,
-            random.random() > 0.3,
-            now - timedelta(days=random.randint(0, 200)),
-        ))
-
-    # --- RENTAL REQUESTS (100 ta) ---
-    print("📋 Arizalar yaratilmoqda...")
-    for i in range(1, 101):
-        cur.execute("""
-            INSERT INTO rental_requests (id, property_id, announcement_id, user_id, sender_id, status, created_at)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
-        """, (
-            i,
-            random.randint(1, 80),
-            random.randint(1, 60),
-            random.randint(1, 200),
-            random.randint(1, 200),
-            random.choice(request_statuses),
-            now - timedelta(days=random.randint(0, 180)),
-        ))
-
-    # --- CONTRACTS (40 ta) ---
-    print("📝 Shartnomalar yaratilmoqda...")
-    for i in range(1, 41):
-        start = now - timedelta(days=random.randint(30, 365))
-        cur.execute("""
-            INSERT INTO contracts (id, rental_request_id, property_id, tenant_id, homeowner_id,
-                                  status, price, start_date, end_date, contract_type, created_at)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """, (
-            i,
-            random.randint(1, 100),
-            random.randint(1, 80),
-            random.randint(1, 200),
-            random.randint(1, 200),
-            random.choice(contract_statuses),
-            random.choice([500000, 800000, 1500000, 2500000, 4000000]),
-            start.date(),
-            (start + timedelta(days=random.choice([90, 180, 365]))).date(),
-            random.choice(contract_types),
-            start,
-        ))
-
-    # --- NOTIFICATIONS (50 ta) ---
-    print("🔔 Xabarlar yaratilmoqda...")
-    for i in range(1, 51):
-        sent = random.random() > 0.2
-        sent_at_val = now - timedelta(days=random.randint(0, 90)) if sent else None
-        cur.execute("""
-            INSERT INTO notifications (id, title, description, send_to_all, is_sent, sent_at, created_at)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
-        """, (
-            i,
-            f"Xabar {i}",
-            f"Bu test notification {i}",
-            random.random() > 0.8,
-            sent,
-            sent_at_val,
-            now - timedelta(days=random.randint(0, 90)),
-        ))
-
-    # --- USER NOTIFICATIONS (200 ta) ---
-    print("📬 User xabarlar yaratilmoqda...")
-    for i in range(1, 201):
-        is_read = random.random() > 0.4
-        cur.execute("""
-            INSERT INTO user_notifications (id, user_id, notification_id, is_read, read_at, created_at)
-            VALUES (%s, %s, %s, %s, %s, %s)
-        """, (
-            i,
-            random.randint(1, 200),
-            random.randint(1, 50),
-            is_read,
-            now - timedelta(hours=random.randint(0, 500)) if is_read else None,
-            now - timedelta(days=random.randint(0, 90)),
-        ))
-
-    # --- COMMENTS (30 ta) ---
-    print("💬 Sharhlar yaratilmoqda...")
-    for i in range(1, 31):
-        cur.execute("""
-            INSERT INTO comments (id, property_id, announcement_id, author_id, title, text, rating, is_approved, created_at)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """, (
-            i,
-            random.randint(1, 80),
-            random.randint(1, 60) if random.random() > 0.5 else None,
-            random.randint(1, 200),
-            f"Sharh {i}",
-            f"Bu test sharh matni {i}",
-            random.randint(1, 5),
-            random.random() > 0.1,
-            now - timedelta(days=random.randint(0, 150)),
-        ))
-
-    conn.commit()
-    cur.close()
-    conn.close()
-    print("✅ Demo ma'lumotlar muvaffaqiyatli yaratildi!")
 
 
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Dashboard bazasi: jadvallar va indekslar")
+    parser.add_argument("--migrate", action="store_true",
+                        help="Analitik indekslarni jonli bazada CONCURRENTLY yaratish")
+    parser.add_argument("--check-indexes", action="store_true",
+                        help="Yetishmayotgan va ishlatilmayotgan indekslar hisoboti")
+    args = parser.parse_args()
+
+    if args.migrate:
+        apply_indexes(concurrently=True)
+    if args.check_indexes:
+        status = check_indexes()
+        print(f"❓ Yetishmayotgan indekslar: {', '.join(status['missing']) or 'yo‘q'}")
+        print("💤 Ishlatilmayotgan indekslar:")
+        for item in status["unused"] or [{"table": "-", "index": "yo'q", "size": ""}]:
+            print(f"   {item['table']}.{item['index']} {item['size']}")
+    if args.migrate or args.check_indexes:
+        raise SystemExit(0)
+
     print("🔧 Jadvallar yaratilmoqda (PostgreSQL)...")
     try:
         create_tables()
@@ -0,0 +1,492 @@
+"""
+datagen.py — Masshtablanadigan sintetik ma'lumot generatori
+
+database.seed_demo_data va benchmark.py shu modul orqali ishlaydi.
+scale=1 — avvalgi demo hajmi (200 user, 150 qurilma, 80 mulk ...), scale=1000
+— 1000 barobar. Ustunlar NumPy bilan vektorli generatsiya qilinadi (matn
+ustunlari ham — np.char) va CHUNK_ROWS qatorlik bo'laklarda COPY bilan
+yoziladi — o'n millionlab qator daqiqalarda yuklanadi.
+
+Taqsimotlar va bog'liqliklar:
+  • ro'yxatdan o'tish — oxirgi 2 yil, yaqin kunlarda ko'proq (o'sish)
+  • mulk / e'lon egasi — homeowner yoki realtor; e'lon — mulk egasiniki
+  • ariza — tenant / ordinary / client dan, e'lon joylangandan keyin
+  • shartnoma — tasdiqlangan arizadan (ijarachi, mulk egasi, narx)
+  • user xabarlari — faqat yuborilgan xabarlar uchun
+  • har bir voqea vaqti uning "ota" yozuvidan keyin, ~3% qator o'chirilgan
+
+Jadval tuzilishi (layout):
+  • "dashboard"  — create_tables dagi jadvallar (users, devices, ...)
+  • "production" — production nomlari ("user", user_device, ... — etl.TABLES
+    dagi source), queries.py va benchmark.py shularni o'qiydi
+Faqat maqsad jadvalda mavjud ustunlar yoziladi.
+
+Ishlatish:
+    python datagen.py --scale 100
+    python datagen.py --scale 1000 --layout production --truncate
+"""
+
+import json
+import time
+import argparse
+import itertools
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from etl import TABLES
+
+# scale=1 dagi qatorlar soni (avvalgi seed_demo_data hajmi)
+BASE_COUNTS = {
+    "users": 200,
+    "devices": 150,
+    "properties": 80,
+    "announcements": 60,
+    "rental_requests": 100,
+    "contracts": 40,
+    "notifications": 50,
+    "user_notifications": 200,
+    "comments": 30,
+}
+
+LAYOUTS = ("dashboard", "production")
+# production layout: dashboard jadvali → production jadvali (etl.TABLES dagi source)
+PRODUCTION_TABLES = {spec["name"]: spec["source"] for spec in TABLES}
+# production da nomi farq qiladigan ustunlar (etl select_variants ga mos)
+PRODUCTION_COLUMNS = {
+    "rental_requests": {"user_id": "user_id_id", "sender_id": "sender_id_id"},
+}
+
+CHUNK_ROWS = 100_000
+COPY_BUFFER = 1024 * 1024
+SPAN_DAYS = 730
+DELETED_SHARE = 0.03
+
+ROLES = (["ordinary", "tenant", "homeowner", "realtor", "admin", "client"], [30, 25, 25, 10, 5, 5])
+OWNER_ROLES = ("homeowner", "realtor")
+RENTER_ROLES = ("tenant", "ordinary", "client")
+PROPERTY_TYPES = (["apartment", "house", "studio", "villa"], [60, 20, 15, 5])
+REQUEST_STATUSES = (["pending", "approved", "rejected", "canceled"], [30, 40, 25, 5])
+CONTRACT_STATUSES = (["pending", "approved", "rejected"], [25, 60, 15])
+CONTRACT_TYPES = (["fixed", "monthly", "month_to_month", "yearly"], [40, 30, 15, 15])
+MODERATION = (["pending", "approved", "rejected"], [20, 70, 10])
+DEVICE_NAMES = {
+    "android": ["Samsung Galaxy S24", "Xiaomi 14", "Pixel 8", "Samsung A54", "Redmi Note 13"],
+    "ios": ["iPhone 15", "iPhone 14 Pro", "iPhone 13"],
+}
+DISTRICTS = ["Chilonzor", "Yunusobod", "Mirzo Ulug'bek", "Sergeli", "Yakkasaroy", "Olmazor", "Shayxontohur"]
+
+
+def _strings(template, values):
+    """template dagi har bir {} o'rniga values — np.char bilan, qatorma-qator Python sikli yo'q"""
+    parts = template.split("{}")
+    text = np.asarray(values).astype(str)
+    out = np.char.add(parts[0], text)
+    for part in parts[1:-1]:
+        out = np.char.add(np.char.add(out, part), text)
+    return np.char.add(out, parts[-1]) if parts[-1] else out
+
+
+def table_counts(scale=1):
+    """Har bir jadval uchun qatorlar soni"""
+    return {table: max(1, int(round(count * scale))) for table, count in BASE_COUNTS.items()}
+
+
+class DataGenerator:
+    """
+    Ota jadvallarning kalit ustunlari (id, FK, vaqtlar) oldindan massiv sifatida
+    rejalashtiriladi, qolgan ustunlar bo'laklab (frames) hosil qilinadi.
+    """
+
+    def __init__(self, scale=1, seed=42, now=None):
+        self.rng = np.random.default_rng(seed)
+        self.now = np.datetime64(now or datetime.now().replace(microsecond=0), "s")
+        self.counts = table_counts(scale)
+        self._plan()
+
+    # ---------- yordamchilar ----------
+
+    def _choice(self, spec, n):
+        labels, weights = spec
+        p = np.asarray(weights, dtype=float)
+        return np.asarray(labels, dtype=object)[self.rng.choice(len(labels), n, p=p / p.sum())]
+
+    def _after(self, start, end=None):
+        """start dan end gacha (default — hozir) tasodifiy vaqt"""
+        end = self.now if end is None else end
+        span = np.maximum((end - start).astype(np.int64), 0)
+        return start + (self.rng.random(len(start)) * span).astype("timedelta64[s]")
+
+    def _pick(self, pool, n):
+        """pool dagi indekslardan tasodifiy tanlash (pool bo'sh bo'lsa — barchasi)"""
+        return pool[self.rng.integers(0, len(pool), n)]
+
+    def _deleted(self, n):
+        return self.rng.random(n) < DELETED_SHARE
+
+    @staticmethod
+    def _title(prefix, ids):
+        uz, ru, en = prefix
+        return _strings(json.dumps({"uz": f"{uz} {{}}", "ru": f"{ru} {{}}", "en": f"{en} {{}}"}), ids)
+
+    # ---------- reja (ota jadvallar kalitlari) ----------
+
+    def _plan(self):
+        rng, c = self.rng, self.counts
+
+        # Users: yaqin kunlarda ko'proq ro'yxatdan o'tish (o'sish egri chizig'i)
+        days_ago = SPAN_DAYS * rng.random(c["users"]) ** 2
+        self.user_joined = self.now - (days_ago * 86400).astype("timedelta64[s]")
+        self.user_role = self._choice(ROLES, c["users"])
+        all_users = np.arange(c["users"])
+        owners = np.flatnonzero(np.isin(self.user_role, OWNER_ROLES))
+        renters = np.flatnonzero(np.isin(self.user_role, RENTER_ROLES))
+        owners = owners if len(owners) else all_users
+        renters = renters if len(renters) else all_users
+
+        # Properties — homeowner / realtor larniki
+        self.prop_owner = self._pick(owners, c["properties"])
+        self.prop_created = self._after(self.user_joined[self.prop_owner])
+
+        # Announcements — mulkdan keyin, mulk egasi nomidan
+        self.ann_property = rng.integers(0, c["properties"], c["announcements"])
+        self.ann_created = self._after(self.prop_created[self.ann_property])
+        self.ann_currency = self._choice((["UZS", "USD"], [75, 25]), c["announcements"])
+        usd = self.ann_currency == "USD"
+        price = np.where(usd,
+                         np.round(rng.lognormal(6.2, 0.5, c["announcements"]), -1),
+                         np.round(rng.lognormal(15, 0.5, c["announcements"]), -4))
+        self.ann_price = np.maximum(price, np.where(usd, 100, 300_000))
+
+        # Rental requests — ijarachilardan, e'lon va user dan keyin
+        self.req_user = self._pick(renters, c["rental_requests"])
+        self.req_ann = rng.integers(0, c["announcements"], c["rental_requests"])
+        start = np.maximum(self.user_joined[self.req_user], self.ann_created[self.req_ann])
+        self.req_created = self._after(start)
+        self.req_status = self._choice(REQUEST_STATUSES, c["rental_requests"])
+
+        # Contracts — tasdiqlangan arizalardan (ko'pi bilan shu arizalar soni)
+        approved = np.flatnonzero(self.req_status == "approved")
+        n = min(c["contracts"], len(approved))
+        self.contract_req = np.sort(rng.choice(approved, n, replace=False))
+        self.counts["contracts"] = n
+
+        # Notifications
+        self.notif_created = self._after(np.full(c["notifications"], self.now - np.timedelta64(SPAN_DAYS, "D")))
+        self.notif_sent = rng.random(c["notifications"]) < 0.8
+        self.notif_sent_at = np.minimum(
+            self.notif_created + (rng.random(c["notifications"]) * 2 * 86400).astype("timedelta64[s]"),
+            self.now,
+        )
+
+    # ---------- jadvallar ----------
+
+    def users(self, lo, hi):
+        rng, n = self.rng, hi - lo
+        ids = np.arange(lo, hi) + 1
+        joined = self.user_joined[lo:hi]
+        has_login = rng.random(n) < 0.8
+        has_birth = rng.random(n) < 0.7
+        birth = (self.now - (rng.integers(6570, 18250, n) * 86400).astype("timedelta64[s]")).astype("datetime64[D]")
+        return pd.DataFrame({
+            "id": ids,
+            "phone_number": _strings("+99890{}", np.char.zfill(rng.integers(0, 10_000_000, n).astype(str), 7)),
+            "first_name": _strings("User{}", ids),
+            "last_name": _strings("Lastname{}", ids),
+            "role": self.user_role[lo:hi],
+            "is_active": rng.random(n) < 0.95,
+            "is_deleted": self._deleted(n),
+            "date_joined": joined,
+            "last_login": np.where(has_login, self._after(joined), np.datetime64("NaT")),
+            "created_at": joined,
+            "birth_date": np.where(has_birth, birth, np.datetime64("NaT")),
+            "gender": self._choice((["male", "female", None], [45, 40, 15]), n),
+            "is_identified": rng.random(n) < 0.4,
+            "has_score": rng.random(n) < 0.2,
+        })
+
+    def devices(self, lo, hi):
+        rng, n = self.rng, hi - lo
+        ids = np.arange(lo, hi) + 1
+        user = rng.integers(0, self.counts["users"], n)
+        created = self._after(self.user_joined[user])
+        device_type = self._choice((["android", "ios"], [65, 35]), n)
+        names = np.where(device_type == "ios",
+                         np.asarray(DEVICE_NAMES["ios"], dtype=object)[rng.integers(0, len(DEVICE_NAMES["ios"]), n)],
+                         np.asarray(DEVICE_NAMES["android"], dtype=object)[rng.integers(0, len(DEVICE_NAMES["android"]), n)])
+        recent = np.maximum(self.now - (rng.random(n) * 7 * 86400).astype("timedelta64[s]"), created)
+        return pd.DataFrame({
+            "id": ids,
+            "user_id": user + 1,
+            "status": self._choice((["online", "offline"], [30, 70]), n),
+            "device_id": _strings("dev_{}", ids),
+            "fcm_token": _strings("fcm_token_{}", ids),
+            "name": names,
+            "device_type": device_type,
+            "is_deleted": self._deleted(n),
+            "created_at": created,
+            "last_synced_at": np.where(rng.random(n) < 0.7, recent, np.datetime64("NaT")),
+        })
+
+    def properties(self, lo, hi):
+        rng, n = self.rng, hi - lo
+        ids = np.arange(lo, hi) + 1
+        prop_type = self._choice(PROPERTY_TYPES, n)
+        area = rng.lognormal(4.0, 0.4, n) * np.where(np.isin(prop_type, ("house", "villa")), 2.0, 1.0)
+        return pd.DataFrame({
+            "id": ids,
+            "user_id": self.prop_owner[lo:hi] + 1,
+            "title": self._title(("Kvartira", "Квартира", "Apartment"), ids),
+            "type": prop_type,
+            "status": self._choice((["draft", "completed"], [30, 70]), n),
+            "area": np.round(area, 1),
+            "address": np.asarray([f"Toshkent, {d} tumani" for d in DISTRICTS], dtype=object)[
+                rng.integers(0, len(DISTRICTS), n)],
+            "n_rooms": np.clip(np.round(area / 25), 1, 8).astype(int),
+            "floor": rng.integers(1, 17, n),
+            "is_rentable": rng.random(n) < 0.8,
+            "is_deleted": self._deleted(n),
+            "created_at": self.prop_created[lo:hi],
+        })
+
+    def announcements(self, lo, hi):
+        rng, n = self.rng, hi - lo
+        ids = np.arange(lo, hi) + 1
+        prop = self.ann_property[lo:hi]
+        moderation = self._choice(MODERATION, n)
+        views = np.floor(rng.lognormal(4, 1.2, n)).astype(np.int64)
+        return pd.DataFrame({
+            "id": ids,
+            "user_id": self.prop_owner[prop] + 1,
+            "property_id": prop + 1,
+            "title": self._title(("E'lon", "Объявление", "Announcement"), ids),
+            "price": self.ann_price[lo:hi],
+            "currency": self.ann_currency[lo:hi],
+            "moderated_status": moderation,
+            "views": views,
+            "phone_views": rng.binomial(views, 0.1),
+            "is_available": rng.random(n) < 0.85,
+            "is_moderated": moderation != "pending",
+            "is_deleted": self._deleted(n),
+            "created_at": self.ann_created[lo:hi],
+        })
+
+    def rental_requests(self, lo, hi):
+        n = hi - lo
+        ids = np.arange(lo, hi) + 1
+        ann = self.req_ann[lo:hi]
+        return pd.DataFrame({
+            "id": ids,
+            "property_id": self.ann_property[ann] + 1,
+            "announcement_id": ann + 1,
+            "user_id": self.req_user[lo:hi] + 1,
+            "sender_id": self.req_user[lo:hi] + 1,
+            "status": self.req_status[lo:hi],
+            "text": _strings("Ariza matni {}", ids),
+            "is_deleted": self._deleted(n),
+            "created_at": self.req_created[lo:hi],
+        })
+
+    def contracts(self, lo, hi):
+        rng, n = self.rng, hi - lo
+        req = self.contract_req[lo:hi]
+        ann = self.req_ann[req]
+        created = np.minimum(self.req_created[req] + (rng.random(n) * 7 * 86400).astype("timedelta64[s]"), self.now)
+        start = created.astype("datetime64[D]")
+        return pd.DataFrame({
+            "id": np.arange(lo, hi) + 1,
+            "rental_request_id": req + 1,
+            "property_id": self.ann_property[ann] + 1,
+            "tenant_id": self.req_user[req] + 1,
+            "homeowner_id": self.prop_owner[self.ann_property[ann]] + 1,
+            "status": self._choice(CONTRACT_STATUSES, n),
+            "price": self.ann_price[ann],
+            "start_date": start,
+            "end_date": start + rng.choice([90, 180, 365], n).astype("timedelta64[D]"),
+            "contract_type": self._choice(CONTRACT_TYPES, n),
+            "is_deleted": self._deleted(n),
+            "created_at": created,
+        })
+
+    def notifications(self, lo, hi):
+        rng, n = self.rng, hi - lo
+        ids = np.arange(lo, hi) + 1
+        sent = self.notif_sent[lo:hi]
+        return pd.DataFrame({
+            "id": ids,
+            "title": _strings("Xabar {}", ids),
+            "description": _strings("Bu test notification {}", ids),
+            "send_to_all": rng.random(n) < 0.2,
+            "is_sent": sent,
+            "sent_at": np.where(sent, self.notif_sent_at[lo:hi], np.datetime64("NaT")),
+            "is_deleted": self._deleted(n),
+            "created_at": self.notif_created[lo:hi],
+        })
+
+    def user_notifications(self, lo, hi):
+        rng, n = self.rng, hi - lo
+        sent = np.flatnonzero(self.notif_sent)
+        notif = self._pick(sent if len(sent) else np.arange(self.counts["notifications"]), n)
+        created = np.where(self.notif_sent[notif], self.notif_sent_at[notif], self.notif_created[notif])
+        is_read = rng.random(n) < 0.6
+        return pd.DataFrame({
+            "id": np.arange(lo, hi) + 1,
+            "user_id": rng.integers(0, self.counts["users"], n) + 1,
+            "notification_id": notif + 1,
+            "is_read": is_read,
+            "read_at": np.where(is_read, self._after(created), np.datetime64("NaT")),
+            "is_deleted": self._deleted(n),
+            "created_at": created,
+        })
+
+    def comments(self, lo, hi):
+        rng, n = self.rng, hi - lo
+        ids = np.arange(lo, hi) + 1
+        author = rng.integers(0, self.counts["users"], n)
+        ann = rng.integers(0, self.counts["announcements"], n)
+        rating = pd.array(self._choice(([1, 2, 3, 4, 5], [5, 5, 15, 35, 40]), n), dtype="Int64")
+        rating[rng.random(n) < 0.1] = pd.NA
+        return pd.DataFrame({
+            "id": ids,
+            "property_id": self.ann_property[ann] + 1,
+            "announcement_id": ann + 1,
+            "author_id": author + 1,
+            "title": _strings("Sharh {}", ids),
+            "text": _strings("Bu test sharh matni {}", ids),
+            "rating": rating,
+            "is_approved": rng.random(n) < 0.9,
+            "is_deleted": self._deleted(n),
+            "created_at": self._after(np.maximum(self.user_joined[author], self.ann_created[ann])),
+        })
+
+    def frames(self, table, chunk_rows=CHUNK_ROWS):
+        """Jadval qatorlari, chunk_rows lik DataFrame bo'laklarida"""
+        build = getattr(self, table)
+        total = self.counts[table]
+        for lo in range(0, total, chunk_rows):
+            yield build(lo, min(lo + chunk_rows, total))
+
+
+# ======================== YOZISH (COPY) ========================
+
+def _target_columns(cur, table):
+    cur.execute("""
+        SELECT column_name FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = %s
+    """, (table.strip('"'),))
+    return {row[0] for row in cur.fetchall()}
+
+
+class CsvStream:
+    """
+    DataFrame bo'laklari → COPY uchun CSV oqimi (copy_expert read(size) chaqiradi).
+    Butun jadval bitta COPY bilan yoziladi: server oldingi bo'lakni yozayotganda
+    keyingisi generatsiya qilinadi.
+    """
+
+    def __init__(self, frames):
+        self._frames = frames
+        self._buf = ""
+        self._pos = 0
+        self.rows = 0
+
+    def read(self, size=-1):
+        while self._pos >= len(self._buf):
+            df = next(self._frames, None)
+            if df is None:
+                return ""
+            self._buf, self._pos = df.to_csv(index=False, header=False), 0
+            self.rows += len(df)
+        end = len(self._buf) if size is None or size < 0 else self._pos + size
+        chunk = self._buf[self._pos:end]
+        self._pos += len(chunk)
+        return chunk
+
+
+def _layout_frames(frames, renames, columns):
+    """Ustunlarni layout bo'yicha nomlash va faqat maqsad jadvalda borlarini qoldirish"""
+    for df in frames:
+        df = df.rename(columns=renames)
+        yield df[[col for col in df.columns if col in columns]]
+
+
+def _copy_table(cur, target, frames):
+    """Jadvalning barcha bo'laklarini bitta COPY bilan yozish. Qaytaradi: qatorlar soni"""
+    first = next(frames, None)
+    if first is None:
+        return 0
+    stream = CsvStream(itertools.chain([first], frames))
+    cur.copy_expert(
+        f"COPY {target} ({', '.join(first.columns)}) FROM STDIN WITH (FORMAT csv)",
+        stream,
+        size=COPY_BUFFER,
+    )
+    return stream.rows
+
+
+def generate(conn, scale=1, layout="dashboard", seed=42, truncate=False, chunk_rows=CHUNK_ROWS):
+    """
+    Sintetik ma'lumotni layout jadvallariga yozish (bitta tranzaksiya).
+    Jadvallarda ma'lumot bo'lsa va truncate=False bo'lsa — hech narsa yozilmaydi.
+    Qaytaradi: {jadval: qatorlar soni}
+    """
+    if layout not in LAYOUTS:
+        raise ValueError(f"Noma'lum layout: {layout} ({', '.join(LAYOUTS)})")
+    targets = {
+        table: PRODUCTION_TABLES[table] if layout == "production" else table
+        for table in BASE_COUNTS
+    }
+    renames = PRODUCTION_COLUMNS if layout == "production" else {}
+
+    started = time.time()
+    generator = DataGenerator(scale, seed)
+    written = {}
+    with conn.cursor() as cur:
+        columns = {}
+        for table, target in targets.items():
+            columns[table] = _target_columns(cur, target)
+            if not columns[table]:
+                raise RuntimeError(f"Jadval topilmadi: {target} (avval create_tables / sxemani yarating)")
+
+        if truncate:
+            cur.execute(f"TRUNCATE {', '.join(targets.values())}")
+        else:
+            cur.execute(f"SELECT COUNT(*) FROM {targets['users']}")
+            count = cur.fetchone()[0]
+            if count > 0:
+                print(f"⚠️  Bazada {count} ta user allaqachon bor. Demo data qo'shilmadi.")
+                conn.rollback()
+                return written
+
+        for table, target in targets.items():
+            table_started = time.time()
+            frames = _layout_frames(generator.frames(table, chunk_rows), renames.get(table, {}), columns[table])
+            written[table] = _copy_table(cur, target, frames)
+            elapsed = time.time() - table_started
+            print(f"   📥 {target}: {written[table]:,} qator ({elapsed:.1f}s)")
+    conn.commit()
+
+    total = sum(written.values())
+    elapsed = time.time() - started
+    print(f"✅ Sintetik ma'lumot: {total:,} qator, {elapsed:.1f}s ({total / max(elapsed, 1e-9):,.0f} qator/s)")
+    return written
+
+
+if __name__ == "__main__":
+    from database import get_connection
+
+    parser = argparse.ArgumentParser(description="Sintetik ma'lumot generatori")
+    parser.add_argument("--scale", type=float, default=1,
+                        help="Hajm koeffitsienti (1 = 200 user, 1000 = 200 000 user)")
+    parser.add_argument("--layout", choices=LAYOUTS, default="dashboard",
+                        help="dashboard — create_tables jadvallari, production — production nomlari")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--truncate", action="store_true", help="Mavjud ma'lumotni o'chirib yozish")
+    args = parser.parse_args()
+
+    conn = get_connection()
+    try:
+        generate(conn, args.scale, args.layout, args.seed, args.truncate)
+    finally:
+        conn.close()
@@ -4,17 +4,141 @@ etl.py — Extract, Transform, Load (Production PostgreSQL → Dashboard Postgre
 Production bazadan ma'lumotni olib, Dashboard (Neon.tech) bazasiga UPSERT qiladi.
 Mavjud ma'lumotlar yangilanadi, yangilari qo'shiladi.
 
+Yuklash rejimlari:
+  - "bulk" (default): qatorlar COPY bilan vaqtinchalik jadvalga yoziladi, so'ng
+    har bir jadval uchun bitta INSERT ... SELECT ... ON CONFLICT bajariladi.
+  - "row": eski usul — har bir qator uchun alohida INSERT ... ON CONFLICT
+    (taqqoslash uchun saqlangan).
+
+Incremental rejim (incremental=True):
+  Har bir jadval uchun oxirgi ko'chirilgan (watermark, id) juftligi Dashboard
+  bazadagi `etl_watermarks` jadvalida saqlanadi va faqat undan keyingi qatorlar
+  olinadi. Watermark ustuni — source jadvalda `updated_at` bo'lsa o'sha
+  (NULL bo'lsa `created_at` olinadi), bo'lmasa `created_at`. Kechikkan yangilanishlarni ushlash uchun har
+  ETL_FULL_RECONCILE_HOURS soatda to'liq sinxronlash bajariladi.
+
+Extract bosqichi server-side (named) cursor bilan ETL_BATCH_SIZE qatorlik
+bo'laklarda o'qiydi va har bir bo'lak darhol yuklanadi — xotira jadval
+hajmidan qat'i nazar o'zgarmas qoladi.
+
+Jadvallar ETL_MAX_WORKERS ta thread da, har biri o'z ulanishlari va
+tranzaksiyasi bilan parallel sinxronlanadi. FK tartibi (`depends_on`)
+saqlanadi: masalan, users tugamaguncha devices/properties boshlanmaydi.
+
+Sinxronlashdan keyin rollup jadvallar (rollups.py) yangilanadi — ular restore
+qilingan production jadvallaridan hisoblanadi (rollups.ROLLUP_SOURCES).
+
 Qo'llanilishi:
   1. Streamlit Cloud: app.py dagi "Sinxronlash" tugmasi orqali
-  2. Lokal: `python etl.py`
+  2. Lokal: `python etl.py [--mode bulk|row] [--incremental] [--batch-size N] [--workers N]`
 """
 
+import io
 import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 import psycopg2
 from psycopg2.extras import RealDictCursor
 
-from config import SOURCE_DB_CONFIG
-from database import create_tables, get_connection as get_target_connection
+from config import SOURCE_DB_CONFIG, ETL_FULL_RECONCILE_HOURS, ETL_BATCH_SIZE, ETL_MAX_WORKERS
+from database import create_tables, record_sync, get_connection as get_target_connection
+from rollups import refresh_rollups
+import snapshot
+
+LOAD_MODES = ("bulk", "row")
+
+# ======================== JADVALLAR ========================
+# name    — Dashboard bazadagi jadval
+# source  — Production bazadagi jadval
+# columns — ko'chiriladigan ustunlar (tartib muhim)
+# update  — ON CONFLICT (id) da yangilanadigan ustunlar
+# json    — JSONB ustunlar (json.dumps qilinadi)
+# select_variants — source dagi ustunlar nomi farq qilsa, navbat bilan sinab ko'riladi
+# watermark — incremental rejim uchun ustun (source da updated_at bo'lmasa)
+# depends_on — FK bo'yicha oldin yuklanishi kerak bo'lgan jadvallar (create_tables ga mos)
+TABLES = [
+    {
+        "name": "users",
+        "source": '"user"',
+        "columns": ["id", "phone_number", "first_name", "last_name", "role", "is_active", "is_deleted",
+                    "date_joined", "last_login", "created_at", "birth_date", "gender", "is_identified"],
+        "update": ["phone_number", "first_name", "last_name", "role", "is_active",
+                   "last_login", "gender", "is_identified"],
+        "depends_on": [],
+    },
+    {
+        "name": "devices",
+        "source": "user_device",
+        "columns": ["id", "user_id", "status", "device_id", "fcm_token", "name", "device_type",
+                    "is_deleted", "created_at", "last_synced_at"],
+        "update": ["status", "fcm_token", "name", "last_synced_at"],
+        "depends_on": ["users"],
+    },
+    {
+        "name": "properties",
+        "source": "properties",
+        "columns": ["id", "user_id", "title", "type", "status", "area", "address", "n_rooms", "floor",
+                    "is_rentable", "is_deleted", "created_at"],
+        "update": ["title", "status", "area", "is_rentable"],
+        "json": ["title"],
+        "depends_on": ["users"],
+    },
+    {
+        "name": "announcements",
+        "source": "property_announcements",
+        "columns": ["id", "user_id", "property_id", "title", "price", "currency", "moderated_status",
+                    "views", "phone_views", "is_available", "is_moderated", "is_deleted", "created_at"],
+        "update": ["price", "moderated_status", "views", "phone_views", "is_available", "is_moderated"],
+        "json": ["title"],
+        "depends_on": ["users", "properties"],
+    },
+    {
+        "name": "rental_requests",
+        "source": "property_rentalrequest",
+        "columns": ["id", "property_id", "announcement_id", "user_id", "sender_id",
+                    "status", "text", "is_deleted", "created_at"],
+        "update": ["status", "text"],
+        "select_variants": [
+            "id, property_id, announcement_id, user_id_id as user_id, "
+            "sender_id_id as sender_id, status, text, is_deleted, created_at",
+            "id, property_id, announcement_id, user_id, sender_id, "
+            "status, text, is_deleted, created_at",
+        ],
+        "depends_on": ["users"],
+    },
+    {
+        "name": "contracts",
+        "source": "contract",
+        "columns": ["id", "rental_request_id", "property_id", "tenant_id", "homeowner_id",
+                    "status", "price", "start_date", "end_date", "contract_type", "is_deleted", "created_at"],
+        "update": ["status", "price", "start_date", "end_date"],
+        "depends_on": [],
+    },
+    {
+        "name": "notifications",
+        "source": "notification",
+        "columns": ["id", "title", "description", "send_to_all", "is_sent", "sent_at",
+                    "is_deleted", "created_at"],
+        "update": ["is_sent", "sent_at"],
+        "depends_on": [],
+    },
+    {
+        "name": "user_notifications",
+        "source": "user_notification",
+        "columns": ["id", "user_id", "notification_id", "is_read", "read_at", "is_deleted", "created_at"],
+        "update": ["is_read", "read_at"],
+        "depends_on": ["users", "notifications"],
+    },
+    {
+        "name": "comments",
+        "source": "comment",
+        "columns": ["id", "property_id", "announcement_id", "author_id", "title", "text",
+                    "rating", "is_approved", "is_deleted", "created_at"],
+        "update": ["rating", "is_approved", "text"],
+        "depends_on": ["users"],
+    },
+]
 
 
 def get_source_connection():
@@ -27,239 +151,384 @@ def get_source_connection():
     return psycopg2.connect(**SOURCE_DB_CONFIG)
 
 
-def sync_data():
+# ======================== WATERMARKS ========================
+
+def _watermark_column(source_cur, spec):
+    """Source jadvalda updated_at bo'lsa — o'sha, aks holda spec dagi ustun"""
+    source_cur.execute("""
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = 'public' AND table_name = %s AND column_name = 'updated_at'
+    """, (spec["source"].strip('"'),))
+    if source_cur.fetchone():
+        return "updated_at"
+    return spec.get("watermark", "created_at")
+
+
+def _watermark_expr(column):
+    """Watermark ifodasi: updated_at hech qachon yangilanmagan (NULL) qatorlar uchun created_at"""
+    if column == "updated_at":
+        return "COALESCE(updated_at, created_at)"
+    return column
+
+
+def _get_watermark(target_cur, table_name):
     """
-    Production → Dashboard sinxronlash (UPSERT).
-    Qaytaradi: dict {jadval_nomi: ko'chirilgan_soni} yoki xatolik matni.
+    Saqlangan watermark: (ustun, qiymat, id, full_reconcile_vaqti_keldimi) yoki None.
+    Vaqt bazada solishtiriladi — last_full_sync bazaning NOW() i bilan yozilgan.
     """
-    results = {}
+    target_cur.execute("""
+        SELECT watermark_column, last_value, last_id,
+               COALESCE(NOW() - last_full_sync >= %s * INTERVAL '1 hour', TRUE)
+        FROM etl_watermarks WHERE table_name = %s
+    """, (ETL_FULL_RECONCILE_HOURS, table_name))
+    return target_cur.fetchone()
+
+
+def _save_watermark(target_cur, table_name, column, value, last_id, full_sync):
+    """Watermark ni yangilash (ma'lumot bilan bitta tranzaksiyada)"""
+    target_cur.execute("""
+        INSERT INTO etl_watermarks (table_name, watermark_column, last_value, last_id, last_full_sync, updated_at)
+        VALUES (%s, %s, %s, %s, CASE WHEN %s THEN NOW() END, NOW())
+        ON CONFLICT (table_name) DO UPDATE SET
+            watermark_column=EXCLUDED.watermark_column,
+            last_value=COALESCE(EXCLUDED.last_value, etl_watermarks.last_value),
+            last_id=COALESCE(EXCLUDED.last_id, etl_watermarks.last_id),
+            last_full_sync=COALESCE(EXCLUDED.last_full_sync, etl_watermarks.last_full_sync),
+            updated_at=NOW()
+    """, (table_name, column, value, last_id, full_sync))
+
+
+def _needs_full_sync(watermark, column):
+    """Watermark yo'q, ustun o'zgargan yoki full reconcile vaqti kelgan bo'lsa — True"""
+    if watermark is None:
+        return True
+    saved_column, last_value, _, reconcile_due = watermark
+    return saved_column != column or last_value is None or reconcile_due
+
+
+# ======================== EXTRACT ========================
+
+def _open_stream(source_conn, spec, wm_column, since, batch_size):
+    """
+    Server-side (named) cursor ochish — qatorlar bazada qoladi va
+    batch_size bo'laklab olinadi.
+    since=(qiymat, id) berilsa — faqat undan keyingi qatorlar.
+    Har bir qatorda qo'shimcha `_watermark` maydoni bo'ladi.
+    """
+    variants = spec.get("select_variants") or [", ".join(spec["columns"])]
+    where = "is_deleted = false"
+    params = None
+    wm_expr = _watermark_expr(wm_column)
+    if since is not None:
+        where += f" AND ({wm_expr}, id) > (%s, %s)"
+        params = since
+    for i, select in enumerate(variants):
+        cur = source_conn.cursor(name=f"etl_{spec['name']}", cursor_factory=RealDictCursor)
+        cur.itersize = batch_size
+        try:
+            cur.execute(
+                f"SELECT {select}, {wm_expr} AS _watermark FROM {spec['source']} WHERE {where}",
+                params,
+            )
+            return cur
+        except psycopg2.Error:
+            source_conn.rollback()
+            if i == len(variants) - 1:
+                raise
 
-    # 1. Source ga ulanish
+
+def _extract_batches(source_conn, spec, wm_column, since, batch_size):
+    """Production jadvaldan o'chirilmagan qatorlarni batch lab qaytaruvchi generator"""
+    cur = _open_stream(source_conn, spec, wm_column, since, batch_size)
     try:
-        source_conn = get_source_connection()
-    except Exception as e:
-        return {"error": f"Production bazaga ulanib bo'lmadi: {e}"}
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        cur.close()
+
+
+def _row_values(spec, row):
+    """Qatorni ustunlar tartibida tuple ga aylantirish (JSONB → matn)"""
+    json_columns = spec.get("json", ())
+    values = []
+    for col in spec["columns"]:
+        value = row[col]
+        if col in json_columns:
+            value = json.dumps(value) if value else None
+        values.append(value)
+    return tuple(values)
+
+
+def _upsert_sql(spec, source_sql):
+    """INSERT ... ON CONFLICT (id) DO UPDATE so'rovi"""
+    cols = ", ".join(spec["columns"])
+    updates = ", ".join(f"{col}=EXCLUDED.{col}" for col in spec["update"])
+    return f"INSERT INTO {spec['name']} ({cols}) {source_sql} ON CONFLICT (id) DO UPDATE SET {updates}"
+
+
+# ======================== LOAD ========================
+
+def _load_per_row(target_cur, spec, rows):
+    """Har bir qator uchun alohida INSERT (eski rejim)"""
+    placeholders = ",".join(["%s"] * len(spec["columns"]))
+    sql = _upsert_sql(spec, f"VALUES ({placeholders})")
+    for row in rows:
+        target_cur.execute(sql, _row_values(spec, row))
+
+
+def _copy_text(value):
+    """Qiymatni COPY text formatiga o'tkazish"""
+    if value is None:
+        return r"\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value)
+    return (str(value)
+            .replace("\\", "\\\\")
+            .replace("\t", "\\t")
+            .replace("\n", "\\n")
+            .replace("\r", "\\r"))
+
+
+def _load_bulk(target_cur, spec, rows):
+    """COPY → vaqtinchalik jadval → bitta set-based UPSERT"""
+    stage = f"_stage_{spec['name']}"
+    cols = ", ".join(spec["columns"])
+
+    target_cur.execute(f"CREATE TEMP TABLE IF NOT EXISTS {stage} (LIKE {spec['name']}) ON COMMIT DROP")
+    target_cur.execute(f"TRUNCATE {stage}")
+
+    buf = io.StringIO()
+    for row in rows:
+        buf.write("\t".join(_copy_text(v) for v in _row_values(spec, row)))
+        buf.write("\n")
+    buf.seek(0)
+    target_cur.copy_expert(f"COPY {stage} ({cols}) FROM STDIN", buf)
+
+    target_cur.execute(_upsert_sql(spec, f"SELECT {cols} FROM {stage}"))
+
+
+def _sync_table(source_conn, source_cur, target_cur, spec, mode, incremental, batch_size):
+    """
+    Bitta jadvalni sinxronlash: har bir batch o'qilishi bilan darhol yuklanadi,
+    shuning uchun xotira jadval hajmiga bog'liq emas.
+    Qaytaradi: (qatorlar soni, sekundlar, "full" | "incremental")
+    """
+    started = time.perf_counter()
+    wm_column = _watermark_column(source_cur, spec)
+    watermark = _get_watermark(target_cur, spec["name"])
+    full_sync = not incremental or _needs_full_sync(watermark, wm_column)
+    since = None if full_sync else (watermark[1], watermark[2])
+
+    count = 0
+    last_mark = None
+    for rows in _extract_batches(source_conn, spec, wm_column, since, batch_size):
+        if mode == "row":
+            _load_per_row(target_cur, spec, rows)
+        else:
+            _load_bulk(target_cur, spec, rows)
+        count += len(rows)
+
+        marks = [(r["_watermark"], r["id"]) for r in rows if r["_watermark"] is not None]
+        if marks:
+            last_mark = max(marks) if last_mark is None else max(last_mark, max(marks))
+
+    # Source dagi o'qish tranzaksiyasini yopish (snapshot ni ushlab turmaslik uchun)
+    source_conn.rollback()
 
-    # 2. Target ga ulanish + jadvallar yaratish
+    last_value, last_id = last_mark or (None, None)
+    _save_watermark(target_cur, spec["name"], wm_column, last_value, last_id, full_sync)
+
+    return count, time.perf_counter() - started, "full" if full_sync else "incremental"
+
+
+def _run_table(spec, mode, incremental, batch_size):
+    """Bitta jadvalni o'zining source/target ulanishlari bilan sinxronlash (worker thread)"""
+    source_conn = get_source_connection()
     try:
-        create_tables()
         target_conn = get_target_connection()
-    except Exception as e:
+    except Exception:
         source_conn.close()
-        return {"error": f"Dashboard bazaga ulanib bo'lmadi: {e}"}
+        raise
 
     source_cur = source_conn.cursor(cursor_factory=RealDictCursor)
     target_cur = target_conn.cursor()
-
     try:
-        # ==================== USERS ====================
-        source_cur.execute("""
-            SELECT id, phone_number, first_name, last_name, role, is_active, is_deleted,
-                   date_joined, last_login, created_at, birth_date, gender, is_identified
-            FROM "user" WHERE is_deleted = false
-        """)
-        users = source_cur.fetchall()
-        for u in users:
-            target_cur.execute("""
-                INSERT INTO users (id, phone_number, first_name, last_name, role, is_active, is_deleted,
-                                   date_joined, last_login, created_at, birth_date, gender, is_identified)
-                VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-                ON CONFLICT (id) DO UPDATE SET
-                    phone_number=EXCLUDED.phone_number, first_name=EXCLUDED.first_name,
-                    last_name=EXCLUDED.last_name, role=EXCLUDED.role, is_active=EXCLUDED.is_active,
-                    last_login=EXCLUDED.last_login, gender=EXCLUDED.gender, is_identified=EXCLUDED.is_identified
-            """, (u['id'], u['phone_number'], u['first_name'], u['last_name'], u['role'],
-                  u['is_active'], u['is_deleted'], u['date_joined'], u['last_login'],
-                  u['created_at'], u['birth_date'], u['gender'], u['is_identified']))
-        results["users"] = len(users)
-
-        # ==================== DEVICES ====================
-        source_cur.execute("""
-            SELECT id, user_id, status, device_id, fcm_token, name, device_type,
-                   is_deleted, created_at, last_synced_at
-            FROM user_device WHERE is_deleted = false
-        """)
-        devices = source_cur.fetchall()
-        for d in devices:
-            target_cur.execute("""
-                INSERT INTO devices (id, user_id, status, device_id, fcm_token, name, device_type,
-                                     is_deleted, created_at, last_synced_at)
-                VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-                ON CONFLICT (id) DO UPDATE SET
-                    status=EXCLUDED.status, fcm_token=EXCLUDED.fcm_token, name=EXCLUDED.name,
-                    last_synced_at=EXCLUDED.last_synced_at
-            """, (d['id'], d['user_id'], d['status'], d['device_id'], d['fcm_token'],
-                  d['name'], d['device_type'], d['is_deleted'], d['created_at'], d['last_synced_at']))
-        results["devices"] = len(devices)
-
-        # ==================== PROPERTIES ====================
-        source_cur.execute("""
-            SELECT id, user_id, title, type, status, area, address, n_rooms, floor,
-                   is_rentable, is_deleted, created_at
-            FROM properties WHERE is_deleted = false
-        """)
-        props = source_cur.fetchall()
-        for p in props:
-            title_json = json.dumps(p['title']) if p['title'] else None
-            target_cur.execute("""
-                INSERT INTO properties (id, user_id, title, type, status, area, address, n_rooms, floor,
-                                        is_rentable, is_deleted, created_at)
-                VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-                ON CONFLICT (id) DO UPDATE SET
-                    title=EXCLUDED.title, status=EXCLUDED.status, area=EXCLUDED.area,
-                    is_rentable=EXCLUDED.is_rentable
-            """, (p['id'], p['user_id'], title_json, p['type'], p['status'], p['area'],
-                  p['address'], p['n_rooms'], p['floor'], p['is_rentable'], p['is_deleted'], p['created_at']))
-        results["properties"] = len(props)
-
-        # ==================== ANNOUNCEMENTS ====================
-        source_cur.execute("""
-            SELECT id, user_id, property_id, title, price, currency, moderated_status,
-                   views, phone_views, is_available, is_moderated, is_deleted, created_at
-            FROM property_announcements WHERE is_deleted = false
-        """)
-        anns = source_cur.fetchall()
-        for a in anns:
-            title_json = json.dumps(a['title']) if a['title'] else None
-            target_cur.execute("""
-                INSERT INTO announcements (id, user_id, property_id, title, price, currency, moderated_status,
-                                           views, phone_views, is_available, is_moderated, is_deleted, created_at)
-                VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-                ON CONFLICT (id) DO UPDATE SET
-                    price=EXCLUDED.price, moderated_status=EXCLUDED.moderated_status,
-                    views=EXCLUDED.views, phone_views=EXCLUDED.phone_views,
-                    is_available=EXCLUDED.is_available, is_moderated=EXCLUDED.is_moderated
-            """, (a['id'], a['user_id'], a['property_id'], title_json, a['price'], a['currency'],
-                  a['moderated_status'], a['views'], a['phone_views'], a['is_available'],
-                  a['is_moderated'], a['is_deleted'], a['created_at']))
-        results["announcements"] = len(anns)
-
-        # ==================== RENTAL REQUESTS ====================
-        try:
-            source_cur.execute("""
-                SELECT id, property_id, announcement_id, user_id_id as user_id,
-                       sender_id_id as sender_id, status, text, is_deleted, created_at
-                FROM property_rentalrequest WHERE is_deleted = false
-            """)
-        except psycopg2.Error:
-            source_conn.rollback()
-            source_cur.execute("""
-                SELECT id, property_id, announcement_id, user_id, sender_id,
-                       status, text, is_deleted, created_at
-                FROM property_rentalrequest WHERE is_deleted = false
-            """)
-
-        reqs = source_cur.fetchall()
-        for r in reqs:
-            target_cur.execute("""
-                INSERT INTO rental_requests (id, property_id, announcement_id, user_id, sender_id,
-                                             status, text, is_deleted, created_at)
-                VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s)
-                ON CONFLICT (id) DO UPDATE SET
-                    status=EXCLUDED.status, text=EXCLUDED.text
-            """, (r['id'], r['property_id'], r['announcement_id'], r['user_id'],
-                  r['sender_id'], r['status'], r['text'], r['is_deleted'], r['created_at']))
-        results["rental_requests"] = len(reqs)
-
-        # ==================== CONTRACTS ====================
-        source_cur.execute("""
-            SELECT id, rental_request_id, property_id, tenant_id, homeowner_id,
-                   status, price, start_date, end_date, contract_type, is_deleted, created_at
-            FROM contract WHERE is_deleted = false
-        """)
-        conts = source_cur.fetchall()
-        for c in conts:
-            target_cur.execute("""
-                INSERT INTO contracts (id, rental_request_id, property_id, tenant_id, homeowner_id,
-                                       status, price, start_date, end_date, contract_type, is_deleted, created_at)
-                VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-                ON CONFLICT (id) DO UPDATE SET
-                    status=EXCLUDED.status, price=EXCLUDED.price,
-                    start_date=EXCLUDED.start_date, end_date=EXCLUDED.end_date
-            """, (c['id'], c['rental_request_id'], c['property_id'], c['tenant_id'],
-                  c['homeowner_id'], c['status'], c['price'], c['start_date'],
-                  c['end_date'], c['contract_type'], c['is_deleted'], c['created_at']))
-        results["contracts"] = len(conts)
-
-        # ==================== NOTIFICATIONS ====================
-        source_cur.execute("""
-            SELECT id, title, description, send_to_all, is_sent, sent_at, is_deleted, created_at
-            FROM notification WHERE is_deleted = false
-        """)
-        notifs = source_cur.fetchall()
-        for n in notifs:
-            target_cur.execute("""
-                INSERT INTO notifications (id, title, description, send_to_all, is_sent, sent_at,
-                                           is_deleted, created_at)
-                VALUES (%s,%s,%s,%s,%s,%s,%s,%s)
-                ON CONFLICT (id) DO UPDATE SET
-                    is_sent=EXCLUDED.is_sent, sent_at=EXCLUDED.sent_at
-            """, (n['id'], n['title'], n['description'], n['send_to_all'],
-                  n['is_sent'], n['sent_at'], n['is_deleted'], n['created_at']))
-        results["notifications"] = len(notifs)
-
-        # ==================== USER NOTIFICATIONS ====================
-        source_cur.execute("""
-            SELECT id, user_id, notification_id, is_read, read_at, is_deleted, created_at
-            FROM user_notification WHERE is_deleted = false
-        """)
-        unotifs = source_cur.fetchall()
-        for u in unotifs:
-            target_cur.execute("""
-                INSERT INTO user_notifications (id, user_id, notification_id, is_read, read_at,
-                                                is_deleted, created_at)
-                VALUES (%s,%s,%s,%s,%s,%s,%s)
-                ON CONFLICT (id) DO UPDATE SET
-                    is_read=EXCLUDED.is_read, read_at=EXCLUDED.read_at
-            """, (u['id'], u['user_id'], u['notification_id'], u['is_read'],
-                  u['read_at'], u['is_deleted'], u['created_at']))
-        results["user_notifications"] = len(unotifs)
-
-        # ==================== COMMENTS ====================
-        source_cur.execute("""
-            SELECT id, property_id, announcement_id, author_id, title, text, rating,
-                   is_approved, is_deleted, created_at
-            FROM comment WHERE is_deleted = false
-        """)
-        comments = source_cur.fetchall()
-        for c in comments:
-            target_cur.execute("""
-                INSERT INTO comments (id, property_id, announcement_id, author_id, title, text,
-                                      rating, is_approved, is_deleted, created_at)
-                VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-                ON CONFLICT (id) DO UPDATE SET
-                    rating=EXCLUDED.rating, is_approved=EXCLUDED.is_approved, text=EXCLUDED.text
-            """, (c['id'], c['property_id'], c['announcement_id'], c['author_id'],
-                  c['title'], c['text'], c['rating'], c['is_approved'],
-                  c['is_deleted'], c['created_at']))
-        results["comments"] = len(comments)
-
-        # Commit
+        result = _sync_table(source_conn, source_cur, target_cur, spec, mode, incremental, batch_size)
         target_conn.commit()
-
-    except Exception as e:
+        return result
+    except Exception:
         target_conn.rollback()
-        results["error"] = str(e)
+        raise
     finally:
         source_cur.close()
         target_cur.close()
         source_conn.close()
         target_conn.close()
 
+
+def _run_pipeline(run, max_workers):
+    """
+    TABLES ni thread pool da bajarish. Jadval faqat depends_on dagi barcha
+    jadvallar muvaffaqiyatli tugagach boshlanadi; bog'liq jadval xato bersa,
+    u o'tkazib yuboriladi.
+    Qaytaradi: ({jadval: run() natijasi}, {jadval: xatolik matni})
+    """
+    pending = {spec["name"]: spec for spec in TABLES}
+    running = {}
+    done = {}
+    failed = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while pending or running:
+            for name, spec in list(pending.items()):
+                deps = spec.get("depends_on", [])
+                failed_deps = [d for d in deps if d in failed]
+                if failed_deps:
+                    failed[name] = f"o'tkazib yuborildi ({', '.join(failed_deps)} yuklanmadi)"
+                    del pending[name]
+                elif all(d in done for d in deps) and len(running) < max_workers:
+                    running[pool.submit(run, spec)] = name
+                    del pending[name]
+
+            if not running:
+                # Bajarib bo'lmaydigan bog'liqliklar (masalan, sikl)
+                for name in pending:
+                    failed[name] = "bog'liqliklar bajarilmadi"
+                break
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                try:
+                    done[name] = future.result()
+                except Exception as e:
+                    failed[name] = str(e)
+
+    return done, failed
+
+
+def sync_data(mode="bulk", incremental=False, batch_size=None, max_workers=None):
+    """
+    Production → Dashboard sinxronlash (UPSERT).
+    mode: "bulk" (COPY + set-based UPSERT) yoki "row" (har qator alohida).
+    incremental: True bo'lsa faqat oxirgi watermark dan keyingi qatorlar olinadi.
+    batch_size: server-side cursor dan bir martada olinadigan qatorlar
+    (default: ETL_BATCH_SIZE).
+    max_workers: bir vaqtda sinxronlanadigan jadvallar soni (default: ETL_MAX_WORKERS).
+    Har bir jadval alohida ulanish va tranzaksiyada yuklanadi, FK tartibi
+    (depends_on) saqlanadi.
+    Qaytaradi: dict {jadval_nomi: ko'chirilgan_soni, "rows_per_sec": {...},
+    "sync_types": {jadval_nomi: "full" | "incremental"}} yoki xatolik matni.
+    """
+    if mode not in LOAD_MODES:
+        return {"error": f"Noma'lum rejim: {mode} (mumkin: {', '.join(LOAD_MODES)})"}
+    batch_size = batch_size or ETL_BATCH_SIZE
+    max_workers = max(1, max_workers or ETL_MAX_WORKERS)
+
+    # 1. Source ga ulanishni tekshirish
+    try:
+        get_source_connection().close()
+    except Exception as e:
+        return {"error": f"Production bazaga ulanib bo'lmadi: {e}"}
+
+    # 2. Target da jadvallar yaratish
+    try:
+        create_tables()
+    except Exception as e:
+        return {"error": f"Dashboard bazaga ulanib bo'lmadi: {e}"}
+
+    # 3. Jadvallarni parallel sinxronlash
+    done, failed = _run_pipeline(
+        lambda spec: _run_table(spec, mode, incremental, batch_size), max_workers
+    )
+
+    results = {}
+    rates = {}
+    sync_types = {}
+    for spec in TABLES:
+        if spec["name"] not in done:
+            continue
+        count, elapsed, sync_type = done[spec["name"]]
+        results[spec["name"]] = count
+        rates[spec["name"]] = round(count / elapsed, 1) if elapsed > 0 else 0.0
+        sync_types[spec["name"]] = sync_type
+    results["rows_per_sec"] = rates
+    results["sync_types"] = sync_types
+
+    # 4. Rollup jadvallarni yangilash. Rollup lar yuqorida yozilgan jadvallardan emas,
+    #    production nomli jadvallardan hisoblanadi (rollups.ROLLUP_SOURCES): odatda oxirgi
+    #    ROLLUP_LOOKBACK_DAYS kun; lookback dan eski qatorlar updated_at bo'yicha o'zgargan
+    #    bo'lsa — to'liq. Manba jadvallar yo'q bazada refresh o'tkazib yuboriladi.
+    try:
+        target_conn = get_target_connection()
+        try:
+            refresh_rollups(target_conn)
+        finally:
+            target_conn.close()
+    except Exception as e:
+        failed["rollups"] = str(e)
+
+    # 5. DuckDB o'qish backend i uchun Parquet snapshot — versiya oshishidan oldin,
+    #    yangi versiya cache lari eski snapshot dan to'ldirilmasligi uchun
+    if snapshot.enabled():
+        try:
+            snapshot.export_snapshot()
+        except Exception as e:
+            failed["snapshot"] = str(e)
+
+    # 6. Data versiyasini oshirish — dashboard cache lari yangi ma'lumotga o'tadi
+    try:
+        record_sync(
+            "etl", sum(results[name] for name in done),
+            status="partial" if failed else "success",
+            error_message="; ".join(f"{name}: {msg}" for name, msg in failed.items()) or None,
+        )
+    except Exception as e:
+        failed["data_version"] = str(e)
+    else:
+        # 7. Yangi versiya uchun dashboard cache ini fonda isitish
+        from warmup import start_background_warmup
+        start_background_warmup()
+
+    if failed:
+        results["error"] = "; ".join(f"{name}: {msg}" for name, msg in failed.items())
+
     return results
 
 
 # ==================== CLI MODE ====================
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Production → Dashboard sinxronlash")
+    parser.add_argument("--mode", choices=LOAD_MODES, default="bulk",
+                        help="Yuklash rejimi: bulk (COPY) yoki row (har qator alohida)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Faqat oxirgi sinxronlashdan keyingi qatorlarni olish")
+    parser.add_argument("--batch-size", type=int, default=ETL_BATCH_SIZE,
+                        help="Server-side cursor dan bir martada olinadigan qatorlar soni")
+    parser.add_argument("--workers", type=int, default=ETL_MAX_WORKERS,
+                        help="Bir vaqtda sinxronlanadigan jadvallar soni")
+    args = parser.parse_args()
+
     print("⚠️  DIQQAT! Bu skript Production → Dashboard bazaga ma'lumot sinxronlaydi.")
     confirm = input("Davom etamizmi? (ha/yo'q): ")
     if confirm.lower() in ['ha', 'yes', 'y']:
-        print("\n🔄 Sinxronlash boshlanmoqda...")
-        result = sync_data()
+        print(f"\n🔄 Sinxronlash boshlanmoqda (rejim: {args.mode})...")
+        result = sync_data(mode=args.mode, incremental=args.incremental,
+                           batch_size=args.batch_size, max_workers=args.workers)
 
         if "error" in result:
             print(f"\n❌ Xatolik: {result['error']}")
         else:
             print("\n✅ Sinxronlash muvaffaqiyatli!")
+            rates = result.pop("rows_per_sec", {})
+            sync_types = result.pop("sync_types", {})
             for table, count in result.items():
-                print(f"  📋 {table}: {count} ta yozuv")
+                print(f"  📋 {table}: {count} ta yozuv ({rates.get(table, 0)} qator/s, {sync_types.get(table)})")
+
+        from warmup import wait_for_warmup
+        wait_for_warmup()
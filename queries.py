@@ -15,6 +15,21 @@ user_notifications -> user_notification
 comments -> comment
 """
 
+from datetime import date, timedelta
+
+# Dashboard so'rovlari o'qiydigan production jadvallari (restore_db --include dashboard)
+DASHBOARD_TABLES = [
+    "user",
+    "user_device",
+    "properties",
+    "property_announcements",
+    "property_rentalrequest",
+    "contract",
+    "notification",
+    "user_notification",
+    "comment",
+]
+
 # ==================== UMUMIY STATISTIKA ====================
 
 TOTAL_USERS = """
@@ -330,6 +345,12 @@ WHERE u.role = 'tenant' AND u.is_deleted = FALSE AND u.date_joined < CURRENT_DAT
 AND r.id IS NULL
 """
 
+# rollups.growth_gaps dan (sync / restore da yangilanadi) — bo'limlar shuni o'qiydi
+GROWTH_GAPS = """
+SELECT homeowners_without_property, tenants_without_requests, tenants_without_requests_prev
+FROM growth_gaps WHERE id = 1
+"""
+
 # 3. Engagement
 DAILY_REQUESTS_AVG = """
 SELECT COUNT(*) / NULLIF(COUNT(DISTINCT DATE(created_at)), 0) as avg_daily
@@ -358,20 +379,31 @@ FROM current_period, prev_period
 """
 
 # 4. Charts Data
+# Trendlar rollups.daily_metrics dan o'qiladi (ETL yangilaydi) — xom jadvallar JOIN qilinmaydi
 DAILY_TRENDS_CHART = """
 SELECT
     DATE(series.day) as date,
-    COUNT(DISTINCT r.id) as requests,
-    COUNT(DISTINCT c.id) as contracts,
-    COUNT(DISTINCT u.id) as new_users
+    COALESCE(SUM(m.count) FILTER (WHERE m.metric = 'requests'), 0)::bigint as requests,
+    COALESCE(SUM(m.count) FILTER (WHERE m.metric = 'contracts'), 0)::bigint as contracts,
+    COALESCE(SUM(m.count) FILTER (WHERE m.metric = 'new_users'), 0)::bigint as new_users
 FROM generate_series(CURRENT_DATE - INTERVAL '30 days', CURRENT_DATE, '1 day'::interval) as series(day)
-LEFT JOIN property_rentalrequest r ON DATE(r.created_at) = DATE(series.day) AND r.is_deleted = FALSE
-LEFT JOIN contract c ON DATE(c.created_at) = DATE(series.day) AND c.is_deleted = FALSE
-LEFT JOIN "user" u ON DATE(u.date_joined) = DATE(series.day) AND u.is_deleted = FALSE
+LEFT JOIN daily_metrics m ON m.day = DATE(series.day)
 GROUP BY series.day
 ORDER BY series.day
 """
 
+# 5. Retention
+# rollups.cohort_retention dan (ETL yangilaydi): kogorta × davr, cohort_size — davr 0
+COHORT_RETENTION = """
+SELECT cohort, period, active_users,
+       FIRST_VALUE(active_users) OVER (PARTITION BY cohort ORDER BY period) as cohort_size
+FROM cohort_retention
+WHERE grain = %(grain)s AND cohort >= %(since)s
+ORDER BY cohort, period
+"""
+
+# Retention heatmap dagi kogortalar soni (oxirgi N hafta / oy)
+COHORT_COUNT = 12
 
 # ==================== DATE-FILTERED QUERIES ====================
 # Bu so'rovlar %s parametr sifatida (start_date, end_date) qabul qiladi
@@ -429,13 +461,11 @@ def daily_trends_in_range():
     return """
     SELECT
         DATE(series.day) as date,
-        COUNT(DISTINCT r.id) as requests,
-        COUNT(DISTINCT c.id) as contracts,
-        COUNT(DISTINCT u.id) as new_users
+        COALESCE(SUM(m.count) FILTER (WHERE m.metric = 'requests'), 0)::bigint as requests,
+        COALESCE(SUM(m.count) FILTER (WHERE m.metric = 'contracts'), 0)::bigint as contracts,
+        COALESCE(SUM(m.count) FILTER (WHERE m.metric = 'new_users'), 0)::bigint as new_users
     FROM generate_series(%s::date, %s::date, '1 day'::interval) as series(day)
-    LEFT JOIN property_rentalrequest r ON DATE(r.created_at) = DATE(series.day) AND r.is_deleted = FALSE
-    LEFT JOIN contract c ON DATE(c.created_at) = DATE(series.day) AND c.is_deleted = FALSE
-    LEFT JOIN "user" u ON DATE(u.date_joined) = DATE(series.day) AND u.is_deleted = FALSE
+    LEFT JOIN daily_metrics m ON m.day = DATE(series.day)
     GROUP BY series.day
     ORDER BY series.day
     """
@@ -474,3 +504,194 @@ def requests_by_status_in_range():
     GROUP BY status
     """
 
+
+# ==================== KPI (HAR JADVAL UCHUN BITTA SKAN) ====================
+# Kartochkalar uchun barcha hisoblar bitta so'rovda COUNT(*) FILTER bilan olinadi.
+# Parametrlar nomli: %(start)s, %(end)s, %(prev_start)s, %(prev_end)s
+
+def kpi_params(start_date, end_date, prev_start, prev_end):
+    """KPI so'rovlari uchun nomli parametrlar"""
+    return {
+        "start": str(start_date),
+        "end": str(end_date),
+        "prev_start": str(prev_start),
+        "prev_end": str(prev_end),
+    }
+
+def period_params(start_date, end_date):
+    """
+    Sana filtri → (date_params, kpi_params). Oldingi davr — xuddi shuncha
+    kunlik, start_date dan oldin (app.py va warmup.py bir xil cache kaliti oladi).
+    """
+    range_days = (end_date - start_date).days
+    prev_start = start_date - timedelta(days=range_days + 1)
+    prev_end = start_date - timedelta(days=1)
+    return (str(start_date), str(end_date)), kpi_params(start_date, end_date, prev_start, prev_end)
+
+def cohort_params(grain="month", today=None):
+    """Retention heatmap parametrlari: oxirgi COHORT_COUNT ta hafta / oy kogortasi"""
+    today = today or date.today()
+    if grain == "week":
+        since = today - timedelta(days=today.weekday() + 7 * (COHORT_COUNT - 1))
+    else:
+        months = today.year * 12 + today.month - 1 - (COHORT_COUNT - 1)
+        since = date(months // 12, months % 12 + 1, 1)
+    return {"grain": grain, "since": str(since)}
+
+def user_kpis():
+    return """
+    SELECT
+        COUNT(*) as total,
+        COUNT(*) FILTER (WHERE is_active = TRUE) as active,
+        COUNT(*) FILTER (WHERE role = 'tenant') as tenants,
+        COUNT(*) FILTER (WHERE role = 'homeowner') as homeowners,
+        COUNT(*) FILTER (WHERE is_identified = TRUE) as identified,
+        COUNT(*) FILTER (WHERE has_score = TRUE) as scored,
+        COUNT(*) FILTER (WHERE date_joined >= %(start)s AND date_joined <= %(end)s) as new_users,
+        COUNT(*) FILTER (WHERE date_joined >= %(prev_start)s AND date_joined < %(prev_end)s) as prev_new_users,
+        COUNT(*) FILTER (WHERE role = 'homeowner' AND date_joined >= %(start)s AND date_joined <= %(end)s) as new_homeowners,
+        COUNT(*) FILTER (WHERE role = 'tenant' AND date_joined >= %(start)s AND date_joined <= %(end)s) as new_tenants
+    FROM "user" WHERE is_deleted = FALSE
+    """
+
+def request_kpis():
+    return """
+    SELECT
+        COUNT(*) as total,
+        COUNT(*) FILTER (WHERE created_at >= %(start)s AND created_at <= %(end)s) as current,
+        COUNT(*) FILTER (WHERE created_at >= %(prev_start)s AND created_at < %(prev_end)s) as previous
+    FROM property_rentalrequest WHERE is_deleted = FALSE
+    """
+
+def contract_kpis():
+    return """
+    SELECT
+        COUNT(*) FILTER (WHERE created_at >= %(start)s AND created_at <= %(end)s) as current,
+        COUNT(*) FILTER (WHERE created_at >= %(prev_start)s AND created_at < %(prev_end)s) as previous,
+        COALESCE(SUM(price) FILTER (WHERE status = 'approved' AND created_at >= %(start)s AND created_at <= %(end)s), 0) as revenue,
+        COALESCE(SUM(price) FILTER (WHERE status = 'approved' AND created_at >= %(prev_start)s AND created_at < %(prev_end)s), 0) as prev_revenue
+    FROM contract WHERE is_deleted = FALSE
+    """
+
+def property_kpis():
+    return """
+    SELECT
+        COUNT(*) FILTER (WHERE created_at >= %(start)s AND created_at <= %(end)s) as current,
+        COUNT(*) FILTER (WHERE created_at >= %(prev_start)s AND created_at < %(prev_end)s) as previous
+    FROM properties WHERE is_deleted = FALSE
+    """
+
+
+# ==================== BO'LIMLAR UCHUN SO'ROVLAR TO'PLAMI ====================
+# Har bir bo'lim kerakli so'rovlarni oldindan e'lon qiladi: {nom: (so'rov, parametrlar)}.
+# database.execute_queries ularni parallel bajaradi.
+
+def overview_batch(date_params, kpi):
+    return {
+        "user_kpi": (user_kpis(), kpi),
+        "request_kpi": (request_kpis(), kpi),
+        "contract_kpi": (contract_kpis(), kpi),
+        "property_kpi": (property_kpis(), kpi),
+        "trends": (daily_trends_in_range(), date_params),
+    }
+
+def users_batch(date_params, kpi):
+    return {
+        "user_kpi": (user_kpis(), kpi),
+        "by_role": (USERS_BY_ROLE, None),
+        "gender": (USERS_GENDER_DISTRIBUTION, None),
+    }
+
+def homeowners_batch(date_params, kpi):
+    return {
+        "user_kpi": (user_kpis(), kpi),
+        "growth_gaps": (GROWTH_GAPS, None),
+        "properties_by_status": (PROPERTIES_BY_STATUS, None),
+    }
+
+def tenants_batch(date_params, kpi):
+    return {
+        "user_kpi": (user_kpis(), kpi),
+        "growth_gaps": (GROWTH_GAPS, None),
+        "requests_by_status": (requests_by_status_in_range(), date_params),
+    }
+
+def cohort_batch(grain):
+    return {
+        "cohorts": (COHORT_RETENTION, cohort_params(grain)),
+    }
+
+
+# ==================== NATIJA SXEMALARI ====================
+# database.execute_query shu so'rovlarni COPY ... TO STDOUT orqali o'qiydi va
+# DataFrame ustunlarini to'g'ridan-to'g'ri shu turlarda quradi: {nom: {ustun: dtype}}.
+# Nom — konstanta yoki funksiya nomi (query_metrics.query_name).
+# NULL bo'lishi mumkin bo'lgan butun sonlar — "Int64"; app.py .map().fillna()
+# qiladigan ustunlar (role, status: USERS_BY_ROLE, requests_by_status_in_range) category emas.
+
+_DAILY_TRENDS = {
+    "date": "datetime64[ns]",
+    "requests": "int32",
+    "contracts": "int32",
+    "new_users": "int32",
+}
+_DAILY_COUNT = {"date": "datetime64[ns]", "count": "int32"}
+
+RESULT_SCHEMAS = {
+    "DAILY_TRENDS_CHART": _DAILY_TRENDS,
+    "daily_trends_in_range": _DAILY_TRENDS,
+    "USERS_REGISTRATION_TREND": _DAILY_COUNT,
+    "PROPERTIES_CREATED_TREND": _DAILY_COUNT,
+    "ANNOUNCEMENTS_CREATED_TREND": _DAILY_COUNT,
+    "REQUESTS_TREND": _DAILY_COUNT,
+    "NOTIFICATIONS_TREND": _DAILY_COUNT,
+    "USERS_REGISTRATION_MONTHLY": {"month": "datetime64[ns]", "count": "int32"},
+    "TOP_VIEWED_ANNOUNCEMENTS": {
+        "id": "int64",
+        "views": "Int64",
+        "phone_views": "Int64",
+        "price": "float64",
+        "currency": "category",
+        "created_at": "datetime64[ns]",
+    },
+    "POPULAR_DEVICE_NAMES": {"name": "category", "count": "int32"},
+    "DEVICES_BY_TYPE": {"device_type": "category", "count": "int32"},
+    "DEVICES_BY_STATUS": {"status": "category", "count": "int32"},
+    "USERS_GENDER_DISTRIBUTION": {"gender": "category", "count": "int32"},
+    "PROPERTIES_BY_TYPE": {"type": "category", "count": "int32"},
+    "PROPERTIES_BY_STATUS": {"status": "category", "count": "int32"},
+    "ANNOUNCEMENTS_BY_MODERATION": {"moderated_status": "category", "count": "int32"},
+    "CONTRACTS_BY_STATUS": {"status": "category", "count": "int32"},
+    "CONTRACTS_BY_TYPE": {"contract_type": "category", "count": "int32"},
+    "COMMENTS_RATING_DISTRIBUTION": {"rating": "int32", "count": "int32"},
+    "COHORT_RETENTION": {
+        "cohort": "datetime64[ns]",
+        "period": "int32",
+        "active_users": "int32",
+        "cohort_size": "int32",
+    },
+}
+
+
+# ==================== BARCHA SO'ROVLAR RO'YXATI ====================
+
+def all_queries():
+    """
+    queries.py dagi barcha so'rovlar: {nom: SQL} — konstantalar va argumentsiz
+    funksiyalar (query_metrics nomlari va benchmark.py uchun)
+    """
+    result = {}
+    for name, value in globals().items():
+        if name.startswith("_"):
+            continue
+        if name.isupper() and isinstance(value, str):
+            if "SELECT" in value:
+                result[name] = value
+        elif callable(value) and getattr(value, "__module__", None) == __name__ and name != "all_queries":
+            try:
+                text = value()
+            except TypeError:
+                continue  # parametrli yordamchi funksiyalar (kpi_params, *_batch)
+            if isinstance(text, str):
+                result[name] = text
+    return result
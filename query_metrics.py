@@ -0,0 +1,221 @@
+"""
+query_metrics.py — So'rovlar vaqti va sekin so'rovlar statistikasi
+
+database.execute_query / execute_write har bir bajarilishni shu yerga yozadi:
+  • umumiy vaqt (wall time) va pool dan ulanish olish vaqti
+  • qaytgan qatorlar soni va bazadan olingan natija hajmi (bayt) — COPY CSV
+    bufer yoki qiymatlar matni uzunligi; snapshot (DuckDB) dan o'qishda o'lchanmaydi
+  • app.safe_query darajasida cache hit / miss (xotira yoki disk → hit)
+
+So'rov nomi — queries.py dagi konstanta yoki funksiya nomi (matn bo'yicha
+topiladi), topilmasa so'rov boshi. Har bir nom uchun oxirgi
+QUERY_METRICS_WINDOW ta o'lchov xotirada saqlanadi — p50/p95/p99 shulardan
+hisoblanadi. SLOW_QUERY_MS dan sekin so'rovlar alohida jurnalga yoziladi.
+
+Statistika jarayon bo'yicha (process-wide), restart da nolga tushadi.
+"""
+
+import time
+import threading
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from config import QUERY_METRICS_WINDOW, SLOW_QUERY_MS
+
+PERCENTILES = (50, 95, 99)
+
+_lock = threading.Lock()
+_local = threading.local()
+_names = None
+_stats = {}
+_slow_log = deque(maxlen=100)
+
+
+class QueryStats:
+    """Bitta nomli so'rov uchun oxirgi o'lchovlar va hisoblagichlar"""
+
+    def __init__(self):
+        self.wall_ms = deque(maxlen=QUERY_METRICS_WINDOW)
+        self.acquire_ms = deque(maxlen=QUERY_METRICS_WINDOW)
+        self.rows = deque(maxlen=QUERY_METRICS_WINDOW)
+        self.bytes = deque(maxlen=QUERY_METRICS_WINDOW)
+        self.calls = 0
+        self.errors = 0
+        self.cache = defaultdict(int)
+
+
+class QueryTimer:
+    """execute_query ichida to'ldiriladigan o'lchov (ulanish vaqti, natija hajmi)"""
+
+    def __init__(self, name):
+        self.name = name
+        self.acquire = 0.0
+        self.rows = 0
+        self.bytes = None  # o'lchanmagan (snapshot, execute_write)
+
+    def acquired(self, seconds):
+        # Qayta urinishda ikkinchi ulanish vaqti ham qo'shiladi
+        self.acquire += seconds
+
+    def fetched(self, nbytes):
+        # Qayta urinishda oxirgi urinish hajmi
+        self.bytes = int(nbytes)
+
+    def result(self, df):
+        self.rows = len(df)
+
+
+# ======================== SO'ROV NOMLARI ========================
+
+def _normalize(query):
+    return " ".join(query.split())
+
+
+def _build_names():
+    """queries.py: so'rov matni → konstanta / funksiya nomi"""
+    import queries
+
+    return {_normalize(text): name for name, text in queries.all_queries().items()}
+
+
+def query_name(query):
+    """So'rov matnidan uning queries.py dagi nomi (topilmasa — so'rov boshi)"""
+    global _names
+    if _names is None:
+        try:
+            _names = _build_names()
+        except Exception:
+            _names = {}
+    text = _normalize(query)
+    return _names.get(text) or text[:60]
+
+
+# ======================== YOZISH ========================
+
+def _get_stats(name):
+    stats = _stats.get(name)
+    if stats is None:
+        stats = _stats[name] = QueryStats()
+    return stats
+
+
+@contextmanager
+def timed(query, name=None):
+    """
+    So'rov bajarilishini o'lchash:
+        with timed(query) as timer:
+            ... timer.acquired(sekund); timer.result(df)
+    """
+    timer = QueryTimer(name or query_name(query))
+    started = time.perf_counter()
+    error = None
+    try:
+        yield timer
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        record(timer, (time.perf_counter() - started) * 1000, error)
+
+
+def record(timer, wall_ms, error=None):
+    with _lock:
+        stats = _get_stats(timer.name)
+        stats.calls += 1
+        if error is not None:
+            stats.errors += 1
+        else:
+            stats.wall_ms.append(wall_ms)
+            stats.acquire_ms.append(timer.acquire * 1000)
+            stats.rows.append(timer.rows)
+            if timer.bytes is not None:
+                stats.bytes.append(timer.bytes)
+        if wall_ms >= SLOW_QUERY_MS or error is not None:
+            _slow_log.append({
+                "vaqt": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "so'rov": timer.name,
+                "ms": round(wall_ms, 1),
+                "ulanish_ms": round(timer.acquire * 1000, 1),
+                "qatorlar": timer.rows,
+                "xato": f"{type(error).__name__}: {error}" if error is not None else "",
+            })
+
+
+@contextmanager
+def cache_lookup(query_texts):
+    """
+    safe_query darajasidagi cache hit / miss: blok ichida cache_miss() bilan
+    belgilanmagan so'rovlar hit (xotira yoki disk) hisoblanadi.
+    """
+    _local.missed = set()
+    try:
+        yield
+    finally:
+        missed, _local.missed = _local.missed, None
+        outcomes = [(query_name(q), "miss" if q in missed else "hit") for q in query_texts]
+        with _lock:
+            for name, outcome in outcomes:
+                _get_stats(name).cache[outcome] += 1
+
+
+def cache_miss(query):
+    """So'rov cache da topilmadi — bazadan olinmoqda (cache_lookup bloki ichida)"""
+    missed = getattr(_local, "missed", None)
+    if missed is not None:
+        missed.add(query)
+
+
+# ======================== HISOBOT ========================
+
+def _percentiles(values):
+    if not values:
+        return [None] * len(PERCENTILES)
+    return [round(float(v), 1) for v in np.percentile(list(values), PERCENTILES)]
+
+
+def summary():
+    """Har bir so'rov bo'yicha p50/p95/p99 va hisoblagichlar (eng sekin p95 birinchi)"""
+    with _lock:
+        snapshot = {
+            name: (list(s.wall_ms), list(s.acquire_ms), list(s.rows), list(s.bytes),
+                   s.calls, s.errors, dict(s.cache))
+            for name, s in _stats.items()
+        }
+
+    rows = []
+    for name, (wall, acquire, n_rows, n_bytes, calls, errors, cache) in snapshot.items():
+        p50, p95, p99 = _percentiles(wall)
+        lookups = cache.get("hit", 0) + cache.get("miss", 0)
+        rows.append({
+            "so'rov": name,
+            "bajarildi": calls,
+            "xatolar": errors,
+            "p50_ms": p50,
+            "p95_ms": p95,
+            "p99_ms": p99,
+            "ulanish_p95_ms": _percentiles(acquire)[1],
+            "o'rtacha_qatorlar": round(float(np.mean(n_rows)), 1) if n_rows else None,
+            "o'rtacha_kb": round(float(np.mean(n_bytes)) / 1024, 1) if n_bytes else None,
+            "cache_hit_%": round(cache.get("hit", 0) / lookups * 100) if lookups else None,
+        })
+    df = pd.DataFrame(rows)
+    if df.empty:
+        return df
+    return df.sort_values("p95_ms", ascending=False, na_position="last").reset_index(drop=True)
+
+
+def slow_queries():
+    """SLOW_QUERY_MS dan sekin (yoki xato bergan) so'rovlar — oxirgilari birinchi"""
+    with _lock:
+        entries = list(_slow_log)
+    return pd.DataFrame(entries[::-1])
+
+
+def reset():
+    with _lock:
+        _stats.clear()
+        _slow_log.clear()
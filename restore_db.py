@@ -2,17 +2,43 @@
 restore_db.py — SQL Dump faylidan bazani tiklash (Advanced Parser)
 
 Production bazasidan olingan `rent_db.sql` faylini Dashboard (Neon.tech) bazasiga yuklaydi.
+Siqilgan dump (`.sql.gz`, `.sql.zst`), pg_dump custom/directory arxivi va
+jadvalma-jadval COPY fayllari katalogi ham qabul qilinadi — hammasi oqim
+sifatida o'qiladi, siqilmagan dump diskka yozilmaydi.
 Bu versiya `COPY` komandalarini va psql-maxsus komandalarini (`\restrict` kabi)
 to'g'ri qayta ishlash uchun maxsus parserdan foydalanadi.
 
 DIQQAT! Bu skript mavjud barcha ma'lumotlarni o'chirib yuboradi (DROP SCHEMA public CASCADE).
 """
 
-import os
 import io
+import os
+import re
+import sys
+import gzip
+import json
+import hashlib
+import time
+import argparse
+import threading
+import tempfile
+import subprocess
+from collections import namedtuple
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
 import psycopg2
+import psycopg2.errors
 from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
 
+from queries import DASHBOARD_TABLES
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None  # .zst dumplar uchun kerak (pip install zstandard)
+
 # Config credentials ni xavfsiz o'qish
 try:
     from config import DB_CONFIG
@@ -28,109 +54,886 @@ except ImportError:
     }
 
 DUMP_FILE = "rent_db.sql"
+RESTORE_JOBS = int(os.getenv("RESTORE_JOBS", "4"))
+CHECKPOINT_FILE = os.getenv("RESTORE_CHECKPOINT", ".restore_checkpoint.json")
+# Statementlar progressi har N ta statement yoki T sekundda yoziladi (COPY da — doim)
+CHECKPOINT_SAVE_EVERY = int(os.getenv("RESTORE_CHECKPOINT_EVERY", "500"))
+CHECKPOINT_SAVE_SECONDS = float(os.getenv("RESTORE_CHECKPOINT_SECONDS", "5"))
+
+# pg_dump post-data bo'limining boshlanishi (indeks, cheklov, trigger)
+POST_DATA_RE = re.compile(
+    r"\s*(CREATE\s+(UNIQUE\s+)?INDEX|CREATE\s+(CONSTRAINT\s+)?TRIGGER"
+    r"|ALTER\s+TABLE\s+(ONLY\s+)?\S+\s+ADD\s+CONSTRAINT)\b",
+    re.IGNORECASE,
+)
+# Parallel qurilishi mumkin bo'lgan post-data statementlar
+PARALLEL_POST_DATA_RE = re.compile(
+    r"\s*(CREATE\s+(UNIQUE\s+)?INDEX|ALTER\s+TABLE\s+(ONLY\s+)?\S+\s+ADD\s+CONSTRAINT)\b",
+    re.IGNORECASE,
+)
+FOREIGN_KEY_RE = re.compile(r"\bFOREIGN\s+KEY\b", re.IGNORECASE)
+# Har bir worker ulanishida takrorlanadigan sessiya sozlamalari
+SESSION_RE = re.compile(r"\s*(SET\s|SELECT\s+pg_catalog\.set_config\()", re.IGNORECASE)
+# Kirish formatlari (magic baytlar va COPY fayllari katalogi)
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+PGDMP_MAGIC = b"PGDMP"
+COPY_FILE_RE = re.compile(r"^(.+)\.(?:copy|tsv)(?:\.gz|\.zst)?$")
+SCHEMA_FILE_RE = re.compile(r"^schema\.sql(?:\.gz|\.zst)?$")
+# COPY payload oxiri: alohida qatordagi "\."
+# Statement tegishli jadval (CREATE TABLE, ALTER TABLE, COPY, indeks, trigger ...)
+TABLE_REF_RE = re.compile(
+    r'\s*(?:CREATE\s+(?:UNLOGGED\s+)?TABLE|ALTER\s+TABLE(?:\s+ONLY)?|COPY'
+    r'|CREATE\s+(?:UNIQUE\s+)?INDEX\s+\S+\s+ON(?:\s+ONLY)?'
+    r'|CREATE\s+(?:CONSTRAINT\s+)?TRIGGER\s+.*?\s+ON'
+    r'|ALTER\s+SEQUENCE\s+\S+\s+OWNED\s+BY|COMMENT\s+ON\s+(?:TABLE|COLUMN))'
+    r'\s+((?:"[^"]+"|\w+)(?:\.(?:"[^"]+"|\w+))?)',
+    re.IGNORECASE | re.DOTALL,
+)
+# Jadvallarni tanasida o'qiydigan obyektlar (filtrlangan jadvalga bog'liq bo'lsa tashlanadi)
+DEPENDENT_RE = re.compile(
+    r"\s*(CREATE\s+(OR\s+REPLACE\s+)?(MATERIALIZED\s+)?VIEW|CREATE\s+(OR\s+REPLACE\s+)?RULE"
+    r"|CREATE\s+POLICY|REFRESH\s+MATERIALIZED\s+VIEW)"
+    r'\s+((?:"[^"]+"|\w+)(?:\.(?:"[^"]+"|\w+))?)',
+    re.IGNORECASE,
+)
+# Dollar-quote tegi ($$ yoki $body$) — funksiya tanasi ichidagi ; statement oxiri emas
+DOLLAR_TAG_RE = re.compile(r"\$(?:[A-Za-z_]\w*)?\$")
+REFERENCES_RE = re.compile(r'\bREFERENCES\s+((?:"[^"]+"|\w+)(?:\.(?:"[^"]+"|\w+))?)', re.IGNORECASE)
+IDENT_RE = re.compile(r'"([^"]+)"|(\w+)')
+COPY_COLUMNS_RE = re.compile(r"\(([^)]*)\)\s+FROM\s+stdin", re.IGNORECASE)
+COPY_END_RE = re.compile(rb"\n\\\.\r?\n")
 
 
 def get_connection():
     return psycopg2.connect(**DB_CONFIG)
 
 
-def execute_sql_dump(cur, filename):
+class DumpReader:
+    """
+    Dump faylini qatorma-qator o'qiydi (binary rejimda, butun fayl xotiraga
+    yuklanmaydi). Xato xabarlari uchun joriy qator raqamini, checkpoint uchun
+    o'qilgan baytlar sonini (offset) ham saqlaydi.
+    """
+
+    def __init__(self, f):
+        self._f = f
+        self.line_no = 0
+        self.offset = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        line = self._f.readline()
+        if not line:
+            raise StopIteration
+        self.line_no += 1
+        self.offset += len(line)
+        return line
+
+    def skip_copy_data(self):
+        """
+        COPY payload ini qatorlab o'qimasdan (1 MB bo'laklarda terminatorni
+        qidirib) o'tkazib yuborish. Qaytaradi: (payload boshlanish offseti, uzunligi)
+        """
+        start = self._f.tell()
+        tail, pos = b"\n", start  # payload qator boshidan boshlanadi
+        while True:
+            chunk = self._f.read(1 << 20)
+            if not chunk:
+                raise EOFError("COPY bloki tugamasdan fayl tugadi ('\\.' topilmadi)")
+            data = tail + chunk
+            match = COPY_END_RE.search(data)
+            if match:
+                base = pos - len(tail)
+                self.line_no += data.count(b"\n", len(tail), match.end())
+                self._f.seek(base + match.end())
+                self.offset = base + match.end()
+                return start, base + match.start() + 1 - start
+            self.line_no += chunk.count(b"\n")
+            pos += len(chunk)
+            tail = data[-4:]
+
+
+class CopyStream:
+    """
+    COPY payload ini `copy_expert` ga uzatuvchi file-like adapter.
+    Qatorlarni dump dan o'qilishi bilan beradi va `\\.` qatorida to'xtaydi —
+    xotirada faqat psycopg2 so'ragan bufer (8 KB) turadi.
+    """
+
+    def __init__(self, lines):
+        self._lines = lines
+        self._pending = b""
+        self.done = False
+        self.rows = 0
+
+    def _next_line(self):
+        if self.done:
+            return b""
+        for line in self._lines:
+            if line.strip() == b"\\.":
+                self.done = True
+                return b""
+            self.rows += 1
+            return line
+        raise EOFError("COPY bloki tugamasdan fayl tugadi ('\\.' topilmadi)")
+
+    def read(self, size=-1):
+        chunks = [self._pending]
+        total = len(self._pending)
+        while size < 0 or total < size:
+            line = self._next_line()
+            if not line:
+                break
+            chunks.append(line)
+            total += len(line)
+        data = b"".join(chunks)
+        if 0 <= size < len(data):
+            data, self._pending = data[:size], data[size:]
+        else:
+            self._pending = b""
+        return data
+
+    def readline(self, size=-1):
+        if self._pending:
+            line, self._pending = self._pending, b""
+            return line
+        return self._next_line()
+
+    def drain(self):
+        """Blokning qolgan qatorlarini o'tkazib yuborish (parser davom etishi uchun)"""
+        while self._next_line():
+            pass
+
+
+class FileSlice:
+    """Fayldagi [start, start + length) bayt oralig'ini o'qiydigan file-like obyekt"""
+
+    def __init__(self, path, start, length):
+        self._f = open(path, "rb")
+        self._f.seek(start)
+        self._left = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self._left:
+            size = self._left
+        data = self._f.read(size)
+        self._left -= len(data)
+        return data
+
+    def readline(self, size=-1):
+        if size < 0 or size > self._left:
+            size = self._left
+        line = self._f.readline(size)
+        self._left -= len(line)
+        return line
+
+    def close(self):
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# COPY bloki: buyruq, payload hajmi (bayt) va payload ni ochuvchi funksiya
+CopyBlock = namedtuple("CopyBlock", "command size open")
+
+
+class RestoreWorkers:
     """
-    SQL faylni o'qib, COPY statementlarini ajratib, qolganini execute qiladi.
+    jobs ta thread, har biri o'z autocommit ulanishi bilan (ulanish thread
+    bo'yicha qayta ishlatiladi). Dump dagi sessiya sozlamalari (SET ...)
+    har bir yangi ulanishda takrorlanadi.
     """
-    with open(filename, 'r', encoding='utf-8', errors='replace') as f:
-        lines = f.readlines()
 
+    def __init__(self, jobs, session_sql):
+        self.jobs = jobs
+        self._session_sql = session_sql
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._conns = []
+        self._executor = ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="restore")
+
+    def _cursor(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = get_connection()
+            conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+            with conn.cursor() as cur:
+                for statement in self._session_sql:
+                    cur.execute(statement)
+            self._local.conn = conn
+            with self._lock:
+                self._conns.append(conn)
+        return conn.cursor()
+
+    def run(self, fn, items):
+        """fn(cur, item) ni parallel bajarish. Qaytaradi: [(item, xato yoki None), ...]"""
+        def task(item):
+            try:
+                with self._cursor() as cur:
+                    fn(cur, item)
+                return item, None
+            except Exception as e:
+                return item, e
+
+        return list(self._executor.map(task, items))
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        for conn in self._conns:
+            conn.close()
+
+
+def _table_name(ref):
+    """`public."user"` / `public.contract` → `user` / `contract` (sxemasiz)"""
+    parts = IDENT_RE.findall(ref)
+    quoted, plain = parts[-1]
+    return quoted or plain.lower()
+
+
+class TableFilter:
+    """
+    Jadval filtri (--include / --exclude). Jadval nomlari sxemasiz yoziladi;
+    "dashboard" — queries.DASHBOARD_TABLES dagi jadvallar.
+    Statement ruxsat etiladi, agar u tegishli jadval ham, REFERENCES qilgan
+    jadvallar ham filtrdan o'tsa (aks holda FK yo'q jadvalga ishora qiladi).
+    View / rule / policy lar tashlangan jadval nomini tilga olsa — ular ham
+    tashlanadi (pg_dump ularni jadvallardan keyin yozadi). SQL funksiyalar
+    tanasi pg_dump dagi check_function_bodies = false tufayli tekshirilmaydi.
+    """
+
+    def __init__(self, include=None, exclude=None):
+        self.include = self._expand(include) if include else None
+        self.exclude = self._expand(exclude or [])
+        self.dropped = set(self.exclude)  # dump da uchragan va tashlangan jadvallar
+
+    @staticmethod
+    def _expand(names):
+        tables = set()
+        for name in names:
+            tables.update(DASHBOARD_TABLES if name == "dashboard" else [name])
+        return tables
+
+    def allows(self, table):
+        if self.include is not None and table not in self.include:
+            return False
+        return table not in self.exclude
+
+    def allows_statement(self, statement):
+        match = TABLE_REF_RE.match(statement)
+        if match and not self.allows(_table_name(match.group(1))):
+            self.dropped.add(_table_name(match.group(1)))
+            return False
+        dependent = DEPENDENT_RE.match(statement)
+        if dependent:
+            names = {quoted or plain.lower() for quoted, plain in IDENT_RE.findall(statement)}
+            if names & self.dropped:
+                # Tashlangan view ga bog'liqlar (REFRESH, boshqa view lar) ham tashlanadi
+                self.dropped.add(_table_name(dependent.group(dependent.lastindex)))
+                return False
+        return all(self.allows(_table_name(ref)) for ref in REFERENCES_RE.findall(statement))
+
+
+def _quote_state(line, state=None):
+    """
+    Qator oxiridagi qo'shtirnoq holati: None (tashqarida), "'" / '"' yoki
+    dollar-quote tegi. Statement faqat tashqarida ; bilan tugasa to'liq.
+    """
+    i = 0
+    while i < len(line):
+        if state is None:
+            if line[i] in "'\"":
+                state = line[i]
+                i += 1
+            elif line[i] == "$" and DOLLAR_TAG_RE.match(line, i):
+                state = DOLLAR_TAG_RE.match(line, i).group()
+                i += len(state)
+            elif line.startswith("--", i):
+                break
+            else:
+                i += 1
+        else:
+            end = line.find(state, i)
+            if end < 0:
+                break
+            i = end + len(state)
+            state = None
+    return state
+
+
+class DeletedRowFilter:
+    """COPY oqimidan `is_deleted = true` qatorlarini olib tashlovchi file-like adapter"""
+
+    def __init__(self, src, column_index):
+        self._src = src
+        self._index = column_index
+        self.skipped = 0
+
+    def read(self, size=-1):
+        chunks = []
+        total = 0
+        while size < 0 or total < size:
+            line = self._src.readline()
+            if not line:
+                break
+            fields = line.split(b"\t", self._index + 1)
+            if len(fields) > self._index and fields[self._index].rstrip(b"\r\n") == b"t":
+                self.skipped += 1
+                continue
+            chunks.append(line)
+            total += len(line)
+        return b"".join(chunks)
+
+
+def _deleted_column_index(cur, command):
+    """COPY dagi is_deleted ustunining tartib raqami (ustunlar ro'yxati yoki katalogdan)"""
+    columns_match = COPY_COLUMNS_RE.search(command)
+    if columns_match:
+        columns = [_table_name(c) for c in columns_match.group(1).split(",")]
+    else:
+        cur.execute("""
+            SELECT attname FROM pg_attribute
+            WHERE attrelid = %s::regclass AND attnum > 0 AND NOT attisdropped
+            ORDER BY attnum
+        """, (TABLE_REF_RE.match(command).group(1),))
+        columns = [row[0] for row in cur.fetchall()]
+    return columns.index("is_deleted") if "is_deleted" in columns else None
+
+
+def _copy(cur, command, src, skip_deleted=False):
+    """COPY ni bajarish; skip_deleted=True bo'lsa o'chirilgan qatorlar oqimda tashlab ketiladi"""
+    index = _deleted_column_index(cur, command) if skip_deleted else None
+    if index is None:
+        cur.copy_expert(command, src)
+        return
+    rows = DeletedRowFilter(src, index)
+    cur.copy_expert(command, rows)
+    if rows.skipped:
+        print(f"   🗑️  {command[:40]}...: {rows.skipped} ta o'chirilgan qator o'tkazib yuborildi")
+
+
+def _load_copy(cur, command, src, skip_deleted=False, checkpoint=None):
+    """
+    COPY ni yuklab, checkpoint ga tugagan deb yozish. Davom ettirilgan restore da
+    jadval avval tozalanadi — oldingi urinishda COPY commit bo'lib, checkpoint ga
+    yozilmay qolgan bo'lishi mumkin.
+    """
+    if checkpoint and checkpoint.resumed:
+        cur.execute(f"TRUNCATE {TABLE_REF_RE.match(command).group(1)}")
+    _copy(cur, command, src, skip_deleted)
+    if checkpoint:
+        checkpoint.copy_done(command)
+
+
+def _copy_block(cur, block, skip_deleted=False, checkpoint=None):
+    """Bitta COPY blokini yuklash"""
+    print(f"   📋 COPY bajarilmoqda: {block.command[:50]}... ({block.size / 1024 / 1024:.1f} MB)")
+    with block.open() as src:
+        _load_copy(cur, block.command, src, skip_deleted, checkpoint)
+
+
+def _parse_dump(f, cur, on_copy, tables=None, checkpoint=None):
+    """
+    Dump ni oqim sifatida o'qish (1-bosqich, pre-data).
+    Sxema SQL lari darhol cur da bajariladi, COPY bloklari on_copy(command, lines)
+    ga beriladi. pg_dump post-data bo'limini (indekslar, cheklovlar, triggerlar)
+    ma'lumotdan keyin yozadi — birinchi shunday statementdan boshlab hammasi
+    bajarilmasdan yig'iladi. tables (TableFilter) o'tkazmagan statementlar tashlanadi,
+    checkpoint dagi offsetgacha bajarilganlari (sessiya sozlamalaridan boshqa) qayta
+    bajarilmaydi.
+    Qaytaradi: (sessiya sozlamalari, post-data statementlar, qatorlar soni)
+    """
     buffer = []
-    copy_buffer = []
-    in_copy_mode = False
-    copy_command = ""
+    session_sql = []
+    post_data = []
+    lines = DumpReader(f)
 
-    print(f"📄 Fayl o'qildi: {len(lines)} qator.")
+    def flush(warn_only):
+        statement = "".join(buffer)
+        if tables and not tables.allows_statement(statement):
+            return
+        if post_data or POST_DATA_RE.match(statement):
+            post_data.append(statement)
+            return
+        resumed = checkpoint and lines.offset <= checkpoint.state["offset"]
+        if resumed and not SESSION_RE.match(statement):
+            return
+        try:
+            cur.execute(statement)
+        except Exception as e:
+            if not warn_only:
+                print(f"❌ SQL Xatolik (Line {lines.line_no}): {e}")
+                raise e
+            # Statement to'liq (qo'shtirnoqdan tashqarida ; bilan tugagan) — xato
+            # bergani tashlanadi, keyingi statementlar unga qo'shilmaydi
+            print(f"⚠️ SQL statement o'tkazib yuborildi (Line {lines.line_no}): {e}")
+            print(f"   {statement.strip()[:120]}")
+        else:
+            if SESSION_RE.match(statement):
+                session_sql.append(statement)
+        if checkpoint and not resumed:
+            checkpoint.statement_done(lines.offset)
 
-    for i, line in enumerate(lines):
+    quote = None
+
+    for raw in lines:
+        line = raw.decode("utf-8", errors="replace")
         stripped = line.strip()
-        
-        # 1. COPY blok ichidamisiz?
-        if in_copy_mode:
-            if stripped == r'\.':
-                # COPY tugadi
-                in_copy_mode = False
-                if copy_buffer:
-                    # COPY ni bajarish
-                    csv_io = io.StringIO("".join(copy_buffer))
-                    try:
-                        print(f"   📋 COPY bajarilmoqda: {copy_command[:50]}...")
-                        cur.copy_expert(copy_command, csv_io)
-                    except Exception as e:
-                        print(f"❌ COPY Xatolik (Line {i}): {e}")
-                        raise e
-                copy_buffer = []
-                copy_command = ""
-            else:
-                copy_buffer.append(line)
+
+        # Qo'shtirnoq / funksiya tanasi ichidagi qatorlar o'zgarishsiz yig'iladi
+        if quote is not None:
+            buffer.append(line)
+            quote = _quote_state(line, quote)
+            if quote is None and stripped.endswith(';'):
+                flush(warn_only=True)
+                buffer = []
             continue
 
-        # 2. Yangi COPY buyrug'i?
-        # pg_dump COPY ni alohida qatorda yozadi
+        # 1. COPY buyrug'i — pg_dump COPY ni alohida qatorda yozadi
         if line.startswith("COPY ") and "FROM stdin" in line:
             # Oldingi yig'ilgan SQL larni bajarish
             if buffer:
-                try:
-                    cur.execute("".join(buffer))
-                except Exception as e:
-                    print(f"❌ SQL Xatolik (Line {i}): {e}")
-                    raise e
+                flush(warn_only=False)
                 buffer = []
-            
-            # COPY rejimiga o'tish
-            in_copy_mode = True
-            copy_command = line.strip().rstrip(';') # ; olib tashlash kerakmi? copy_expert uchun odatda ha/yo'q farqi yo'q, lekin SQL da ; bor
-            # copy_expert query string sifatida to'liq command ni kutyapti, shu jumladan FROM STDIN
-            copy_command = line.strip() 
+            try:
+                on_copy(stripped, lines)
+            except Exception as e:
+                print(f"❌ COPY Xatolik (Line {lines.line_no}): {e}")
+                raise e
             continue
 
-        # 3. Psql maxsus komandalari (\connect, \restrict va h.k)
-        if stripped.startswith('\\') and not in_copy_mode:
+        # 2. Psql maxsus komandalari (\connect, \restrict va h.k)
+        if stripped.startswith('\\'):
             continue
 
-        # 4. Role/Ownership komandalarini filtrlash (Neon.tech da 'postgres' roli yo'q bo'lishi mumkin)
+        # 3. Role/Ownership komandalarini filtrlash (Neon.tech da 'postgres' roli yo'q bo'lishi mumkin)
         if "OWNER TO" in stripped or stripped.startswith("GRANT") or stripped.startswith("REVOKE"):
-            # print(f"   ⏩ Role command ignored: {stripped[:40]}...")
             continue
-        
-        # 5. Oddiy SQL (yig'ib boramiz)
+
+        # 4. Oddiy SQL (yig'ib boramiz)
         if not stripped:
             continue
-            
+
         if stripped.startswith('--'):
             continue
 
         buffer.append(line)
-        
-        # Agar qator ; bilan tugasa, execute qilamiz (xotirani tejash uchun)
-        if stripped.endswith(';'):
-            try:
-                cur.execute("".join(buffer))
-                buffer = []
-            except Exception as e:
-                # Ba'zan ; string ichida bo'lishi mumkin, lekin pg_dump da kamdan-kam
-                print(f"⚠️ SQL Execute warning (Line {i}): {e}")
-                # Davom etamiz, balki buffer to'liq emasdir
-                # Lekin pg_dump da har doim ; yangi qatorda yoki oxirida bo'ladi
-                pass
+        quote = _quote_state(line)
 
+        # Qator qo'shtirnoqdan tashqarida ; bilan tugasa — statement to'liq
+        if quote is None and stripped.endswith(';'):
+            flush(warn_only=True)
+            buffer = []
 
     # Qolgan buffer
     if buffer:
-        cur.execute("".join(buffer))
+        flush(warn_only=False)
+
+    return session_sql, post_data, lines.line_no
+
+
+def _run_post_data(cur, statements, workers, checkpoint=None):
+    """
+    3-bosqich: post-data. Indekslar va PK/UNIQUE/CHECK cheklovlar birinchi
+    to'lqinda parallel, FOREIGN KEY lar (ular referens qilinadigan unique
+    indekslarga tayanadi) ikkinchi to'lqinda, qolganlari (triggerlar va h.k)
+    asl tartibda ketma-ket bajariladi. checkpoint da bajarilgan deb belgilanganlar
+    o'tkazib yuboriladi.
+    Qaytaradi: xatolar soni
+    """
+    if checkpoint:
+        statements = [s for s in statements if not checkpoint.is_post_data_done(s)]
+    parallel = [s for s in statements if PARALLEL_POST_DATA_RE.match(s)]
+    waves = [
+        [s for s in parallel if not FOREIGN_KEY_RE.search(s)],
+        [s for s in parallel if FOREIGN_KEY_RE.search(s)],
+    ]
+    serial = [s for s in statements if not PARALLEL_POST_DATA_RE.match(s)]
+    errors = 0
 
+    def run_one(c, statement):
+        c.execute(statement)
+        if checkpoint:
+            checkpoint.post_data_done(statement)
 
-def restore_database():
-    if not os.path.exists(DUMP_FILE):
-        print(f"❌ Fayl topilmadi: {DUMP_FILE}")
+    for wave in waves:
+        if workers and len(wave) > 1:
+            results = workers.run(run_one, wave)
+            # Bir jadvalga ikki FK parallel qo'shilsa deadlock bo'lishi mumkin — qayta, ketma-ket
+            retry = [s for s, e in results if isinstance(e, psycopg2.errors.DeadlockDetected)]
+            failed = [(s, e) for s, e in results if e is not None and s not in retry]
+        else:
+            retry, failed = wave, []
+        for statement in retry:
+            try:
+                run_one(cur, statement)
+            except Exception as e:
+                failed.append((statement, e))
+        for statement, e in failed:
+            print(f"⚠️ Post-data xatosi: {statement.strip()[:60]}... — {e}")
+        errors += len(failed)
+
+    for statement in serial:
+        try:
+            run_one(cur, statement)
+        except Exception as e:
+            print(f"⚠️ Post-data xatosi: {statement.strip()[:60]}... — {e}")
+            errors += 1
+    return errors
+
+
+def _dump_signature(path):
+    """Dump ni aniqlash uchun (hajm, oxirgi o'zgarish vaqti) — katalog uchun fayllar bo'yicha"""
+    if os.path.isdir(path):
+        stats = [os.stat(os.path.join(path, name)) for name in sorted(os.listdir(path))]
+        return sum(st.st_size for st in stats), max((st.st_mtime for st in stats), default=0)
+    st = os.stat(path)
+    return st.st_size, st.st_mtime
+
+
+class RestoreCheckpoint:
+    """
+    Restore progressi (JSON fayl, atomik yoziladi):
+      offset    — pre-data dagi oxirgi bajarilgan statement tugagan bayt
+      table     — oxirgi yuklangan COPY jadvali
+      copies    — tugagan COPY bloklari (buyruq matni)
+      post_data — bajarilgan post-data statementlar (sha1)
+    --resume da shular qayta bajarilmaydi. COPY dan keyin fayl darhol yoziladi,
+    statementlardan keyin — har CHECKPOINT_SAVE_EVERY ta yoki CHECKPOINT_SAVE_SECONDS
+    da bir (bosqich oxirida flush()). Yozilmay qolgan statementlar resume da
+    qayta bajariladi — pre-data xatolari ogohlantirish bilan o'tkaziladi.
+    """
+
+    def __init__(self, path, state, resumed=False):
+        self.path = path
+        self.state = state
+        self.resumed = resumed
+        self._copies = set(state["copies"])
+        self._post_data = set(state["post_data"])
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._saved_at = time.monotonic()
+
+    @classmethod
+    def create(cls, path, dump_path, options):
+        size, mtime = _dump_signature(dump_path)
+        checkpoint = cls(path, {
+            "dump": os.path.abspath(dump_path), "size": size, "mtime": mtime,
+            "options": options, "offset": 0, "table": None, "copies": [], "post_data": [],
+        })
+        checkpoint.save()
+        return checkpoint
+
+    @classmethod
+    def load(cls, path, dump_path):
+        """Checkpoint ni o'qish; boshqa dump ga tegishli bo'lsa ValueError"""
+        with open(path, encoding="utf-8") as f:
+            state = json.load(f)
+        size, mtime = _dump_signature(dump_path)
+        if (state["dump"], state["size"], state["mtime"]) != (os.path.abspath(dump_path), size, mtime):
+            raise ValueError(f"Checkpoint boshqa dump ga tegishli: {state['dump']}")
+        return cls(path, state, resumed=True)
+
+    def save(self):
+        with self._lock:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.state, f)
+            os.replace(tmp_path, self.path)
+            self._pending = 0
+            self._saved_at = time.monotonic()
+
+    def _save_throttled(self):
+        """Statement progressi: har CHECKPOINT_SAVE_EVERY ta yoki CHECKPOINT_SAVE_SECONDS da yozish"""
+        with self._lock:
+            self._pending += 1
+            due = (self._pending >= CHECKPOINT_SAVE_EVERY
+                   or time.monotonic() - self._saved_at >= CHECKPOINT_SAVE_SECONDS)
+        if due:
+            self.save()
+
+    def flush(self):
+        """Yozilmagan progress bo'lsa — yozish (bosqich oxirida va xatoda)"""
+        if self._pending:
+            self.save()
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    @staticmethod
+    def _key(statement):
+        return hashlib.sha1(statement.encode("utf-8")).hexdigest()
+
+    def statement_done(self, offset):
+        self.state["offset"] = offset
+        self._save_throttled()
+
+    def copy_done(self, command):
+        with self._lock:
+            self._copies.add(command)
+            self.state["copies"].append(command)
+            self.state["table"] = _table_name(TABLE_REF_RE.match(command).group(1))
+        self.save()
+
+    def is_copy_done(self, command):
+        return command in self._copies
+
+    def post_data_done(self, statement):
+        with self._lock:
+            key = self._key(statement)
+            self._post_data.add(key)
+            self.state["post_data"].append(key)
+        self._save_throttled()
+
+    def is_post_data_done(self, statement):
+        return self._key(statement) in self._post_data
+
+
+def _open_compressed(path):
+    """
+    Faylni binary rejimda ochish; .gz / .zst (kengaytma yoki magic bayt
+    bo'yicha) oqim sifatida dekompressiya qilinadi — diskka yozilmaydi.
+    """
+    with open(path, "rb") as probe:
+        magic = probe.read(4)
+    if path.endswith(".gz") or magic[:2] == GZIP_MAGIC:
+        return gzip.open(path, "rb")
+    if path.endswith(".zst") or magic == ZSTD_MAGIC:
+        if zstandard is None:
+            raise RuntimeError("zstandard kutubxonasi o'rnatilmagan (pip install zstandard)")
+        reader = zstandard.ZstdDecompressor().stream_reader(
+            open(path, "rb"), read_across_frames=True, closefd=True
+        )
+        return io.BufferedReader(reader, buffer_size=1 << 20)
+    return open(path, "rb")
+
+
+def _is_pg_archive(path):
+    """pg_dump custom (-Fc) yoki directory (-Fd) formatidagi arxivmi?"""
+    if os.path.isdir(path):
+        return os.path.exists(os.path.join(path, "toc.dat"))
+    with open(path, "rb") as probe:
+        return probe.read(5) == PGDMP_MAGIC
+
+
+@contextmanager
+def open_dump(path):
+    """
+    Dump ni SQL oqimi sifatida ochish. Qaytaradi: (binary oqim, seekable).
+    seekable=True faqat oddiy .sql fayl uchun — shunda COPY bloklari bayt
+    offsetlari bo'yicha parallel yuklanadi; siqilgan va pg_restore oqimlari
+    bir marta o'qiladi.
+    """
+    if _is_pg_archive(path):
+        # Custom/directory arxiv — pg_restore uni SQL matniga aylantirib stdout ga beradi
+        with tempfile.TemporaryFile() as stderr:
+            proc = subprocess.Popen(
+                ["pg_restore", "--no-owner", "--no-privileges", "-f", "-", path],
+                stdout=subprocess.PIPE, stderr=stderr,
+            )
+            try:
+                yield proc.stdout, False
+            finally:
+                proc.stdout.close()
+                if proc.wait() != 0 and sys.exc_info()[0] is None:
+                    stderr.seek(0)
+                    message = stderr.read().decode("utf-8", errors="replace").strip()
+                    raise RuntimeError(f"pg_restore xatosi: {message}")
+        return
+
+    f = _open_compressed(path)
+    try:
+        yield f, isinstance(f, io.BufferedReader) and isinstance(f.raw, io.FileIO)
+    finally:
+        f.close()
+
+
+def _copy_dir_blocks(path):
+    """
+    Jadvalma-jadval COPY fayllari katalogi: `<jadval>.copy` / `<jadval>.tsv`
+    (ixtiyoriy .gz / .zst). Fayl nomi jadval nomi (`public.user` ham bo'lishi
+    mumkin), ichida COPY text formatidagi qatorlar, ustunlar jadval tartibida.
+    """
+    blocks = []
+    for name in sorted(os.listdir(path)):
+        match = COPY_FILE_RE.match(name)
+        if not match:
+            continue
+        table = ".".join('"{}"'.format(part.replace('"', '""')) for part in match.group(1).split("."))
+        file_path = os.path.join(path, name)
+        blocks.append(CopyBlock(
+            f"COPY {table} FROM stdin;",
+            os.path.getsize(file_path),
+            partial(_open_compressed, file_path),
+        ))
+    return blocks
+
+
+def _sync_sequences(cur):
+    """
+    COPY fayllari katalogida sequence qiymatlari yo'q — jadvalga bog'langan
+    (serial / identity) sequence larni ustundagi MAX qiymatga moslash.
+    """
+    cur.execute("""
+        SELECT format('SELECT setval(%L, m) FROM (SELECT MAX(%I) AS m FROM %I.%I) x WHERE m IS NOT NULL',
+                      s.oid::regclass, a.attname, n.nspname, t.relname)
+        FROM pg_class s
+        JOIN pg_depend d ON d.objid = s.oid AND d.deptype IN ('a', 'i')
+        JOIN pg_class t ON t.oid = d.refobjid
+        JOIN pg_namespace n ON n.oid = t.relnamespace
+        JOIN pg_attribute a ON a.attrelid = t.oid AND a.attnum = d.refobjsubid
+        WHERE s.relkind = 'S'
+    """)
+    for (statement,) in cur.fetchall():
+        cur.execute(statement)
+
+
+def _dump_size_mb(path):
+    if os.path.isdir(path):
+        return sum(
+            os.path.getsize(os.path.join(path, name)) for name in os.listdir(path)
+        ) / 1024 / 1024
+    return os.path.getsize(path) / 1024 / 1024
+
+
+def execute_sql_dump(cur, path, jobs=1, tables=None, skip_deleted=False, checkpoint=None):
+    """
+    Dump ni uch bosqichda yuklash:
+      1. pre-data — sxema, fayl oqim sifatida o'qilib cur da bajariladi
+      2. data     — COPY bloklari jobs ta ulanishda parallel (eng kattasi birinchi)
+      3. post-data — indekslar, cheklovlar, triggerlar oxirida, parallel
+    path: .sql, .sql.gz, .sql.zst, pg_dump custom/directory arxivi yoki
+    jadvalma-jadval COPY fayllari katalogi (ixtiyoriy schema.sql bilan).
+    Bir marta o'qiladigan oqimlarda (siqilgan, pg_restore) COPY lar o'qish
+    bilan birga shu ulanishda yuklanadi. Xotira sarfi dump hajmiga bog'liq emas.
+    tables (TableFilter) — faqat kerakli jadvallar; skip_deleted=True —
+    is_deleted = true qatorlar COPY oqimidan olib tashlanadi.
+    checkpoint (RestoreCheckpoint) — progress yoziladi, tugagan ishlar qayta bajarilmaydi.
+    """
+    print(f"📄 Dump oqim sifatida o'qilmoqda: {_dump_size_mb(path):.1f} MB ({jobs} ta ulanish)")
+
+    blocks = []
+    copy_time = 0.0
+
+    def load_inline(command, lines):
+        nonlocal copy_time
+        started = time.perf_counter()
+        stream = CopyStream(lines)
+        print(f"   📋 COPY bajarilmoqda: {command[:50]}...")
+        _load_copy(cur, command, stream, skip_deleted, checkpoint)
+        stream.drain()
+        copy_time += time.perf_counter() - started
+
+    def record_block(command, lines):
+        start, length = lines.skip_copy_data()
+        blocks.append(CopyBlock(command, length, partial(FileSlice, path, start, length)))
+
+    def skipped(command):
+        if tables and not tables.allows_statement(command):
+            return True
+        return bool(checkpoint and checkpoint.is_copy_done(command))
+
+    def on_copy(load, skip):
+        def handle(command, lines):
+            if skipped(command):
+                skip(lines)
+            else:
+                load(command, lines)
+        return handle
+
+    def drain(lines):
+        CopyStream(lines).drain()
+
+    started = time.perf_counter()
+    session_sql, post_data, line_count = [], [], 0
+    copy_dir = os.path.isdir(path) and not _is_pg_archive(path)
+    if copy_dir:
+        schema_files = [n for n in os.listdir(path) if SCHEMA_FILE_RE.match(n)]
+        if schema_files:
+            with _open_compressed(os.path.join(path, schema_files[0])) as f:
+                session_sql, post_data, line_count = _parse_dump(
+                    f, cur, on_copy(load_inline, drain), tables, checkpoint
+                )
+        blocks = [b for b in _copy_dir_blocks(path) if not skipped(b.command)]
+    else:
+        with open_dump(path) as (f, seekable):
+            if jobs > 1 and seekable:
+                handle_copy = on_copy(record_block, lambda lines: lines.skip_copy_data())
+            else:
+                handle_copy = on_copy(load_inline, drain)
+            session_sql, post_data, line_count = _parse_dump(f, cur, handle_copy, tables, checkpoint)
+    if checkpoint:
+        checkpoint.flush()
+    timings = {"pre-data": time.perf_counter() - started - copy_time}
+    print(f"📄 {line_count} qator, {len(blocks)} ta alohida COPY bloki.")
+
+    workers = RestoreWorkers(jobs, session_sql) if jobs > 1 else None
+    try:
+        started = time.perf_counter()
+        blocks.sort(key=lambda b: b.size, reverse=True)
+        if workers:
+            results = workers.run(
+                partial(_copy_block, skip_deleted=skip_deleted, checkpoint=checkpoint), blocks
+            )
+        else:
+            results = [(block, _copy_block(cur, block, skip_deleted, checkpoint)) for block in blocks]
+        for block, e in results:
+            if e is not None:
+                print(f"❌ COPY Xatolik ({block.command[:50]}...): {e}")
+                raise e
+        if copy_dir:
+            _sync_sequences(cur)
+        timings["data"] = copy_time + time.perf_counter() - started
+
+        started = time.perf_counter()
+        errors = _run_post_data(cur, post_data, workers, checkpoint)
+        if checkpoint:
+            checkpoint.flush()
+        timings["post-data"] = time.perf_counter() - started
+    finally:
+        if workers:
+            workers.close()
+
+    print("⏱️  Bosqichlar: " + " | ".join(f"{name} {sec:.2f}s" for name, sec in timings.items()))
+    if errors:
+        print(f"⚠️ Post-data: {errors} ta statement bajarilmadi.")
+
+
+def restore_database(path=DUMP_FILE, jobs=RESTORE_JOBS, include=None, exclude=None,
+                     skip_deleted=False, resume=False):
+    """
+    Dump dan bazani tiklash. include / exclude — jadval nomlari ro'yxati
+    ("dashboard" = queries.DASHBOARD_TABLES), skip_deleted — is_deleted = true
+    qatorlarni yuklamaslik. resume=True — baza tozalanmaydi, CHECKPOINT_FILE
+    dagi progressdan davom etiladi (filtrlar ham checkpoint dan olinadi).
+    """
+    if not os.path.exists(path):
+        print(f"❌ Fayl topilmadi: {path}")
         return
 
+    checkpoint = None
+    if resume:
+        try:
+            checkpoint = RestoreCheckpoint.load(CHECKPOINT_FILE, path)
+        except FileNotFoundError:
+            print(f"❌ Checkpoint topilmadi: {CHECKPOINT_FILE}")
+            return
+        except ValueError as e:
+            print(f"❌ {e}")
+            return
+        options = checkpoint.state["options"]
+        include, exclude, skip_deleted = options["include"], options["exclude"], options["skip_deleted"]
+        print(f"🔁 Davom ettirilmoqda: {len(checkpoint.state['copies'])} ta COPY tugagan "
+              f"(oxirgisi: {checkpoint.state['table']}), "
+              f"{len(checkpoint.state['post_data'])} ta post-data bajarilgan.")
+
     print("🔌 Bazaga ulanmoqda...")
     try:
         conn = get_connection()
@@ -140,32 +943,98 @@ def restore_database():
         print(f"❌ Ulanish xatosi (config va .env ni tekshiring): {e}")
         return
 
-    # 1. Tozalash
-    print("🧹 Eski ma'lumotlar tozalanmoqda (DROP SCHEMA public)...")
-    try:
-        cur.execute("DROP SCHEMA public CASCADE;")
-        cur.execute("CREATE SCHEMA public;")
-        cur.execute("GRANT ALL ON SCHEMA public TO public;") # Neon.tech uchun
-        print("✅ Baza tozalandi.")
-    except Exception as e:
-        print(f"❌ Tozalash xatosi: {e}")
-        conn.close()
-        return
+    # 1. Tozalash (davom ettirishda emas)
+    if checkpoint is None:
+        print("🧹 Eski ma'lumotlar tozalanmoqda (DROP SCHEMA public)...")
+        try:
+            cur.execute("DROP SCHEMA public CASCADE;")
+            cur.execute("CREATE SCHEMA public;")
+            cur.execute("GRANT ALL ON SCHEMA public TO public;") # Neon.tech uchun
+            print("✅ Baza tozalandi.")
+        except Exception as e:
+            print(f"❌ Tozalash xatosi: {e}")
+            conn.close()
+            return
+        checkpoint = RestoreCheckpoint.create(CHECKPOINT_FILE, path, {
+            "include": include, "exclude": exclude, "skip_deleted": skip_deleted,
+        })
 
     # 2. Parser bilan yuklash
-    print(f"📂 {DUMP_FILE} parser orqali yuklanmoqda...")
+    print(f"📂 {path} parser orqali yuklanmoqda...")
     try:
-        execute_sql_dump(cur, DUMP_FILE)
+        tables = TableFilter(include, exclude) if include or exclude else None
+        execute_sql_dump(cur, path, jobs=jobs, tables=tables,
+                         skip_deleted=skip_deleted, checkpoint=checkpoint)
+        checkpoint.remove()
         print("✅ SQL dump muvaffaqiyatli yuklandi!")
     except Exception as e:
+        checkpoint.flush()  # bajarilgan, lekin hali yozilmagan statementlar
         print(f"❌ Yuklash jarayonida xatolik: {e}")
+        print(f"🔁 Davom ettirish uchun: python restore_db.py {path} --resume")
+        return
     finally:
         cur.close()
         conn.close()
 
+    # 3. Dashboard jadvallari, analitik indekslar va rollup lar (DROP SCHEMA ularni ham o'chirgan;
+    #    kirish tarixi rollups.LOGIN_HISTORY_SCHEMA da — saqlanib qoladi)
+    print("📊 Indekslar va rollup jadvallar qurilmoqda...")
+    try:
+        rebuild_rollups()
+        print("✅ Rollup jadvallar tayyor.")
+    except Exception as e:
+        print(f"❌ Rollup xatosi: {e}")
+
+
+def rebuild_rollups():
+    """
+    Dashboard jadvallari + analitik indekslarni yaratish, rollup larni to'liq
+    qayta hisoblash, Parquet snapshot (READ_BACKEND=duckdb), data versiyasini
+    oshirish (dashboard cache lari eskiradi) va yangi versiya uchun cache ni isitish
+    """
+    from database import create_tables, record_sync
+    from rollups import refresh_rollups
+    import snapshot
+
+    create_tables()
+    conn = get_connection()
+    try:
+        refresh_rollups(conn, full=True)
+    finally:
+        conn.close()
+
+    # READ_BACKEND=duckdb — Parquet snapshot versiya oshishidan oldin yangilanadi
+    if snapshot.enabled():
+        snapshot.export_snapshot()
+    record_sync("restore")
+
+    # Yangi versiya uchun dashboard cache ini isitish (CLI — sinxron)
+    from warmup import warm_cache
+    warm_cache()
+
 
 if __name__ == "__main__":
-    print("⚠️  DIQQAT! Bu skript Dashboard bazasini TO'LIQ TOZALAYDI va qayta yozadi.")
-    confirm = input(f"'{DUMP_FILE}' faylidan tiklashni tasdiqlaysizmi? (ha/yo'q): ")
+    parser = argparse.ArgumentParser(description="SQL dump dan Dashboard bazasini tiklash")
+    parser.add_argument("dump", nargs="?", default=DUMP_FILE,
+                        help=".sql / .sql.gz / .sql.zst, pg_dump -Fc/-Fd arxivi yoki COPY fayllari katalogi")
+    parser.add_argument("--jobs", type=int, default=RESTORE_JOBS,
+                        help="COPY va indekslar uchun parallel ulanishlar soni (1 = ketma-ket)")
+    parser.add_argument("--include", type=lambda v: v.split(","),
+                        help="Faqat shu jadvallar, vergul bilan (\"dashboard\" — dashboard jadvallari)")
+    parser.add_argument("--exclude", type=lambda v: v.split(","),
+                        help="Shu jadvallarni o'tkazib yuborish, vergul bilan")
+    parser.add_argument("--skip-deleted", action="store_true",
+                        help="is_deleted = true qatorlarni yuklamaslik")
+    parser.add_argument("--resume", action="store_true",
+                        help="Uzilgan restore ni checkpoint dan davom ettirish (baza tozalanmaydi)")
+    args = parser.parse_args()
+
+    if not args.resume:
+        print("⚠️  DIQQAT! Bu skript Dashboard bazasini TO'LIQ TOZALAYDI va qayta yozadi.")
+    confirm = input(f"'{args.dump}' dan tiklashni tasdiqlaysizmi? (ha/yo'q): ")
     if confirm.lower() in ['ha', 'yes', 'y']:
-        restore_database()
+        restore_database(
+            args.dump, jobs=max(1, args.jobs),
+            include=args.include, exclude=args.exclude, skip_deleted=args.skip_deleted,
+            resume=args.resume,
+        )
@@ -0,0 +1,182 @@
+"""
+result_cache.py — So'rov natijalari uchun diskdagi (jarayonlararo) cache
+
+st.cache_data faqat jarayon xotirasida yashaydi: har bir restart / redeploy
+bo'sh cache bilan boshlanadi, replikalar natijalarni bo'lishmaydi. Bu modul
+ikkinchi daraja — natijalar RESULT_CACHE_DIR da Arrow IPC (feather) fayl
+sifatida saqlanadi (pyarrow bo'lmasa pickle).
+
+  • kalit — so'rov matni + parametrlar + data versiyasining sha256 i
+    (versiya har bir sync / restore da o'zgaradi — database.get_data_version)
+  • TTL — fayl yozilgan vaqtdan (mtime) RESULT_CACHE_TTL sekund
+  • LRU — o'qilganda atime yangilanadi; umumiy hajm RESULT_CACHE_MAX_MB dan
+    oshsa eng uzoq o'qilmaganlari o'chiriladi
+  • yozish atomik (vaqtinchalik fayl + os.replace) — bir nechta jarayon
+    bir vaqtda yozsa ham yarim fayl o'qilmaydi
+
+Cache xatolari hech qachon dashboard ni to'xtatmaydi — faqat miss hisoblanadi.
+"""
+
+import os
+import json
+import time
+import hashlib
+import tempfile
+from datetime import date
+
+import pandas as pd
+
+from config import RESULT_CACHE_DIR, RESULT_CACHE_MAX_MB, RESULT_CACHE_TTL
+from database import get_data_version
+
+try:
+    import pyarrow  # noqa: F401 — DataFrame.to_feather / pd.read_feather uchun
+    ARROW_AVAILABLE = True
+except ImportError:
+    ARROW_AVAILABLE = False
+    print("⚠️ pyarrow library not found. Result cache will use pickle.")
+
+FORMATS = (".arrow", ".pkl")
+
+
+def enabled():
+    return RESULT_CACHE_MAX_MB > 0 and RESULT_CACHE_TTL > 0
+
+
+def cache_version():
+    """
+    Cache kalitlariga qo'shiladigan versiya: oxirgi sync / restore + bugungi sana
+    (CURRENT_DATE li so'rovlar kun almashganda yangilanadi). Versiyani o'qib
+    bo'lmasa — 5 daqiqalik vaqt oralig'i (avvalgi TTL xulqi).
+    """
+    try:
+        return f"{get_data_version()}:{date.today()}"
+    except Exception:
+        return f"t{int(time.time() // 300)}"
+
+
+def cache_key(query, params=None, version=None):
+    """So'rov + parametrlar + data versiyasi → sha256 (sana va Decimal lar matn sifatida)"""
+    payload = json.dumps([query, params, version], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _paths(key):
+    return [os.path.join(RESULT_CACHE_DIR, key + ext) for ext in FORMATS]
+
+
+def get(query, params=None, version=None, ttl=None):
+    """Diskdagi natija (muddati o'tmagan bo'lsa) yoki None"""
+    if not enabled():
+        return None
+    ttl = RESULT_CACHE_TTL if ttl is None else ttl
+    now = time.time()
+    for path in _paths(cache_key(query, params, version)):
+        try:
+            if now - os.stat(path).st_mtime > ttl:
+                continue
+            df = pd.read_feather(path) if path.endswith(".arrow") else pd.read_pickle(path)
+            os.utime(path, (now, os.stat(path).st_mtime))  # LRU: oxirgi o'qilgan vaqt
+            return df
+        except FileNotFoundError:
+            continue
+        except Exception as e:
+            # Buzilgan fayl — o'chirib, miss deb hisoblaymiz
+            print(f"⚠️ Result cache o'qish xatosi ({os.path.basename(path)}): {e}")
+            _remove(path)
+    return None
+
+
+def put(query, params, df, version=None):
+    """Natijani diskka atomik yozish va kerak bo'lsa eski fayllarni tozalash"""
+    if not enabled() or not isinstance(df, pd.DataFrame):
+        return
+    key = cache_key(query, params, version)
+    try:
+        os.makedirs(RESULT_CACHE_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=RESULT_CACHE_DIR, suffix=".tmp")
+        os.close(fd)
+        try:
+            ext = ".arrow"
+            try:
+                if not ARROW_AVAILABLE:
+                    raise ImportError("pyarrow")
+                df.reset_index(drop=True).to_feather(tmp_path)
+            except Exception:
+                # Arrow ga sig'maydigan ustunlar (aralash turlar) — pickle
+                ext = ".pkl"
+                df.to_pickle(tmp_path)
+            os.replace(tmp_path, os.path.join(RESULT_CACHE_DIR, key + ext))
+        finally:
+            _remove(tmp_path)
+        evict()
+    except Exception as e:
+        print(f"⚠️ Result cache yozish xatosi: {e}")
+
+
+def evict():
+    """Muddati o'tgan fayllarni, keyin hajm limitidan oshsa eng eski o'qilganlarini o'chirish"""
+    now = time.time()
+    entries = []
+    try:
+        with os.scandir(RESULT_CACHE_DIR) as it:
+            for entry in it:
+                if not entry.name.endswith(FORMATS):
+                    continue
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                if now - st.st_mtime > RESULT_CACHE_TTL:
+                    _remove(entry.path)
+                else:
+                    entries.append((st.st_atime, st.st_size, entry.path))
+    except FileNotFoundError:
+        return
+
+    total = sum(size for _, size, _ in entries)
+    limit = RESULT_CACHE_MAX_MB * 1024 * 1024
+    for _, size, path in sorted(entries):
+        if total <= limit:
+            break
+        _remove(path)
+        total -= size
+
+
+def clear():
+    """Butun disk cache ni tozalash"""
+    for name in os.listdir(RESULT_CACHE_DIR) if os.path.isdir(RESULT_CACHE_DIR) else []:
+        _remove(os.path.join(RESULT_CACHE_DIR, name))
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+# ======================== ASOSIY INTERFEYS ========================
+
+def cached_query(query, params, load, version=None):
+    """Disk cache dan olish, bo'lmasa load() ni chaqirib natijani saqlash"""
+    df = get(query, params, version)
+    if df is None:
+        df = load()
+        put(query, params, df, version)
+    return df
+
+
+def cached_batch(batch, load_batch, version=None):
+    """
+    So'rovlar to'plami: diskda bor natijalar olinadi, qolganlari bitta
+    load_batch({nom: (so'rov, parametrlar)}) chaqiruvida bajarilib saqlanadi.
+    """
+    results = {name: get(query, params, version) for name, (query, params) in batch.items()}
+    missing = {name: batch[name] for name, df in results.items() if df is None}
+    if missing:
+        loaded = load_batch(missing)
+        for name, (query, params) in missing.items():
+            put(query, params, loaded[name], version)
+        results.update(loaded)
+    return results
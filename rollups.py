@@ -0,0 +1,340 @@
+"""
+rollups.py — Oldindan hisoblangan (rollup) jadvallar
+
+Dashboard grafiklari xom jadvallarni (`"user"`, `property_rentalrequest`,
+`contract` ...) har safar JOIN qilish o'rniga shu jadvallarni o'qiydi.
+Rollup lar queries.py o'qiydigan production nomli jadvallardan
+(ROLLUP_SOURCES — restore_db tiklaydi) hisoblanadi, etl.py yozadigan
+`users` / `rental_requests` / `contracts` dan emas. `restore_db` dan keyin
+to'liq, har bir `etl.sync_data` dan keyin oxirgi ROLLUP_LOOKBACK_DAYS kun
+qayta hisoblanadi; manba jadvallar bo'lmagan bazada refresh o'tkazib yuboriladi.
+Manba jadvalda updated_at bo'lsa, oxirgi refresh da ko'rilgan MAX(updated_at)
+rollup_sources_state da saqlanadi: shundan keyin lookback dan eski qator
+o'zgargan bo'lsa, incremental o'rniga to'liq qayta hisoblanadi.
+
+daily_metrics — kun × metrika → count/amount.
+  365 kunlik trend grafigi voqealar sonidan qat'i nazar 365 × metrikalar qator.
+growth_gaps — materialized view, bitta qator (id = 1): mulksiz uy egalari va
+  ariza yubormagan ijarachilar soni. Uy egalari / ijarachilar bo'limlari
+  barcha userlarni LEFT JOIN qilish o'rniga shu qatorni o'qiydi.
+  REFRESH ... CONCURRENTLY — yangilanish paytida o'qishlar bloklanmaydi.
+cohort_retention — hafta / oy kogortasi × davr → faol userlar soni.
+  Kogorta — ro'yxatdan o'tgan hafta / oy; faollik — kirish, ariza va
+  shartnoma (ijarachi yoki uy egasi sifatida). Davr 0 — kogorta hajmi.
+  Incremental sync da faqat lookback boshlangan hafta / oydan keyingi
+  kataklar qayta hisoblanadi.
+user_login_days — kirish tarixi (user × kun). `"user".last_login` faqat oxirgi
+  kirishni saqlaydi va har kirishda ustidan yoziladi, shuning uchun har
+  refresh da uning joriy qiymati shu jadvalga qo'shib boriladi va kogorta
+  kirishlari shu yerdan sanaladi — to'liq qayta qurish eski kataklarni
+  o'chirmaydi. Jadval default alohida LOGIN_HISTORY_SCHEMA da (restore_db dagi
+  DROP SCHEMA public uni o'chirmaydi); boshqa jadval `login_history` parametri
+  bilan beriladi — benchmark o'z sxemasidagisini ishlatadi.
+"""
+
+from config import ROLLUP_LOOKBACK_DAYS
+from queries import HOMEOWNERS_WITHOUT_PROPERTY, TENANTS_WITHOUT_REQUESTS, TENANTS_WITHOUT_REQUESTS_PREV
+
+# Dashboard o'qiydigan rollup jadvallar (snapshot.py ham eksport qiladi)
+ROLLUP_TABLES = ["daily_metrics", "growth_gaps", "cohort_retention"]
+
+COHORT_GRAINS = ("week", "month")
+
+# Kirish tarixi — restore (DROP SCHEMA public) dan keyin ham saqlanadi
+LOGIN_HISTORY_SCHEMA = "analytics_history"
+LOGIN_HISTORY_TABLE = f"{LOGIN_HISTORY_SCHEMA}.user_login_days"
+
+ROLLUP_DDL = """
+-- ==================== DAILY METRICS ====================
+CREATE TABLE IF NOT EXISTS daily_metrics (
+    day DATE NOT NULL,
+    metric VARCHAR(50) NOT NULL,
+    count BIGINT NOT NULL DEFAULT 0,
+    amount NUMERIC(18,2) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY (day, metric)
+);
+
+-- ==================== COHORT RETENTION ====================
+CREATE TABLE IF NOT EXISTS cohort_retention (
+    grain VARCHAR(5) NOT NULL,
+    cohort DATE NOT NULL,
+    period INTEGER NOT NULL,
+    period_start DATE NOT NULL,
+    active_users BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY (grain, cohort, period)
+);
+CREATE INDEX IF NOT EXISTS idx_cohort_retention_period ON cohort_retention (grain, period_start);
+
+-- ==================== ROLLUP SOURCES STATE ====================
+-- Oxirgi refresh dagi manba jadvallar MAX(updated_at): eski qatorlar o'zgarishini aniqlash uchun
+CREATE TABLE IF NOT EXISTS rollup_sources_state (
+    table_name VARCHAR(100) PRIMARY KEY,
+    last_updated_at TIMESTAMPTZ
+);
+"""
+
+# {table} — LOGIN_HISTORY_TABLE yoki chaqiruvchi bergan jadval
+LOGIN_HISTORY_DDL = """
+CREATE TABLE IF NOT EXISTS {table} (
+    user_id BIGINT NOT NULL,
+    day DATE NOT NULL,
+    PRIMARY KEY (user_id, day)
+);
+CREATE INDEX IF NOT EXISTS idx_user_login_days_day ON {table} (day);
+"""
+
+# Jonli so'rovlar (queries.py) bilan bir xil ta'rif — faqat refresh paytida bajariladi
+GROWTH_GAPS_DDL = f"""
+CREATE MATERIALIZED VIEW growth_gaps AS
+SELECT
+    1 AS id,
+    ({HOMEOWNERS_WITHOUT_PROPERTY}) AS homeowners_without_property,
+    ({TENANTS_WITHOUT_REQUESTS}) AS tenants_without_requests,
+    ({TENANTS_WITHOUT_REQUESTS_PREV}) AS tenants_without_requests_prev,
+    NOW() AS refreshed_at;
+
+-- REFRESH ... CONCURRENTLY uchun unique indeks kerak
+CREATE UNIQUE INDEX growth_gaps_id ON growth_gaps (id);
+"""
+GROWTH_GAPS_SOURCES = ("user", "properties", "property_rentalrequest")
+
+# Rollup lar hisoblanadigan jadvallar (queries.DASHBOARD_TABLES dan) → qator qaysi
+# kunning kataklariga tushishini belgilovchi ustun
+ROLLUP_SOURCES = {
+    "user": "date_joined",
+    "property_rentalrequest": "created_at",
+    "contract": "created_at",
+    "properties": "created_at",
+}
+
+# Har bir metrika: (day, count, amount) qaytaruvchi so'rov, %(since)s dan boshlab
+DAILY_METRIC_SOURCES = {
+    "new_users": """
+        SELECT DATE(date_joined) as day, COUNT(*) as count, 0 as amount
+        FROM "user" WHERE is_deleted = FALSE AND date_joined >= %(since)s
+        GROUP BY DATE(date_joined)
+    """,
+    "requests": """
+        SELECT DATE(created_at) as day, COUNT(*) as count, 0 as amount
+        FROM property_rentalrequest WHERE is_deleted = FALSE AND created_at >= %(since)s
+        GROUP BY DATE(created_at)
+    """,
+    "contracts": """
+        SELECT DATE(created_at) as day, COUNT(*) as count,
+               COALESCE(SUM(price) FILTER (WHERE status = 'approved'), 0) as amount
+        FROM contract WHERE is_deleted = FALSE AND created_at >= %(since)s
+        GROUP BY DATE(created_at)
+    """,
+    "properties": """
+        SELECT DATE(created_at) as day, COUNT(*) as count, 0 as amount
+        FROM properties WHERE is_deleted = FALSE AND created_at >= %(since)s
+        GROUP BY DATE(created_at)
+    """,
+}
+
+# Kogorta faolligi: (user_id, at) voqealar, %(since)s dan boshlab.
+# Ro'yxatdan o'tish ham voqea — davr 0 kogorta hajmiga teng bo'ladi.
+# Kirishlar last_login dan emas, kirish tarixi jadvalidan ({login_history}, last_login
+# ustidan yoziladi).
+COHORT_EVENTS = """
+    SELECT id AS user_id, date_joined AS at FROM "user"
+    WHERE is_deleted = FALSE AND date_joined >= %(since)s
+    UNION ALL
+    SELECT user_id, day::timestamp FROM {login_history}
+    WHERE day >= %(since)s
+    UNION ALL
+    SELECT user_id_id, created_at FROM property_rentalrequest
+    WHERE is_deleted = FALSE AND created_at >= %(since)s
+    UNION ALL
+    SELECT tenant_id, created_at FROM contract
+    WHERE is_deleted = FALSE AND created_at >= %(since)s
+    UNION ALL
+    SELECT homeowner_id, created_at FROM contract
+    WHERE is_deleted = FALSE AND created_at >= %(since)s
+"""
+
+# Kogorta boshidan davr boshigacha nechta hafta / oy o'tgan
+COHORT_PERIOD_SQL = {
+    "week": "(a.period_start - c.cohort) / 7",
+    "month": "((EXTRACT(YEAR FROM a.period_start) - EXTRACT(YEAR FROM c.cohort)) * 12"
+             " + EXTRACT(MONTH FROM a.period_start) - EXTRACT(MONTH FROM c.cohort))::int",
+}
+
+
+def _exists(cur, name):
+    cur.execute("SELECT to_regclass(%s)", (f'"{name}"',))
+    return cur.fetchone()[0] is not None
+
+
+def _has_updated_at(cur, table):
+    cur.execute("""
+        SELECT 1 FROM pg_attribute
+        WHERE attrelid = %s::regclass AND attname = 'updated_at' AND NOT attisdropped
+    """, (f'"{table}"',))
+    return cur.fetchone() is not None
+
+
+def old_rows_changed(cur, since):
+    """
+    Oxirgi refresh dan keyin since dan eski (lookback dan tashqaridagi) manba qatorlar
+    o'zgarganmi — updated_at bo'yicha. Holat hali yozilmagan jadval — o'zgargan hisoblanadi.
+    """
+    for table, day_column in ROLLUP_SOURCES.items():
+        if not _has_updated_at(cur, table):
+            continue
+        cur.execute("SELECT last_updated_at FROM rollup_sources_state WHERE table_name = %s", (table,))
+        row = cur.fetchone()
+        if row is None:
+            return True
+        cur.execute(f"""
+            SELECT EXISTS (SELECT 1 FROM "{table}"
+                           WHERE updated_at > %s AND {day_column} < %s)
+        """, (row[0], since))
+        if cur.fetchone()[0]:
+            return True
+    return False
+
+
+def save_sources_state(cur):
+    """Manba jadvallar MAX(updated_at) ini saqlash (refresh bilan bitta tranzaksiyada)"""
+    for table in ROLLUP_SOURCES:
+        if not _has_updated_at(cur, table):
+            continue
+        cur.execute(f"""
+            INSERT INTO rollup_sources_state (table_name, last_updated_at)
+            SELECT %s, MAX(updated_at) FROM "{table}"
+            ON CONFLICT (table_name) DO UPDATE SET last_updated_at = EXCLUDED.last_updated_at
+        """, (table,))
+
+
+def create_growth_gaps(cur):
+    """
+    growth_gaps ni yaratish (hali yo'q va manba jadvallar bor bo'lsa).
+    Qaytaradi: hozir yaratildimi (yaratilganda ma'lumot bilan to'ladi)
+    """
+    if _exists(cur, "growth_gaps") or not all(_exists(cur, t) for t in GROWTH_GAPS_SOURCES):
+        return False
+    cur.execute(GROWTH_GAPS_DDL)
+    return True
+
+
+def create_login_history(cur, table=LOGIN_HISTORY_TABLE):
+    """Kirish tarixi jadvalini (sxema nomi bilan berilsa — sxemasini ham) yaratish"""
+    schema, _, _ = table.rpartition(".")
+    if schema:
+        cur.execute(f"CREATE SCHEMA IF NOT EXISTS {schema}")
+    cur.execute(LOGIN_HISTORY_DDL.format(table=table))
+
+
+def create_rollup_tables(cur, login_history=LOGIN_HISTORY_TABLE):
+    """Rollup jadvallarini yaratish (database.create_tables dan chaqiriladi)"""
+    cur.execute(ROLLUP_DDL)
+    create_login_history(cur, login_history)
+    create_growth_gaps(cur)
+
+
+def refresh_daily_metrics(cur, since=None):
+    """
+    daily_metrics ni qayta hisoblash.
+    since=None — to'liq qayta qurish, aks holda faqat since sanasidan boshlab.
+    """
+    since = since or "-infinity"
+    cur.execute("DELETE FROM daily_metrics WHERE day >= %(since)s::date", {"since": since})
+    for metric, source_sql in DAILY_METRIC_SOURCES.items():
+        cur.execute(f"""
+            INSERT INTO daily_metrics (day, metric, count, amount)
+            SELECT day, %(metric)s, count, amount FROM ({source_sql}) src
+            WHERE day IS NOT NULL
+        """, {"metric": metric, "since": since})
+
+
+def record_login_days(cur, login_history=LOGIN_HISTORY_TABLE):
+    """
+    Joriy last_login qiymatlarini kirish tarixiga qo'shish (bor kunlar o'tkazib
+    yuboriladi). Barcha userlar ko'riladi — sync lar orasidagi uzilish kirishni yo'qotmaydi.
+    """
+    cur.execute(f"""
+        INSERT INTO {login_history} (user_id, day)
+        SELECT id, DATE(last_login) FROM "user"
+        WHERE is_deleted = FALSE AND last_login IS NOT NULL
+        ON CONFLICT DO NOTHING
+    """)
+
+
+def refresh_cohort_retention(cur, since=None, login_history=LOGIN_HISTORY_TABLE):
+    """
+    cohort_retention ni qayta hisoblash.
+    since=None (yoki jadval hali bo'sh) — to'liq, aks holda since tushgan
+    hafta / oydan boshlangan davrlar kataklari.
+    """
+    record_login_days(cur, login_history)
+    events = COHORT_EVENTS.format(login_history=login_history)
+    if since is not None:
+        cur.execute("SELECT EXISTS (SELECT 1 FROM cohort_retention)")
+        if not cur.fetchone()[0]:
+            since = None
+    for grain in COHORT_GRAINS:
+        # Davr to'liq qayta sanalishi uchun uning boshidan (DISTINCT user butun davr bo'yicha)
+        cur.execute("SELECT DATE_TRUNC(%s, %s::timestamp)", (grain, since or "-infinity"))
+        params = {"grain": grain, "since": cur.fetchone()[0]}
+        cur.execute("DELETE FROM cohort_retention WHERE grain = %(grain)s AND period_start >= %(since)s",
+                    params)
+        cur.execute(f"""
+            INSERT INTO cohort_retention (grain, cohort, period, period_start, active_users)
+            SELECT %(grain)s, c.cohort, {COHORT_PERIOD_SQL[grain]}, a.period_start, COUNT(*)
+            FROM (
+                SELECT DISTINCT user_id, DATE_TRUNC(%(grain)s, at)::date AS period_start
+                FROM ({events}) e
+            ) a
+            JOIN (
+                SELECT id, DATE_TRUNC(%(grain)s, date_joined)::date AS cohort FROM "user"
+                WHERE is_deleted = FALSE AND date_joined IS NOT NULL
+            ) c ON c.id = a.user_id
+            WHERE a.period_start >= c.cohort
+            GROUP BY c.cohort, a.period_start
+        """, params)
+
+
+def refresh_growth_gaps(cur):
+    """growth_gaps ni yangilash (yo'q bo'lsa — yaratish)"""
+    if not create_growth_gaps(cur) and _exists(cur, "growth_gaps"):
+        cur.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY growth_gaps")
+
+
+def refresh_rollups(conn, full=False, login_history=LOGIN_HISTORY_TABLE):
+    """
+    Barcha rollup larni yangilash va commit qilish.
+    full=False bo'lsa faqat oxirgi ROLLUP_LOOKBACK_DAYS kun qayta hisoblanadi
+    (rollup hali bo'sh bo'lsa yoki undan eski manba qatorlar o'zgargan bo'lsa —
+    baribir to'liq quriladi).
+    login_history — kirish tarixi jadvali (benchmark o'z sxemasidagisini beradi).
+    Qaytaradi: False — ROLLUP_SOURCES jadvallari bazada yo'q, refresh o'tkazib yuborildi.
+    """
+    cur = conn.cursor()
+    try:
+        missing = [table for table in ROLLUP_SOURCES if not _exists(cur, table)]
+        if missing:
+            print(f"⚠️ Rollup lar yangilanmadi: manba jadvallar yo'q ({', '.join(missing)})")
+            return False
+        cur.execute("SELECT EXISTS (SELECT 1 FROM daily_metrics)")
+        if full or not cur.fetchone()[0]:
+            since = None
+        else:
+            cur.execute("SELECT CURRENT_DATE - %s", (ROLLUP_LOOKBACK_DAYS,))
+            since = cur.fetchone()[0]
+            if old_rows_changed(cur, since):
+                print(f"🔄 {since} dan eski manba qatorlar o'zgargan — rollup lar to'liq qayta hisoblanadi")
+                since = None
+        refresh_daily_metrics(cur, since)
+        refresh_cohort_retention(cur, since, login_history)
+        refresh_growth_gaps(cur)
+        save_sources_state(cur)
+        conn.commit()
+        return True
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
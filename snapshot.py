@@ -0,0 +1,283 @@
+"""
+snapshot.py — Dashboard o'qishlari uchun lokal Parquet snapshot (DuckDB)
+
+READ_BACKEND=duckdb bo'lsa, har bir etl.sync_data / restore dan keyin
+dashboard o'qiydigan jadvallar (queries.DASHBOARD_TABLES + rollup lar)
+SNAPSHOT_DIR ga Parquet fayl sifatida eksport qilinadi. database.execute_query
+queries.py so'rovlarini o'zgarishsiz shu fayllar ustida, ichki (embedded)
+DuckDB da bajaradi — sahifa Neon kechikishi va cold start ga bog'liq emas,
+millionlab qator ustidagi agregatsiyalar lokal diskdan ustunli o'qiladi.
+
+  • snapshot yangi papkaga yoziladi, CURRENT fayli atomik almashtiriladi —
+    o'qiyotgan so'rovlar yarim yozilgan faylni ko'rmaydi
+  • bir vaqtda bitta eksport (jarayon ichida lock, boshqa jarayonlar bilan —
+    SNAPSHOT_DIR dagi lock fayl): sync va warm-up eksportlari bir-birining
+    papkasini o'chirmaydi
+  • Postgres sintaksisi: %s / %(nom)s parametrlar DuckDB ga o'giriladi,
+    butun sonlarni bo'lish Postgres dagidek (integer_division)
+  • snapshot yo'q, duckdb o'rnatilmagan yoki so'rov DuckDB da ishlamasa —
+    Postgres dan o'qiladi (fallback)
+
+Snapshot sync bajarilgan jarayon / mashinada yangilanadi; ilova boshqa
+replikada ishga tushsa va snapshot bo'lmasa, warm-up oldidan bir marta olinadi.
+"""
+
+import os
+import re
+import json
+import time
+import shutil
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+from config import READ_BACKEND, SNAPSHOT_DIR
+from queries import DASHBOARD_TABLES
+from rollups import ROLLUP_TABLES
+
+try:
+    import duckdb
+    DUCKDB_AVAILABLE = True
+except ImportError:
+    DUCKDB_AVAILABLE = False
+    if READ_BACKEND == "duckdb":
+        print("⚠️ duckdb library not found. READ_BACKEND=duckdb — Postgres dan o'qiladi.")
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # Windows — faqat jarayon ichidagi lock
+
+SNAPSHOT_TABLES = [*DASHBOARD_TABLES, *ROLLUP_TABLES]
+CURRENT_FILE = os.path.join(SNAPSHOT_DIR, "CURRENT")
+LOCK_FILE = os.path.join(SNAPSHOT_DIR, "export.lock")
+
+# Postgres → DuckDB turlari (qolganlari, jumladan JSONB — VARCHAR)
+PG_TYPES = {
+    "bigint": "BIGINT",
+    "integer": "INTEGER",
+    "smallint": "SMALLINT",
+    "boolean": "BOOLEAN",
+    "real": "FLOAT",
+    "double precision": "DOUBLE",
+    "numeric": "DOUBLE",
+    "date": "DATE",
+    "timestamp without time zone": "TIMESTAMP",
+    "timestamp with time zone": "TIMESTAMPTZ",
+}
+
+_lock = threading.Lock()
+_export_lock = threading.Lock()
+_reader = {"dir": None, "con": None}
+_warned = set()
+
+
+class SnapshotUnavailable(Exception):
+    pass
+
+
+def enabled():
+    return READ_BACKEND == "duckdb" and DUCKDB_AVAILABLE
+
+
+def current_dir():
+    """Joriy snapshot papkasi (hali olinmagan bo'lsa None)"""
+    try:
+        with open(CURRENT_FILE, encoding="utf-8") as f:
+            name = f.read().strip()
+    except FileNotFoundError:
+        return None
+    path = os.path.join(SNAPSHOT_DIR, name)
+    return path if os.path.isdir(path) else None
+
+
+# ======================== EKSPORT ========================
+
+@contextmanager
+def _exporting():
+    """Eksport uchun lock: jarayon ichida threading.Lock, jarayonlar orasida flock"""
+    with _export_lock:
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        with open(LOCK_FILE, "a") as f:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _columns(cur, table):
+    """[(ustun, tur)] — pg_attribute (information_schema materialized view larni ko'rsatmaydi)"""
+    cur.execute("""
+        SELECT attname, format_type(atttypid, atttypmod) FROM pg_attribute
+        WHERE attrelid = %s::regclass AND attnum > 0 AND NOT attisdropped
+        ORDER BY attnum
+    """, (f'"{table}"',))
+    # numeric(18,2) → numeric, timestamp(6) without time zone → timestamp without time zone
+    return [(name, re.sub(r"\(.*?\)", "", data_type)) for name, data_type in cur.fetchall()]
+
+
+def _export_table(cur, con, table, target_dir):
+    """Postgres jadvali → CSV (COPY TO STDOUT) → Parquet. Qaytaradi: qatorlar soni"""
+    columns = _columns(cur, table)
+    csv_path = os.path.join(target_dir, f"{table}.csv")
+    parquet_path = os.path.join(target_dir, f"{table}.parquet")
+    names = ", ".join(f'"{name}"' for name, _ in columns)
+    with open(csv_path, "w", encoding="utf-8") as f:
+        cur.copy_expert(f'COPY (SELECT {names} FROM "{table}") TO STDOUT WITH (FORMAT csv)', f)
+
+    spec = ", ".join(f"'{name}': '{PG_TYPES.get(data_type, 'VARCHAR')}'" for name, data_type in columns)
+    try:
+        con.execute(f"""
+            COPY (SELECT * FROM read_csv(?, header = false, quote = '"', escape = '"', columns = {{{spec}}}))
+            TO '{parquet_path}' (FORMAT parquet, COMPRESSION zstd)
+        """, [csv_path])
+    finally:
+        os.remove(csv_path)
+    return con.execute("SELECT COUNT(*) FROM read_parquet(?)", [parquet_path]).fetchone()[0]
+
+
+def export_snapshot():
+    """
+    SNAPSHOT_TABLES ni yangi Parquet snapshot ga eksport qilish va uni joriy qilish.
+    Bazada yo'q jadvallar o'tkazib yuboriladi. Bir vaqtda bitta eksport bajariladi
+    (keyingisi oldingisi tugashini kutadi). Qaytaradi: manifest (dict)
+    """
+    if not DUCKDB_AVAILABLE:
+        raise SnapshotUnavailable("duckdb o'rnatilmagan")
+    with _exporting():
+        return _export()
+
+
+def _export():
+    """export_snapshot tanasi — _exporting() lock i ostida chaqiriladi"""
+    from database import get_connection
+
+    started = time.time()
+    name = datetime.now().strftime("%Y%m%d%H%M%S%f")
+    target_dir = os.path.join(SNAPSHOT_DIR, name)
+    os.makedirs(target_dir)
+    manifest = {"created_at": datetime.now().isoformat(timespec="seconds"), "tables": {}}
+    conn = get_connection()
+    con = duckdb.connect()
+    try:
+        with conn.cursor() as cur:
+            for table in SNAPSHOT_TABLES:
+                cur.execute("SELECT to_regclass(%s)", (f'"{table}"',))
+                if cur.fetchone()[0] is None:
+                    continue
+                manifest["tables"][table] = _export_table(cur, con, table, target_dir)
+        conn.rollback()
+        with open(os.path.join(target_dir, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+    except Exception:
+        shutil.rmtree(target_dir, ignore_errors=True)
+        raise
+    finally:
+        con.close()
+        conn.close()
+
+    previous = current_dir()
+    tmp_path = f"{CURRENT_FILE}.{name}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(name)
+    os.replace(tmp_path, CURRENT_FILE)
+    _cleanup(keep={name, os.path.basename(previous or "")})
+
+    rows = sum(manifest["tables"].values())
+    print(f"📦 Parquet snapshot: {len(manifest['tables'])} ta jadval, {rows:,} qator "
+          f"({time.time() - started:.1f}s)")
+    return manifest
+
+
+def ensure_snapshot():
+    """Snapshot hali yo'q bo'lsa olish (ilova yangi mashinada ishga tushganda)"""
+    if not enabled() or current_dir() is not None:
+        return
+    try:
+        with _exporting():
+            # Lock kutilayotganda boshqa chaqiruvchi snapshot olgan bo'lishi mumkin
+            if current_dir() is None:
+                _export()
+    except Exception as e:
+        print(f"⚠️ Snapshot olinmadi: {e}")
+
+
+def _cleanup(keep):
+    """
+    Eski snapshot larni o'chirish (joriy va oldingisi qoladi — o'qilayotgan bo'lishi
+    mumkin). Joriydan yangi papkalar tegilmaydi — boshqa eksport yozayotgan bo'lishi mumkin.
+    """
+    newest = max(keep)
+    for entry in os.listdir(SNAPSHOT_DIR):
+        path = os.path.join(SNAPSHOT_DIR, entry)
+        if os.path.isdir(path) and entry not in keep and entry < newest:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+# ======================== O'QISH ========================
+
+def _connection():
+    """Joriy snapshot jadvallari view sifatida ulangan DuckDB (snapshot almashsa qayta quriladi)"""
+    path = current_dir()
+    if path is None:
+        raise SnapshotUnavailable("snapshot hali olinmagan")
+    with _lock:
+        if _reader["dir"] != path:
+            con = duckdb.connect()
+            # Postgres dagidek: COUNT(*) / COUNT(...) — butun son (GLOBAL — cursor lar uchun ham)
+            con.execute("SET GLOBAL integer_division = true")
+            for file_name in sorted(os.listdir(path)):
+                if file_name.endswith(".parquet"):
+                    parquet_path = os.path.join(path, file_name).replace("'", "''")
+                    con.execute(f'CREATE VIEW "{file_name[:-8]}" AS '
+                                f"SELECT * FROM read_parquet('{parquet_path}')")
+            _reader["dir"], _reader["con"] = path, con
+        return _reader["con"]
+
+
+def to_duckdb(query, params=None):
+    """psycopg2 uslubidagi so'rov va parametrlar → DuckDB ($nom / ?)"""
+    if isinstance(params, dict):
+        for key in params:
+            query = query.replace(f"%({key})s", f"${key}")
+    else:
+        query = query.replace("%s", "?")
+        params = list(params) if params is not None else None
+    return query.replace("%%", "%"), params
+
+
+def execute_query(query, params=None):
+    """So'rovni snapshot ustida bajarish → DataFrame (xato bo'lsa — istisno)"""
+    con = _connection()
+    cur = con.cursor()  # har bir thread uchun alohida DuckDB cursor
+    try:
+        cur.execute(*to_duckdb(query, params))
+        columns = cur.description
+        df = cur.df()
+    finally:
+        cur.close()
+    # DATE ustunlar Postgres (psycopg2) dagidek datetime.date bo'lsin, datetime64 emas
+    for name, type_code, *_ in columns:
+        if str(type_code) == "DATE":
+            df[name] = df[name].dt.date
+    return df
+
+
+def try_query(query, params=None):
+    """
+    Snapshot dan o'qishga urinish. Ishlamasa None — chaqiruvchi Postgres dan o'qiydi
+    (har bir sabab bir marta log qilinadi).
+    """
+    if not enabled():
+        return None
+    try:
+        return execute_query(query, params)
+    except Exception as e:
+        reason = f"{type(e).__name__}: {str(e).splitlines()[0]}"
+        if reason not in _warned:
+            _warned.add(reason)
+            print(f"⚠️ DuckDB snapshot dan o'qib bo'lmadi, Postgres ishlatiladi — {reason}")
+        return None
@@ -0,0 +1,102 @@
+"""
+warmup.py — Cache ni oldindan isitish (warm-up)
+
+Sync yoki sovuq startdan keyin dashboard ni birinchi ochgan foydalanuvchi
+barcha bo'limlar so'rovlarini kutmasligi uchun standart davrlar (oxirgi
+7 / 30 / 90 / 365 kun, har biri oldingi davr bilan) natijalari disk cache ga
+(result_cache) oldindan yoziladi. app.py xuddi shu queries.period_params va
+bo'lim batch lari orqali bir xil kalitlarni so'raydi — sahifa cache dan ochiladi.
+
+Ishga tushadi:
+  • app start — bir marta, fon thread da (app.py, st.cache_resource)
+  • etl.sync_data tugagach — yangi data versiyasi uchun
+"""
+
+import time
+import threading
+from datetime import date, timedelta
+
+import queries
+import result_cache
+import snapshot
+from database import execute_queries
+from rollups import COHORT_GRAINS
+
+# 30 — app.py dagi standart sana filtri
+PRESET_DAYS = (7, 30, 90, 365)
+
+VIEW_BATCHES = (
+    queries.overview_batch,
+    queries.users_batch,
+    queries.homeowners_batch,
+    queries.tenants_batch,
+)
+
+_lock = threading.Lock()
+_thread = None
+
+
+def warmup_batch(today=None):
+    """
+    Barcha preset davrlar va bo'limlar so'rovlari + ikkala retention heatmap
+    (takrorlarsiz): {kalit: (so'rov, parametrlar)}
+    """
+    today = today or date.today()
+    batch = {}
+    for days in PRESET_DAYS:
+        date_params, kpi = queries.period_params(today - timedelta(days=days), today)
+        for build in VIEW_BATCHES:
+            for query, params in build(date_params, kpi).values():
+                batch[result_cache.cache_key(query, params)] = (query, params)
+    for grain in COHORT_GRAINS:
+        for query, params in queries.cohort_batch(grain).values():
+            batch[result_cache.cache_key(query, params)] = (query, params)
+    return batch
+
+
+def warm_cache():
+    """
+    Preset so'rovlarni joriy data versiyasi bilan disk cache ga yozish.
+    Bir vaqtda faqat bitta warm-up ishlaydi (snapshot olish ham). Qaytaradi:
+    bajarilgan so'rovlar soni.
+    """
+    if not _lock.acquire(blocking=False):
+        return 0
+    try:
+        snapshot.ensure_snapshot()  # READ_BACKEND=duckdb, yangi mashina — snapshot hali yo'q
+        if not result_cache.enabled():
+            return 0
+        started = time.perf_counter()
+        version = result_cache.cache_version()
+        batch = warmup_batch()
+        missing = {
+            key: entry for key, entry in batch.items()
+            if result_cache.get(*entry, version) is None
+        }
+        loaded = execute_queries(missing, return_exceptions=True)
+        for key, (query, params) in missing.items():
+            # Xato bergan so'rov cache lanmaydi — foydalanuvchi so'raganda qayta bajariladi
+            if not isinstance(loaded[key], Exception):
+                result_cache.put(query, params, loaded[key], version)
+        print(f"🔥 Cache warm-up: {len(missing)}/{len(batch)} ta so'rov "
+              f"({time.perf_counter() - started:.1f}s, versiya {version})")
+        return len(missing)
+    except Exception as e:
+        print(f"⚠️ Cache warm-up xatosi: {e}")
+        return 0
+    finally:
+        _lock.release()
+
+
+def start_background_warmup():
+    """warm_cache ni fon (daemon) thread da ishga tushirish"""
+    global _thread
+    _thread = threading.Thread(target=warm_cache, name="cache-warmup", daemon=True)
+    _thread.start()
+    return _thread
+
+
+def wait_for_warmup(timeout=None):
+    """Oxirgi fon warm-up tugashini kutish (CLI jarayoni chiqib ketmasligi uchun)"""
+    if _thread is not None:
+        _thread.join(timeout)